@@ -22,6 +22,7 @@
 
 import sys
 import importlib
+import functools
 import logging
 import warnings
 
@@ -123,8 +124,9 @@ from .baredata import ObjectBase, BareData, Utility
 from .ndtypes import NumpyArray
 from .dbrec import DbDictable
 from .field import FieldType, Field, FieldBase
+from .transferoperator import TransferOperator
 from .function import Function
-from .heavydata import HeavyDataBase, Hdf5RefQuantity, Hdf5OwningRefQuantity, Hdf5HeavyProperty, HeavyConvertible
+from .heavydata import HeavyDataBase, Hdf5BlockCache, Hdf5RefQuantity, Hdf5OwningRefQuantity, Hdf5HeavyProperty, HeavyConvertible
 from .heavystruct import HeavyStruct
 from .heavymesh import HeavyUnstructuredMesh
 from .integrationrule import IntegrationRule, GaussIntegrationRule
@@ -150,6 +152,7 @@ from .stringproperty import String
 from .timer import Timer
 from .timestep import TimeStep
 from .uniformmesh import UniformRectilinearMesh
+from .compactmesh import CompactUnstructuredMesh
 from .units import UnitProxy, Quantity, RefQuantity
 from .vertex import Vertex
 from .workflow import Workflow
@@ -163,7 +166,7 @@ from . import monitor
 
 
 
-__all__ = ['U','Q','apierror','BareData','APIError','bbox','BBox','cell','BareData','Cell','Triangle_2d_lin','Triangle_2d_quad','Quad_2d_lin','Tetrahedron_3d_lin','Brick_3d_lin','constantfield','ConstantField','data','dataid','DataID','baredata','NumpyArray','ObjectBase','BareData','field','FieldType','Field','function','Function','heavydata','HeavyDataBase','HeavyStruct','Hdf5RefQuantity','Hdf5OwningRefQuantity','HeavyUnstructuredMesh','integrationrule','IntegrationRule','GaussIntegrationRule','modelserverbase','ModelServerException','ModelServerNoResourcesException','ModelServerBase','RemoteModelServer','localizer','Localizer','mesh','MeshIterator','Mesh','UnstructuredMesh','model','Model','RemoteModel','data','WithMetadata','Data','DataList','mupifquantity','ValueType','MupifQuantity','octree','Octant_py','Octree','operatorutil','OperatorInteraction','OperatorEMailInteraction','particle','Particle','ParticleSet','property','Property','ConstantProperty','stringproperty','String','pyrofile','PyroFile','pyroutil','Quantity','remoteapprecord','RemoteAppRecord','modelserver','ModelServer','TemporalProperty','timer','Timer','timestep','TimeStep','units','UnitProxy','util','vertex','BareData','Vertex','workflow','Workflow','lookuptable','LookupTable','MemoryLookupTable','multipiecewiselinfunction','MultiPiecewiseLinFunction','piecewiselinfunction','PiecewiseLinFunction','pbs_tool','hpc_tool','pyrolog','TemporalField','DirTemporalField','SingleFileTemporalField','dbrec','DbDictable','monitor','WithMetadata','Data','Process','DataList','Utility','RefQuantity','FieldBase','HeavyConvertible','cellgeometrytype']
+__all__ = ['U','Q','apierror','BareData','APIError','bbox','BBox','cell','BareData','Cell','Triangle_2d_lin','Triangle_2d_quad','Quad_2d_lin','Tetrahedron_3d_lin','Brick_3d_lin','constantfield','ConstantField','data','dataid','DataID','baredata','NumpyArray','ObjectBase','BareData','field','FieldType','Field','transferoperator','TransferOperator','function','Function','heavydata','HeavyDataBase','HeavyStruct','Hdf5BlockCache','Hdf5RefQuantity','Hdf5OwningRefQuantity','HeavyUnstructuredMesh','integrationrule','IntegrationRule','GaussIntegrationRule','modelserverbase','ModelServerException','ModelServerNoResourcesException','ModelServerBase','RemoteModelServer','localizer','Localizer','mesh','MeshIterator','Mesh','UnstructuredMesh','compactmesh','CompactUnstructuredMesh','model','Model','RemoteModel','data','WithMetadata','Data','DataList','mupifquantity','ValueType','MupifQuantity','octree','Octant_py','Octree','operatorutil','OperatorInteraction','OperatorEMailInteraction','particle','Particle','ParticleSet','property','Property','ConstantProperty','stringproperty','String','pyrofile','PyroFile','pyroutil','Quantity','remoteapprecord','RemoteAppRecord','modelserver','ModelServer','TemporalProperty','timer','Timer','timestep','TimeStep','units','UnitProxy','util','vertex','BareData','Vertex','workflow','Workflow','lookuptable','LookupTable','MemoryLookupTable','multipiecewiselinfunction','MultiPiecewiseLinFunction','piecewiselinfunction','PiecewiseLinFunction','pbs_tool','hpc_tool','pyrolog','TemporalField','DirTemporalField','SingleFileTemporalField','dbrec','DbDictable','monitor','WithMetadata','Data','Process','DataList','Utility','RefQuantity','FieldBase','HeavyConvertible','cellgeometrytype']
 
 # importing those modules would trigger warning, skip it here
 with warnings.catch_warnings():
@@ -214,8 +217,8 @@ def _registerOther():
         Pyro5.api.register_dict_to_class(c.__module__+'.'+c.__name__, baredata.enum_from_dict_with_name)
 
     # don't use numpy.ndarray.tobytes as it is not cross-plaform; npy files are
-    Pyro5.api.register_class_to_dict(numpy.ndarray, lambda arr: {'__class__': 'numpy.ndarray', 'npy': (numpy.save(buf := io.BytesIO(), arr, allow_pickle=False), buf.getvalue())[1]})
-    Pyro5.api.register_dict_to_class('numpy.ndarray', lambda name, dic: numpy.load(io.BytesIO(serpent.tobytes(buf) if isinstance(buf := dic['npy'], dict) else buf), allow_pickle=False))
+    Pyro5.api.register_class_to_dict(numpy.ndarray, lambda arr: baredata.ndarray_to_npy_dict(arr, compressMin=baredata.wireArrays['compressMin'] if baredata.wireBinaryArrays() else None))
+    Pyro5.api.register_dict_to_class('numpy.ndarray', lambda name, dic: baredata.ndarray_from_npy_dict(dic))
 
     def _tryExpose(f):
         if daemon := getattr(f, '_pyroDaemon'):
@@ -244,6 +247,7 @@ def _registerOther():
 
 def _pyroMonkeyPatch():
     import Pyro5.api
+    import Pyro5.serializers
     # workaround for https://github.com/irmen/Pyro5/issues/44
     if not hasattr(Pyro5.api.Proxy, '__len__'):
         Pyro5.api.Proxy.__bool__= lambda self: True
@@ -253,6 +257,13 @@ def _pyroMonkeyPatch():
         Pyro5.api.Proxy.__delitem__ = lambda self, index: self.__getattr__('__delitem__')(index)
         # Pyro5.api.Proxy.__enter__ = lambda self: self.__getattr__('__enter__')()
         # Pyro5.api.Proxy.__exit__ = lambda self,exc_type,exc_value,traceback: self.__getattr__('__exit__')(exc_type,exc_value,traceback)
+    # negotiate binary transport of arrays with peers (see baredata.wireBinaryArrays)
+    if not hasattr(Pyro5.api.Proxy._pyroInvoke, '__wrapped__'):
+        for meth in '_pyroInvoke', '_pyroBind', '_pyroGetMetadata':
+            setattr(Pyro5.api.Proxy, meth, functools.update_wrapper(baredata.pyroProxyNegotiated(orig := getattr(Pyro5.api.Proxy, meth)), orig))
+        Pyro5.api.Daemon.annotations = functools.update_wrapper(baredata.pyroDaemonAnnotations(Pyro5.api.Daemon.annotations), Pyro5.api.Daemon.annotations)
+        for ser in set(type(s) for s in Pyro5.serializers.serializers.values()):
+            ser.dumps = functools.update_wrapper(baredata.pyroResponseNegotiated(ser.dumps), ser.dumps)
     
 
 # register all baredata types
@@ -8,6 +8,8 @@ import numpy
 import numpy as np
 import Pyro5.api
 import sys
+import threading
+import zlib
 
 import pydantic
 import pydantic_core
@@ -56,6 +58,8 @@ class BareData(ObjectBase):
     """
     _pickleInside = False
     model_config = pydantic.ConfigDict(extra='forbid')
+    #: serialize numpy.ndarray attributes as raw (npy) buffers rather than nested lists in :obj:`to_dict`; only enable for classes which are not understood by older peers anyway (other classes use buffers when negotiated with the peer, see :obj:`wireBinaryArrays`)
+    npyArrays: typing.ClassVar[bool] = False
 
     # don't pickle attributes starting with underscore
     def __getstate__(self):
@@ -78,6 +82,7 @@ class BareData(ObjectBase):
             elif isinstance(val, BareData): return val.to_dict()
             elif isinstance(val, enum.Enum): return enum_to_dict(val)
             # explicitly don't handle subtypes
+            elif type(val) == numpy.ndarray and npyArrays: return ndarray_to_npy_dict(val, compressMin=wireArrays['compressMin'] if binaryWire else None)
             elif type(val) == numpy.ndarray: return {'__class__': 'numpy.ndarray', 'arr': val.tolist(), 'dtype': str(val.dtype)}
             elif astropy and isinstance(val, astropy.units.UnitBase): return {'__class__': 'astropy.units.Unit', 'unit': val.to_string()}
             elif astropy and isinstance(val, astropy.units.Quantity):
@@ -92,6 +97,8 @@ class BareData(ObjectBase):
                 return val
         import enum
         if not isinstance(self, BareData): raise RuntimeError("Not a BareData.");
+        binaryWire = wireBinaryArrays()
+        npyArrays = self.npyArrays or binaryWire
         self.preDumpHook()
         ret = {}
         if clss is None:
@@ -168,6 +175,7 @@ class BareData(ObjectBase):
                 return astropy.units.Quantity(BareData.from_dict(dic['value']), astropy.units.Unit(dic['unit']))
             if issubclass(clss, numpy.ndarray):
                 if clss != numpy.ndarray: raise RuntimeError('Subclass of numpy.ndarray %s.%s not handled.' % (mod, classname))
+                if 'npy' in dic: return ndarray_from_npy_dict(dic)
                 return numpy.array(dic['arr'], dtype=dic['dtype'])
             if issubclass(clss, pydantic.BaseModel): pass
             # print('here D')
@@ -205,6 +213,89 @@ class BareData(ObjectBase):
         return pickle.load(open(filename, 'rb'))
 
 
+#: Pyro message annotation by which mupif peers announce that they decode binary-encoded arrays (see :obj:`wireBinaryArrays`)
+WIRE_BINARY_ANNOTATION = 'MBIN'
+#: binary transport of arrays over Pyro: *binary* enables negotiation with peers (when False, nested lists are sent and binary encoding is not announced); arrays with more than *compressMin* bytes are zlib-compressed (None disables compression) with *compressLevel*
+wireArrays = dict(binary=True, compressMin=None, compressLevel=1)
+
+# per-thread: whether the peer of the Pyro message being serialized (outgoing call, or response to a call) decodes binary arrays (None when no message is being serialized)
+_wire = threading.local()
+
+
+def wireBinaryArrays():
+    """
+    Whether numpy.ndarray attributes (including values of astropy.units.Quantity) of all BareData are serialized as binary buffers (see :obj:`ndarray_to_npy_dict`) in :obj:`BareData.to_dict` in the current thread, rather than as nested lists understood by all mupif versions.
+
+    This is the case when serializing arguments of a call through :obj:`Pyro5.api.Proxy` whose remote daemon announced binary support in some previous response, or when serializing the response of a call for a client which announced binary support in the request (see :obj:`pyroProxyNegotiated`, :obj:`pyroDaemonAnnotations` and :obj:`pyroResponseNegotiated`); elsewhere (e.g. in the body of a remotely called method), it is False. Older peers never announce the support, thus they always receive nested lists.
+    """
+    if not wireArrays['binary']: return False
+    return bool(getattr(_wire, 'peerBinary', None))
+
+
+def pyroProxyNegotiated(method):
+    """
+    Wrap :obj:`Pyro5.api.Proxy` method doing remote communication (``_pyroInvoke``, and ``_pyroBind`` and ``_pyroGetMetadata`` which connect the proxy) so that each call announces binary array support to the daemon, the daemon's support (announced in the response or in the connect handshake) is remembered by the proxy, and call arguments are serialized accordingly. Request annotations of the current call context are restored afterwards (so that calls done from within a server thread don't change what the server's own client announced); the announcement is removed from response annotations, which are otherwise left as received.
+    """
+    def _negotiated(self, *args, **kw):
+        ctx = Pyro5.callcontext.current_context
+        ann, peer = ctx.annotations, getattr(_wire, 'peerBinary', None)
+        if wireArrays['binary']: ctx.annotations = dict(ann or {}, **{WIRE_BINARY_ANNOTATION: b'1'})
+        # proxy's __getattr__ would query the remote object
+        _wire.peerBinary = self.__dict__.get('_mupifWireBinary', False)
+        try:
+            ret = method(self, *args, **kw)
+            if (ctx.response_annotations or {}).pop(WIRE_BINARY_ANNOTATION, None) is not None: object.__setattr__(self, '_mupifWireBinary', True)
+            return ret
+        finally:
+            ctx.annotations, _wire.peerBinary = ann, peer
+    return _negotiated
+
+
+def pyroResponseNegotiated(dumps):
+    """
+    Wrap ``dumps`` of Pyro serializers (used by :obj:`Pyro5.api.Daemon` to serialize responses) so that arrays are sent as binary buffers if the client announced the support in the request. Serialization of outgoing calls (which set the peer already) is not affected.
+    """
+    def _negotiated(self, data):
+        if getattr(_wire, 'peerBinary', None) is not None: return dumps(self, data)
+        ctx = Pyro5.callcontext.current_context
+        _wire.peerBinary = (ctx.client is not None and WIRE_BINARY_ANNOTATION in (ctx.annotations or {}))
+        try: return dumps(self, data)
+        finally: _wire.peerBinary = None
+    return _negotiated
+
+
+def pyroDaemonAnnotations(annotations):
+    'Wrap :obj:`Pyro5.api.Daemon.annotations` so that every response announces binary array support.'
+    def _annotations(self):
+        ret = annotations(self)
+        if wireArrays['binary']: ret = dict(ret, **{WIRE_BINARY_ANNOTATION: b'1'})
+        return ret
+    return _annotations
+
+
+def ndarray_to_npy_dict(arr, compressMin=None):
+    '''
+    Encode array as npy buffer (numpy.ndarray.tobytes is not cross-platform, npy format is); the buffer carries dtype and shape of the array.
+
+    :param int compressMin: compress the buffer with zlib if it is longer than *compressMin* bytes (no compression if None)
+    '''
+    import io
+    numpy.save(buf := io.BytesIO(), arr, allow_pickle=False)
+    if compressMin is not None and buf.tell() > compressMin:
+        return {'__class__': 'numpy.ndarray', 'npy': zlib.compress(buf.getbuffer(), wireArrays['compressLevel']), 'codec': 'zlib'}
+    return {'__class__': 'numpy.ndarray', 'npy': buf.getvalue()}
+
+
+def ndarray_from_npy_dict(dic):
+    import io
+    # serpent transfers bytes as dict with base64-encoded data
+    buf = dic['npy']
+    if isinstance(buf, dict): buf = serpent.tobytes(buf)
+    if (codec := dic.get('codec', None)) == 'zlib': buf = zlib.decompress(buf)
+    elif codec is not None: raise ValueError(f'Unknown array codec {codec}.')
+    return numpy.load(io.BytesIO(buf), allow_pickle=False)
+
+
 def enum_to_dict(e): return {'__class__': e.__class__.__module__+'.'+e.__class__.__name__, 'name': e.name}
 
 
@@ -79,6 +79,11 @@ class Cell(baredata.BareData):
 
     def __hash__(self): return id(self)
 
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        # the mesh using the cell has its cached data invalidated (the mesh back-reference itself does not change the geometry)
+        if name != 'mesh' and not name.startswith('_') and (m := self.__dict__.get('mesh', None)) is not None: m._setDirty()
+
     # static attribute (cache)
     _subclasses = {}
 
@@ -148,6 +153,113 @@ class Cell(baredata.BareData):
         """
         raise NotImplementedError('abstract')
 
+    @classmethod
+    def glob2locArray(cls, vertCoords, points):
+        """
+        Converts many global points to local coordinates at once; the i-th point is converted in the i-th cell. Derived classes without array kernel raise NotImplementedError, callers should then fall back to per-cell methods.
+
+        :param numpy.ndarray vertCoords: (M,nVerts,dim) array of cell vertex coordinates
+        :param numpy.ndarray points: (M,dim) array of global coordinates
+        :return: (inside,lc), (M,) boolean array telling whether the point is inside the cell and (M,nLoc) local coordinates
+        :rtype: (numpy.ndarray,numpy.ndarray)
+        """
+        raise NotImplementedError('abstract')
+
+    @classmethod
+    def evalNArray(cls, lc):
+        """
+        Evaluates shape functions at many points (given in local coordinates, as returned by :obj:`glob2locArray`).
+
+        :param numpy.ndarray lc: (M,nLoc) array of local coordinates
+        :return: (M,nVerts) array of shape function values
+        :rtype: numpy.ndarray
+        """
+        raise NotImplementedError('abstract')
+
+    @classmethod
+    def evalDerivativesArray(cls, lc):
+        """
+        Evaluates shape function derivatives with respect to parametric coordinates at many points.
+
+        :param numpy.ndarray lc: (M,nLoc) array of local coordinates
+        :return: (M,nVerts,nParam) array of derivatives
+        :rtype: numpy.ndarray
+        """
+        raise NotImplementedError('abstract')
+
+    @classmethod
+    def loc2globArray(cls, vertCoords, lc):
+        """
+        Converts many local coordinates to global ones at once; the i-th point is converted in the i-th cell.
+
+        :param numpy.ndarray vertCoords: (M,nVerts,dim) array of cell vertex coordinates
+        :param numpy.ndarray lc: (M,nLoc) array of local coordinates
+        :return: (M,dim) array of global coordinates
+        :rtype: numpy.ndarray
+        """
+        return np.einsum('mi,mid->md', cls.evalNArray(lc), vertCoords)
+
+    @classmethod
+    def containsPointArray(cls, vertCoords, points):
+        """
+        Checks whether each point is inside the respective cell; see :obj:`glob2locArray`.
+
+        :return: (M,) boolean array
+        :rtype: numpy.ndarray
+        """
+        return cls.glob2locArray(vertCoords, points)[0]
+
+    @classmethod
+    def getTransformationJacobianArray(cls, vertCoords, lc):
+        """
+        Returns transformation jacobians (determinants of the jacobian matrix) at many points at once, computed from :obj:`evalDerivativesArray`.
+
+        :param numpy.ndarray vertCoords: (M,nVerts,dim) array of cell vertex coordinates
+        :param numpy.ndarray lc: (M,nLoc) array of local coordinates
+        :return: (M,) array of jacobians
+        :rtype: numpy.ndarray
+        """
+        dn = cls.evalDerivativesArray(lc)
+        return np.linalg.det(np.einsum('mia,mib->mab', dn, vertCoords[:, :, :dn.shape[2]]))
+
+    @staticmethod
+    def _nonDegenerateArray_static(vertCoords, det, relTol=1e-10):
+        """
+        Tell which cells are not degenerate, i.e. their mapping determinant *det* (area or volume multiple) is not negligible relative to the cell size; degenerate cells are reported as not containing any point by array kernels.
+
+        :param numpy.ndarray vertCoords: (M,nVerts,dim) array of cell vertex coordinates (only dimensions used in *det* should be passed)
+        :param numpy.ndarray det: (M,) array of determinants
+        :return: (M,) boolean array
+        """
+        size = np.max(np.max(vertCoords, axis=1)-np.min(vertCoords, axis=1), axis=1)
+        return np.abs(det) > relTol*size**vertCoords.shape[2]
+
+    @classmethod
+    def _glob2locNewtonArray(cls, vertCoords, points, lc, maxIter=10, relTol=1e-10):
+        """
+        Newton-Raphson solution of loc2glob(lc)=points for many cells at once (for non-linear geometry mappings).
+
+        :param numpy.ndarray lc: (M,nParam) initial guess (modified in-place)
+        :return: (converged,lc); converged is (M,) boolean array
+        :rtype: (numpy.ndarray,numpy.ndarray)
+        """
+        nParam = lc.shape[1]
+        X, p = vertCoords[:, :, :nParam], points[:, :nParam]
+        # absolute tolerance relative to the cell size
+        tol = relTol*np.max(np.max(X, axis=1)-np.min(X, axis=1), axis=1)
+        conv = np.zeros(lc.shape[0], dtype=bool)
+        for nite in range(maxIter+1):
+            r = p-np.einsum('mi,mib->mb', cls.evalNArray(lc), X)
+            conv = np.sqrt(np.sum(r*r, axis=1)) <= tol
+            if nite == maxIter or np.all(conv): break
+            act = np.flatnonzero(~conv)
+            jac = np.einsum('mia,mib->mab', cls.evalDerivativesArray(lc[act]), X[act])
+            # skip degenerate cells (they stay unconverged)
+            ok = cls._nonDegenerateArray_static(X[act], np.linalg.det(jac))
+            act, jac = act[ok], jac[ok]
+            lc[act] += np.linalg.solve(np.swapaxes(jac, 1, 2), r[act][..., np.newaxis])[..., 0]
+        return conv, lc
+
     @classmethod
     def getGeometryType(cls) -> CGT:
         """
@@ -260,6 +372,39 @@ class Triangle_2d_lin(Cell):
 
         return l1, l2, l3
 
+    @classmethod
+    def glob2locArray(cls, vertCoords, points):
+        """
+        See :func:`Cell.glob2locArray`; local coordinates are area coordinates, as in :obj:`glob2loc`.
+        """
+        x1, x2, x3 = vertCoords[:, 0, 0], vertCoords[:, 1, 0], vertCoords[:, 2, 0]
+        y1, y2, y3 = vertCoords[:, 0, 1], vertCoords[:, 1, 1], vertCoords[:, 2, 1]
+        px, py = points[:, 0], points[:, 1]
+        area2 = x2 * y3 + x1 * y2 + y1 * x3 - x2 * y1 - x3 * y2 - x1 * y3
+        # zero-area cells contain no point (and would divide by zero)
+        ok = cls._nonDegenerateArray_static(vertCoords[:, :, :2], area2)
+        area2 = np.where(ok, area2, 1.)
+        lc = np.stack([
+            ( ( x2 * y3 - x3 * y2 ) + ( y2 - y3 ) * px + ( x3 - x2 ) * py ) / area2,
+            ( ( x3 * y1 - x1 * y3 ) + ( y3 - y1 ) * px + ( x1 - x3 ) * py ) / area2,
+            ( ( x1 * y2 - x2 * y1 ) + ( y1 - y2 ) * px + ( x2 - x1 ) * py ) / area2
+        ], axis=-1)
+        return ok & np.all((lc >= -tolerance) & (lc <= 1.0+tolerance), axis=-1), lc
+
+    @classmethod
+    def evalNArray(cls, lc):
+        """
+        See :func:`Cell.evalNArray`
+        """
+        return np.stack([lc[:, 0], lc[:, 1], 1.-lc[:, 0]-lc[:, 1]], axis=-1)
+
+    @classmethod
+    def evalDerivativesArray(cls, lc):
+        """
+        See :func:`Cell.evalDerivativesArray`
+        """
+        return np.broadcast_to(np.array([[1., 0.], [0., 1.], [-1., -1.]]), (lc.shape[0], 3, 2))
+
     def loc2glob(self, lc):
         """
         Converts local (parametric) coordinates to global ones.
@@ -411,6 +556,37 @@ class Triangle_2d_quad(Cell):
 
         return np.array([lcoords_guess[0], lcoords_guess[1], 1.0 - lcoords_guess[0] - lcoords_guess[1]])
 
+    @classmethod
+    def glob2locArray(cls, vertCoords, points):
+        """
+        See :func:`Cell.glob2locArray`; local coordinates are area coordinates, as in :obj:`glob2loc`. Points for which the Newton-Raphson iteration does not converge are reported as outside.
+        """
+        conv, lc = cls._glob2locNewtonArray(vertCoords, points, np.zeros((points.shape[0], 2)))
+        lc = np.concatenate([lc, 1.-np.sum(lc, axis=-1, keepdims=True)], axis=-1)
+        return conv & np.all((lc >= -tolerance) & (lc <= 1.0+tolerance), axis=-1), lc
+
+    @classmethod
+    def evalNArray(cls, lc):
+        """
+        See :func:`Cell.evalNArray`
+        """
+        l1, l2 = lc[:, 0], lc[:, 1]
+        l3 = 1.0-l1-l2
+        return np.stack([(2.*l1-1.)*l1, (2.*l2-1.)*l2, (2.*l3-1.)*l3, 4.*l1*l2, 4.*l2*l3, 4.*l3*l1], axis=-1)
+
+    @classmethod
+    def evalDerivativesArray(cls, lc):
+        """
+        See :func:`Cell.evalDerivativesArray`
+        """
+        l1, l2 = lc[:, 0], lc[:, 1]
+        l3 = 1.0-l1-l2
+        z = np.zeros_like(l1)
+        return np.stack([
+            np.stack([4.*l1-1., z, -(4.*l3-1.), 4.*l2, -4.*l2, 4.*l3-4.*l1], axis=-1),
+            np.stack([z, 4.*l2-1., -(4.*l3-1.), 4.*l1, 4.*l3-4.*l2, -4.*l1], axis=-1)
+        ], axis=-1)
+
     @pydantic.validate_call
     def loc2glob(self, lc: NDArr23) -> NDArr2:
         """
@@ -712,6 +888,33 @@ class Quad_2d_lin(Cell):
                 inside = False
         return inside, answer
 
+    @classmethod
+    def glob2locArray(cls, vertCoords, points):
+        """
+        See :func:`Cell.glob2locArray`; only the first two coordinates are used, as in :obj:`glob2loc`. Local coordinates are found by Newton-Raphson iteration (instead of solving the quadratic equation), points for which it does not converge are reported as outside.
+        """
+        conv, lc = cls._glob2locNewtonArray(vertCoords, points, np.zeros((points.shape[0], 2)))
+        return conv & np.all((lc >= -1.-tolerance) & (lc <= 1.+tolerance), axis=-1), lc
+
+    @classmethod
+    def evalNArray(cls, lc):
+        """
+        See :func:`Cell.evalNArray`
+        """
+        k, e = lc[:, 0], lc[:, 1]
+        return 0.25*np.stack([(1.+k)*(1.+e), (1.-k)*(1.+e), (1.-k)*(1.-e), (1.+k)*(1.-e)], axis=-1)
+
+    @classmethod
+    def evalDerivativesArray(cls, lc):
+        """
+        See :func:`Cell.evalDerivativesArray`
+        """
+        k, e = lc[:, 0], lc[:, 1]
+        return 0.25*np.stack([
+            np.stack([1.+e, -(1.+e), -(1.-e), 1.-e], axis=-1),
+            np.stack([1.+k, 1.-k, -(1.-k), -(1.+k)], axis=-1)
+        ], axis=-1)
+
     @pydantic.validate_call
     def loc2glob(self, lc: NDArr2) -> NDArr23:
         """
@@ -863,6 +1066,43 @@ class Tetrahedron_3d_lin(Cell):
 
         return l1, l2, l3, l4
 
+    @classmethod
+    def glob2locArray(cls, vertCoords, points):
+        """
+        See :func:`Cell.glob2locArray`; local coordinates are volume coordinates, as in :obj:`glob2loc`.
+        """
+        # barycentric coordinates by solving T·(l2,l3,l4)=p-c1 with T=[c2-c1,c3-c1,c4-c1] for all cells at once
+        c1 = vertCoords[:, 0, :3]
+        T = np.stack([vertCoords[:, i, :3]-c1 for i in (1, 2, 3)], axis=-1)
+        # zero-volume cells contain no point (a singular matrix would make solve fail for all cells)
+        ok = cls._nonDegenerateArray_static(vertCoords[:, :, :3], np.linalg.det(T))
+        T = np.where(ok[:, np.newaxis, np.newaxis], T, np.eye(3))
+        l234 = np.linalg.solve(T, (points[:, :3]-c1)[..., np.newaxis])[..., 0]
+        lc = np.concatenate([1.0-np.sum(l234, axis=-1, keepdims=True), l234], axis=-1)
+        return ok & np.all((lc >= -tolerance) & (lc <= 1.0+tolerance), axis=-1), lc
+
+    @classmethod
+    def evalNArray(cls, lc):
+        """
+        See :func:`Cell.evalNArray`
+        """
+        return np.stack([lc[:, 0], lc[:, 1], lc[:, 2], 1.-lc[:, 0]-lc[:, 1]-lc[:, 2]], axis=-1)
+
+    @classmethod
+    def evalDerivativesArray(cls, lc):
+        """
+        See :func:`Cell.evalDerivativesArray`
+        """
+        return np.broadcast_to(np.array([[1., 0., 0.], [0., 1., 0.], [0., 0., 1.], [-1., -1., -1.]]), (lc.shape[0], 4, 3))
+
+    @classmethod
+    def getTransformationJacobianArray(cls, vertCoords, lc):
+        """
+        See :func:`Cell.getTransformationJacobianArray`; same sign convention as :obj:`getTransformationJacobian`.
+        """
+        c1 = vertCoords[:, 0, :3]
+        return np.linalg.det(np.stack([vertCoords[:, i, :3]-c1 for i in (1, 2, 3)], axis=1))
+
     def loc2glob(self, lc: NDArr4) -> NDArr3:
         """
         Converts local (parametric) coordinates to global ones
@@ -1061,6 +1301,37 @@ class Brick_3d_lin(Cell):
         # inside
         return 1, np.array(answer)
 
+    @classmethod
+    def glob2locArray(cls, vertCoords, points):
+        """
+        See :func:`Cell.glob2locArray`; points for which the Newton-Raphson iteration does not converge are reported as outside.
+        """
+        conv, lc = cls._glob2locNewtonArray(vertCoords, points, np.zeros((points.shape[0], 3)))
+        return conv & np.all((lc >= -1.-tolerance) & (lc <= 1.+tolerance), axis=-1), lc
+
+    @classmethod
+    def evalNArray(cls, lc):
+        """
+        See :func:`Cell.evalNArray`
+        """
+        u, v, w = lc[:, 0], lc[:, 1], lc[:, 2]
+        return 0.125*np.stack([
+            (1.-u)*(1.-v)*(1.+w), (1.-u)*(1.+v)*(1.+w), (1.+u)*(1.+v)*(1.+w), (1.+u)*(1.-v)*(1.+w),
+            (1.-u)*(1.-v)*(1.-w), (1.-u)*(1.+v)*(1.-w), (1.+u)*(1.+v)*(1.-w), (1.+u)*(1.-v)*(1.-w)
+        ], axis=-1)
+
+    @classmethod
+    def evalDerivativesArray(cls, lc):
+        """
+        See :func:`Cell.evalDerivativesArray`
+        """
+        u, v, w = lc[:, 0], lc[:, 1], lc[:, 2]
+        return 0.125*np.stack([
+            np.stack([-(1.-v)*(1.+w), -(1.+v)*(1.+w), (1.+v)*(1.+w), (1.-v)*(1.+w), -(1.-v)*(1.-w), -(1.+v)*(1.-w), (1.+v)*(1.-w), (1.-v)*(1.-w)], axis=-1),
+            np.stack([-(1.-u)*(1.+w), (1.-u)*(1.+w), (1.+u)*(1.+w), -(1.+u)*(1.+w), -(1.-u)*(1.-w), (1.-u)*(1.-w), (1.+u)*(1.-w), -(1.+u)*(1.-w)], axis=-1),
+            np.stack([(1.-u)*(1.-v), (1.-u)*(1.+v), (1.+u)*(1.+v), (1.+u)*(1.-v), -(1.-u)*(1.-v), -(1.-u)*(1.+v), -(1.+u)*(1.+v), -(1.+u)*(1.-v)], axis=-1)
+        ], axis=-1)
+
     @pydantic.validate_call
     def _evalN(self, lc: NDArr3) -> NDArr8:
         """
@@ -0,0 +1,320 @@
+from . import apierror
+from . import bbox
+from . import vertex
+from . import cell
+from . import util
+from . import cellgeometrytype
+from .mesh import Mesh, registerMesh
+from .heavydata import HeavyConvertible
+import typing
+import numpy as np
+import Pyro5.api
+import pydantic
+
+
+@Pyro5.api.expose
+class CompactUnstructuredMesh(Mesh, HeavyConvertible):
+    """
+    Unstructured mesh with mixed topology, stored in flat arrays rather than lists of :obj:`mupif.vertex.Vertex` and :obj:`mupif.cell.Cell` objects (as :obj:`mupif.mesh.UnstructuredMesh` does):
+
+    * vertexCoords: (nVertices,dim) array of vertex coordinates
+    * cellTypes: (nCells,) array of cell geometry types (:obj:`mupif.cellgeometrytype.CGT` values)
+    * cellOffsets: (nCells+1,) array of offsets into cellConnectivity (CSR layout); vertices of i-th cell are ``cellConnectivity[cellOffsets[i]:cellOffsets[i+1]]``
+    * cellConnectivity: array of vertex numbers of all cells
+    * vertexLabels, cellLabels: optional arrays of labels (labels are equal to numbers if not given)
+
+    Vertex and Cell objects are only created when requested via :obj:`getVertex` and :obj:`getCell`. Arrays are sent over Pyro as raw buffers and stored as plain datasets in HDF5.
+
+    .. automethod:: __init__
+    """
+    vertexCoords: typing.Any = pydantic.Field(default_factory=lambda: np.empty((0, 3), dtype=np.float64))
+    cellTypes: typing.Any = pydantic.Field(default_factory=lambda: np.empty((0,), dtype=np.int64))
+    cellOffsets: typing.Any = pydantic.Field(default_factory=lambda: np.zeros((1,), dtype=np.int64))
+    cellConnectivity: typing.Any = pydantic.Field(default_factory=lambda: np.empty((0,), dtype=np.int64))
+    vertexLabels: typing.Any = None
+    cellLabels: typing.Any = None
+
+    npyArrays: typing.ClassVar[bool] = True
+    _arrayDtypes: typing.ClassVar[typing.Dict[str, type]] = dict(vertexCoords=np.float64, cellTypes=np.int64, cellOffsets=np.int64, cellConnectivity=np.int64, vertexLabels=np.int64, cellLabels=np.int64)
+
+    @pydantic.model_validator(mode='before')
+    @classmethod
+    def convert_to_np_array(cls, vals):
+        for f, dtype in cls._arrayDtypes.items():
+            if vals.get(f, None) is not None:
+                vals[f] = CompactUnstructuredMesh._readOnly_static(vals[f], dtype)
+        return vals
+
+    @staticmethod
+    def _readOnly_static(arr, dtype):
+        'Return read-only contiguous copy of *arr* (the caller\'s array is never frozen), so that cached data cannot be invalidated by in-place modification.'
+        ret = np.ascontiguousarray(arr, dtype=dtype)
+        if ret is arr or ret.base is not None: ret = ret.copy()
+        ret.flags.writeable = False
+        return ret
+
+    @pydantic.model_validator(mode='after')
+    def check_consistency(self):
+        nc = self.cellTypes.shape[0]
+        if self.cellOffsets.shape != (nc+1,):
+            raise ValueError(f'cellOffsets must have {nc+1} items (number of cells + 1), not {self.cellOffsets.shape[0]}.')
+        if self.cellOffsets[-1] != self.cellConnectivity.shape[0]:
+            raise ValueError(f'cellOffsets[-1]={self.cellOffsets[-1]} does not match cellConnectivity length {self.cellConnectivity.shape[0]}.')
+        if self.vertexLabels is not None and self.vertexLabels.shape != (self.vertexCoords.shape[0],):
+            raise ValueError('vertexLabels must have the same length as vertexCoords.')
+        if self.cellLabels is not None and self.cellLabels.shape != (nc,):
+            raise ValueError('cellLabels must have the same length as cellTypes.')
+        return self
+
+    def __setattr__(self, name, value):
+        # assigned arrays are read-only as well (the mesh is modified only by assignment, see :obj:`_setDirty`)
+        if name in self._arrayDtypes and value is not None: value = CompactUnstructuredMesh._readOnly_static(value, self._arrayDtypes[name])
+        super().__setattr__(name, value)
+
+    def _setDirty(self):
+        super()._setDirty()
+        self._vertexDict = None
+        self._cellDict = None
+
+    def __hash__(self): return id(self)
+
+    @staticmethod
+    def makeFromArrays(*, vertexCoords, cellTypes, cellConnectivity, unit=None):
+        """
+        Create new instance from vertex coordinates and per-cell connectivity.
+
+        :param vertexCoords: (nVertices,dim) array of coordinates
+        :param cellTypes: (nCells,) cell geometry types
+        :param cellConnectivity: sequence of per-cell vertex numbers, or (nCells,maxVerts) array padded with -1 (as returned by :obj:`mupif.mesh.Mesh.getCells`)
+        """
+        cellTypes = np.asarray(cellTypes, dtype=np.int64)
+        if isinstance(cellConnectivity, np.ndarray) and cellConnectivity.ndim == 2:
+            nVerts = np.array([cellgeometrytype.cgt2numVerts[t] for t in cellTypes], dtype=np.int64)
+            conn = cellConnectivity[np.arange(cellConnectivity.shape[1]) < nVerts[:, np.newaxis]]
+        else:
+            nVerts = np.array([len(c) for c in cellConnectivity], dtype=np.int64)
+            conn = np.fromiter((v for c in cellConnectivity for v in c), dtype=np.int64, count=np.sum(nVerts))
+        offsets = np.zeros(len(cellTypes)+1, dtype=np.int64)
+        np.cumsum(nVerts, out=offsets[1:])
+        return CompactUnstructuredMesh(vertexCoords=vertexCoords, cellTypes=cellTypes, cellOffsets=offsets, cellConnectivity=conn, unit=unit)
+
+    @staticmethod
+    def makeFromMesh(mesh: Mesh):
+        """
+        Create new instance from any other :obj:`mupif.mesh.Mesh` (labels are not preserved).
+        """
+        vc, ct, cc = mesh._getGeometryArrays()
+        return CompactUnstructuredMesh.makeFromArrays(vertexCoords=vc, cellTypes=ct, cellConnectivity=cc, unit=mesh.unit)
+
+    @staticmethod
+    def makeFromMeshioPointsCells(points, cells):
+        cgt = cellgeometrytype
+        types = np.concatenate([np.full(len(block.data), cgt.meshioName2cgt[block.type], dtype=np.int64) for block in cells]) if cells else []
+        conn = np.concatenate([np.asarray(block.data, dtype=np.int64).ravel() for block in cells]) if cells else np.empty((0,), dtype=np.int64)
+        nVerts = np.concatenate([np.full(len(block.data), block.data.shape[1], dtype=np.int64) for block in cells]) if cells else np.empty((0,), dtype=np.int64)
+        offsets = np.zeros(len(nVerts)+1, dtype=np.int64)
+        np.cumsum(nVerts, out=offsets[1:])
+        return CompactUnstructuredMesh(vertexCoords=points, cellTypes=types, cellOffsets=offsets, cellConnectivity=conn)
+
+    def copy(self) -> typing.Self:
+        """
+        See :func:`Mesh.copy`
+        """
+        return CompactUnstructuredMesh(
+            vertexCoords=self.vertexCoords.copy(), cellTypes=self.cellTypes.copy(), cellOffsets=self.cellOffsets.copy(), cellConnectivity=self.cellConnectivity.copy(),
+            vertexLabels=(None if self.vertexLabels is None else self.vertexLabels.copy()),
+            cellLabels=(None if self.cellLabels is None else self.cellLabels.copy()),
+            unit=self.unit
+        )
+
+    def getNumberOfVertices(self) -> int:
+        """
+        See :func:`Mesh.getNumberOfVertices`
+        """
+        return self.vertexCoords.shape[0]
+
+    def getNumberOfCells(self) -> int:
+        """
+        See :func:`Mesh.getNumberOfCells`
+        """
+        return self.cellTypes.shape[0]
+
+    def getVertex(self, i: int) -> vertex.Vertex:
+        """
+        See :func:`Mesh.getVertex`; the :obj:`mupif.vertex.Vertex` object is created on demand.
+        """
+        return vertex.Vertex(number=i, label=(None if self.vertexLabels is None else int(self.vertexLabels[i])), coords=tuple(self.vertexCoords[i]))
+
+    def getVertices(self):
+        """
+        See :func:`Mesh.getVertices`; returns the underlying array (not a copy).
+        """
+        return self.vertexCoords
+
+    def getCell(self, i) -> cell.Cell:
+        """
+        See :func:`Mesh.getCell`; the :obj:`mupif.cell.Cell` object is created on demand.
+        """
+        return cell.Cell.getClassForCellGeometryType(self.cellTypes[i])(
+            mesh=self,
+            number=i,
+            label=(None if self.cellLabels is None else int(self.cellLabels[i])),
+            vertices=tuple(int(v) for v in self.cellConnectivity[self.cellOffsets[i]:self.cellOffsets[i+1]])
+        )
+
+    def getCells(self):
+        """
+        See :func:`Mesh.getCells`; computed from the CSR arrays without creating Cell objects.
+        """
+        nc = self.getNumberOfCells()
+        nVerts = np.diff(self.cellOffsets)
+        mnv = (np.max(nVerts) if nc > 0 else 0)
+        cc = np.full(shape=(nc, mnv), fill_value=-1, dtype=np.int64)
+        rows = np.repeat(np.arange(nc), nVerts)
+        cols = np.arange(self.cellConnectivity.shape[0])-np.repeat(self.cellOffsets[:-1], nVerts)
+        cc[rows, cols] = self.cellConnectivity
+        return self.cellTypes.copy(), cc
+
+    def getGlobalBBox(self):
+        return bbox.BBox(tuple(np.min(self.vertexCoords, axis=0)), tuple(np.max(self.vertexCoords, axis=0)))
+
+    def toMeshioPointsCells(self):
+        ret = []
+        for t in np.unique(self.cellTypes):
+            ii = np.flatnonzero(self.cellTypes == t)
+            nv = cellgeometrytype.cgt2numVerts[t]
+            conn = self.cellConnectivity[self.cellOffsets[ii][:, np.newaxis]+np.arange(nv)]
+            ret.append((cellgeometrytype.cgt2meshioName[t], conn))
+        return self.vertexCoords, ret
+
+    def vertexLabel2Number(self, label: int) -> int:
+        """
+        See :func:`Mesh.vertexLabel2Number`
+        """
+        if self.vertexLabels is None:
+            if 0 <= label < self.getNumberOfVertices(): return label
+            raise KeyError(label)
+        if self._vertexDict is None:
+            self._vertexDict = dict((int(l), i) for i, l in reversed(list(enumerate(self.vertexLabels))))
+        return self._vertexDict[label]
+
+    def cellLabel2Number(self, label: int) -> int:
+        """
+        See :func:`Mesh.cellLabel2Number`
+        """
+        if self.cellLabels is None:
+            if 0 <= label < self.getNumberOfCells(): return label
+            raise KeyError(label)
+        if self._cellDict is None:
+            self._cellDict = dict((int(l), i) for i, l in reversed(list(enumerate(self.cellLabels))))
+        return self._cellDict[label]
+
+    def dataDigest(self):
+        """Internal function returning hash digest of all internal data, for the purposes of identity test. Same as :obj:`mupif.mesh.UnstructuredMesh.dataDigest` for identical meshes. The digest is cached until an array is assigned (see :obj:`_setDirty`); arrays are read-only, so they cannot be modified in-place."""
+        if self._dataDigest is None:
+            mvc, (mct, mci) = self.getVertices(), self.getCells()
+            self._dataDigest = util.sha1digest([mvc, mct, mci])
+        return self._dataDigest
+
+    @staticmethod
+    def _labels_static(mesh: Mesh):
+        'Return arrays of vertex and cell labels of *mesh* (numbers are used where labels are not given).'
+        if isinstance(mesh, CompactUnstructuredMesh):
+            return tuple((np.arange(n, dtype=np.int64) if ll is None else ll) for ll, n in ((mesh.vertexLabels, mesh.getNumberOfVertices()), (mesh.cellLabels, mesh.getNumberOfCells())))
+        return tuple(np.fromiter(((i if e.label is None else e.label) for i, e in enumerate(ee)), dtype=np.int64) for ee in (mesh.vertices(), mesh.cells()))
+
+    @pydantic.validate_call
+    def merge(self, mesh: Mesh):
+        """
+        Merges receiver with a given mesh, based on vertex and cell labels (as :obj:`mupif.mesh.UnstructuredMesh.merge`; labels are equal to numbers if not given). Vertices and cells of *mesh* with labels not present in the receiver are appended, with connectivity translated through vertex labels; numbering of existing entities is not changed.
+
+        :param Mesh mesh: Source mesh for merging
+        """
+        if mesh.getNumberOfVertices() == 0 and mesh.getNumberOfCells() == 0: return
+        vl0, cl0 = self._labels_static(self)
+        vl1, cl1 = self._labels_static(mesh)
+        vc1, (ct1, cc1) = np.asarray(mesh.getVertices()), mesh.getCells()
+        if vc1.shape[0] > 0 and self.getNumberOfVertices() > 0 and vc1.shape[1] != self.vertexCoords.shape[1]:
+            raise ValueError(f'Mesh dimensions differ ({self.vertexCoords.shape[1]} vs. {vc1.shape[1]}).')
+        # vertices: map numbers in *mesh* to numbers in the merged mesh
+        newV = ~np.isin(vl1, vl0)
+        vl = np.concatenate((vl0, vl1[newV]))
+        order = np.argsort(vl, kind='stable')
+        vmap = order[np.searchsorted(vl[order], vl1)]
+        # cells: append those with new labels
+        newC = ~np.isin(cl1, cl0)
+        cc1 = cc1[newC]
+        nVerts = np.array([cellgeometrytype.cgt2numVerts[t] for t in ct1[newC]], dtype=np.int64)
+        conn = vmap[cc1[np.arange(cc1.shape[1]) < nVerts[:, np.newaxis]]]
+        cl = np.concatenate((cl0, cl1[newC]))
+        vc0 = (self.vertexCoords if self.getNumberOfVertices() > 0 else self.vertexCoords.reshape(0, vc1.shape[1]))
+        self.vertexCoords = np.concatenate((vc0, vc1[newV]))
+        self.cellTypes = np.concatenate((self.cellTypes, ct1[newC]))
+        self.cellOffsets = np.concatenate((self.cellOffsets, self.cellOffsets[-1]+np.cumsum(nVerts)))
+        self.cellConnectivity = np.concatenate((self.cellConnectivity, conn))
+        self.vertexLabels = (None if np.array_equal(vl, np.arange(len(vl))) else vl)
+        self.cellLabels = (None if np.array_equal(cl, np.arange(len(cl))) else cl)
+
+    def getVTKRepresentation(self):
+        """
+        See :obj:`mupif.mesh.UnstructuredMesh.getVTKRepresentation`. Requires pyvtk module.
+        """
+        import pyvtk
+        cgt = cellgeometrytype
+        kw = dict(hexahedron=[], tetra=[], quad=[], triangle=[])
+        names = {cgt.CGT_TRIANGLE_1: 'triangle', cgt.CGT_QUAD: 'quad', cgt.CGT_TETRA: 'tetra', cgt.CGT_HEXAHEDRON: 'hexahedron'}
+        for t in np.unique(self.cellTypes):
+            ii = np.flatnonzero(self.cellTypes == t)
+            conn = self.cellConnectivity[self.cellOffsets[ii][:, np.newaxis]+np.arange(cgt.cgt2numVerts[t])]
+            if t in names: kw[names[t]] += [tuple(int(v) for v in c) for c in conn]
+            elif t == cgt.CGT_TRIANGLE_2:
+                # no direct support in pyvtk, map it to linear triangles
+                for sub in ((0, 3, 5), (1, 4, 3), (2, 5, 4), (3, 4, 5)): kw['triangle'] += [tuple(int(v) for v in c) for c in conn[:, sub]]
+            else: raise apierror.APIError(f'Unsupported cell geometry type encountered: {t}')
+        return pyvtk.UnstructuredGrid([tuple(v) for v in self.vertexCoords.tolist()], **kw)
+
+    GRP_ARRAYS: typing.ClassVar[typing.Tuple[str, ...]] = ('vertex_coords', 'cell_types', 'cell_offsets', 'cell_connectivity')
+
+    def asHdf5Object(self, parentgroup, heavyMesh=False):
+        """
+        Return the instance as HDF5 object (*heavyMesh* is ignored). Complementary to :obj:`makeFromHdf5group`.
+        """
+        mhash = self.dataDigest()
+        if mhash in parentgroup:
+            return parentgroup[mhash]
+        gg = parentgroup.create_group(name=mhash)
+        self.toHdf5Group(gg)
+        return gg
+
+    def copyToHeavy(self, *, h5grp):
+        return self.asHdf5Object(parentgroup=h5grp)
+
+    def toHdf5Group(self, group):
+        for name, data in zip(self.GRP_ARRAYS, (self.vertexCoords, self.cellTypes, self.cellOffsets, self.cellConnectivity)):
+            group[name] = data
+        if self.vertexLabels is not None: group['vertex_labels'] = self.vertexLabels
+        if self.cellLabels is not None: group['cell_labels'] = self.cellLabels
+        group.attrs['unit'] = ('' if self.unit is None else str(self.unit))
+        group.attrs['__class__'] = self.__class__.__name__
+        group.attrs['__module__'] = self.__class__.__module__
+        group.attrs['dataDigest'] = self.dataDigest()
+        registerMesh(self, key=self.hdf5RegistryKey(group))
+
+    @classmethod
+    def isHere(klass, *, h5grp) -> bool:
+        if h5grp.attrs.get('__class__', None) != klass.__name__: return False
+        for ds in klass.GRP_ARRAYS:
+            if ds not in h5grp: raise IOError(f'Group {ds} missing (required for {klass.__name__}).')
+        return True
+
+    @classmethod
+    def makeFromHdf5group(klass, h5grp):
+        assert klass.isHere(h5grp=h5grp)
+        vc, ct, co, cc = [np.array(h5grp[ds]) for ds in klass.GRP_ARRAYS]
+        unit = h5grp.attrs.get('unit', '')
+        return klass(
+            vertexCoords=vc, cellTypes=ct, cellOffsets=co, cellConnectivity=cc,
+            vertexLabels=(np.array(h5grp['vertex_labels']) if 'vertex_labels' in h5grp else None),
+            cellLabels=(np.array(h5grp['cell_labels']) if 'cell_labels' in h5grp else None),
+            unit=(unit if unit else None)
+        )
@@ -297,13 +297,15 @@ class Field(FieldBase,HeavyConvertible):
     def evaluate(
             self,
             positions: typing.Union[
-                NDArr3,NDArr2,NDArr3xX,NDArr2xX,
+                NDArr3,NDArr2,NDArrXx3,NDArrXx2,NDArr3xX,NDArr2xX,
                 Quantity,
             ],
             eps: float = 0.0):
         """
         Evaluates the receiver at given spatial position(s).
 
+        Many positions (passed as (N,dim) array, or a list of tuples) are evaluated in one batch, see :obj:`_evaluateBatch`.
+
         :param positions: 1D/2D/3D position vectors
         :type positions: tuple, a list of tuples
         :param float eps: Optional tolerance for probing whether the point belongs to a cell (should really not be used)
@@ -311,16 +313,30 @@ class Field(FieldBase,HeavyConvertible):
         :rtype: units.Quantity with given value or tuple of values
         """
         # test if positions is a list of positions
+        if isinstance(positions, Quantity) and positions.ndim>1:
+            if self.mesh.unit is None:
+                raise RuntimeError(f'position has unit "{positions.unit}" but mesh has no unit defined.')
+            positions = positions.to(self.mesh.unit).value
         if isinstance(positions, list) or (isinstance(positions,np.ndarray) and positions.ndim>1):
-            ans = []
-            for pos in positions:
-                ans.append(self._evaluate(pos, eps))
-            return Quantity(value=ans, unit=self.getUnit())
+            return Quantity(value=self._evaluateBatch(np.asarray(positions, dtype=np.float64), eps), unit=self.getUnit())
         else:
             # single position passed
             # print(f'{positions.shape=} {positions.ndim=}')
             return Quantity(value=self._evaluate(positions, eps), unit=self.getUnit())
 
+    def _evaluateBatch(self, points, eps):
+        """
+        Evaluates the receiver at many spatial positions at once, via a one-off :obj:`mupif.transferoperator.TransferOperator` (see there for details). Use the operator directly to evaluate many fields at the same positions.
+
+        :param numpy.ndarray points: (N,dim) array of positions
+        :param float eps: Optional tolerance
+        :return: (N,nComp) array of values
+        :rtype: numpy.ndarray
+        """
+        from .transferoperator import TransferOperator
+        offsets, cols, weights = TransferOperator.makeMatrix_static(self.mesh, self.fieldType, points, eps)
+        return TransferOperator.matVec_static(offsets, cols, weights, self.value)
+
     @pydantic.validate_call
     def _evaluate(self, position: NDArr123|Quantity, eps):
         """
@@ -395,6 +411,22 @@ class Field(FieldBase,HeavyConvertible):
             # log.error('Field::evaluate - no source cell found for position ' + str(position))
             raise ValueError(f'No source cell found for {position=}')  # + str(position))
 
+    def iterRecordBlocks(self, blockSize=None):
+        """
+        Iterate over field values (vertex values for vertex-based fields, cell values for cell-based fields) in blocks of consecutive records. For HDF5-backed quantities (with *heavy=True* in :obj:`makeFromHdf5`), blocks are read from the file one by one, so that fields larger than memory can be processed.
+
+        :param int blockSize: number of records per block (default: whole in-memory array, or block size determined from HDF5 chunking)
+        :return: iterator of (index of the first record, array of records in the block)
+        :rtype: iterator of (int, numpy.ndarray)
+        """
+        if hasattr(self.quantity, 'iterBlocks'):
+            yield from self.quantity.iterBlocks(blockSize)
+            return
+        value = np.asarray(self.value)
+        if blockSize is None: blockSize = max(1, len(value))
+        for i0 in range(0, len(value), blockSize):
+            yield i0, value[i0:i0+blockSize]
+
     def getVertexValue(self, vertexID):
         """
         Returns the value associated with a given vertex.
@@ -437,16 +469,18 @@ class Field(FieldBase,HeavyConvertible):
             raise TypeError("Field::merge: fieldType of receiver and parameter is different")
         if self.unit != field.unit:
             raise ValueError('fields have different units (merge is currently not unit-aware; this limitation will be remove with astropy.units)')
+        # values are copied block-wise, so that HDF5-backed fields are not read record-by-record
+        dtype = self.value.dtype if isinstance(self.value, np.ndarray) else np.float64
         if self.fieldType == FieldType.FT_vertexBased:
-            vv = np.zeros_like(self.value, shape=(mesh.getNumberOfVertices(), self.getRecordSize()))
+            vv = np.zeros(shape=(mesh.getNumberOfVertices(), self.getRecordSize()), dtype=dtype)
             for f in self, field:
-                for v in range(f.mesh.getNumberOfVertices()):
-                    vv[mesh.vertexLabel2Number(f.mesh.getVertex(v).label)] = f.getRecord(v)
+                ix = np.array([mesh.vertexLabel2Number(f.mesh.getVertex(v).label) for v in range(f.mesh.getNumberOfVertices())], dtype=np.int64)
+                for i0, blk in f.iterRecordBlocks(): vv[ix[i0:i0+len(blk)]] = np.reshape(blk, (len(blk), -1))
         else:
-            vv = np.zeros_like(self.value, shape=(mesh.getNumberOfCells(), self.getRecordSize()))
+            vv = np.zeros(shape=(mesh.getNumberOfCells(), self.getRecordSize()), dtype=dtype)
             for f in self, field:
-                for v in range(f.mesh.getNumberOfCells()):
-                    vv[mesh.cellLabel2Number(f.mesh.getCell(v).label)] = f.getRecord(v)
+                ix = np.array([mesh.cellLabel2Number(f.mesh.getCell(v).label) for v in range(f.mesh.getNumberOfCells())], dtype=np.int64)
+                for i0, blk in f.iterRecordBlocks(): vv[ix[i0:i0+len(blk)]] = np.reshape(blk, (len(blk), -1))
 
         self.mesh = mesh
         self.quantity = Quantity(value=vv, unit=self.quantity.unit)
@@ -685,31 +719,70 @@ class Field(FieldBase,HeavyConvertible):
             hdf.close()  # necessary for windows
         return fieldIndex
 
-    def toHdf5Group(self, fieldGrp, meshLink=None):
+    @staticmethod
+    def _hdf5Chunks_static(shape, chunks):
+        """
+        Return HDF5 chunk shape for dataset of *shape* (records along the first axis, or along the second axis for time series).
+
+        :param chunks: True for automatic chunking (about 1 MB per chunk, whole records), None/False for contiguous layout, or explicit chunk shape
+        """
+        if chunks is None or chunks is False: return None
+        if chunks is not True: return tuple(chunks)
+        recAxis = len(shape)-2
+        recBytes = 8*int(np.prod(shape[recAxis+1:], dtype=np.int64))
+        ret = list(shape)
+        ret[:recAxis] = [1]*recAxis
+        ret[recAxis] = max(1, min(shape[recAxis], 2**20//max(1, recBytes)))
+        return tuple(ret)
+
+    def _recordCount(self):
+        if self.fieldType == FieldType.FT_vertexBased: return self.getMesh().getNumberOfVertices()
+        elif self.fieldType == FieldType.FT_cellBased: return self.getMesh().getNumberOfCells()
+        raise RuntimeError("Unknown fieldType %d." % self.fieldType)
+
+    def _checkRecordShape(self):
+        """
+        Raise ValueError unless there is one record per vertex (cell, for cell-based fields) and records have the number of components given by :obj:`getRecordSize` (e.g. 3 for vectors).
+        """
+        num, recSize = self._recordCount(), self.getRecordSize()
+        shape = tuple(self.quantity.shape) if hasattr(self.quantity, 'shape') else np.shape(self.value)
+        if len(shape) == 0 or shape[0] != num: raise ValueError(f'Field has {shape[0] if shape else 0} records, but its mesh has {num} {"vertices" if self.fieldType == FieldType.FT_vertexBased else "cells"} (value shape is {shape}).')
+        if (width := int(np.prod(shape[1:], dtype=np.int64))) != recSize: raise ValueError(f'Field records have {width} components, but {self.valueType.name} field requires {recSize} (value shape is {shape}).')
+
+    def _writeRecords(self, ds, index=(), unit=None):
+        """
+        Write all records to dataset *ds* (at *index* prepended to the record index, for time series), converted to float64 (and to *unit*, if given). In-memory values are written at once, HDF5-backed values block-wise.
+
+        Records are checked by :obj:`_checkRecordShape` first.
+        """
+        self._checkRecordShape()
+        num, recSize = self._recordCount(), self.getRecordSize()
+        for i0, blk in self.iterRecordBlocks():
+            if i0 >= num: break
+            blk = np.asarray(blk, dtype=numpy.float64).reshape(len(blk), recSize)[:num-i0]
+            if unit is not None: blk = Quantity(value=blk, unit=self.getUnit()).to(unit).value
+            ds[index+(slice(i0, i0+len(blk)),)] = blk
+
+    def toHdf5Group(self, fieldGrp, meshLink=None, *, chunks=None, compression=None, compression_opts=None, shuffle=False):
+        """
+        Write the field into HDF5 group *fieldGrp*. Values are written in bulk (block-wise for HDF5-backed fields).
+
+        :param meshLink: link to the mesh group, stored as ``mesh``
+        :param chunks: chunking of the values dataset: None for contiguous layout (unless required by *compression*), True for automatic, or explicit chunk shape
+        :param compression: HDF5 compression filter (e.g. ``'gzip'``, ``'lzf'``), see `h5py.Group.create_dataset <https://docs.h5py.org/en/stable/high/group.html#h5py.Group.create_dataset>`__
+        :param compression_opts: options for the compression filter (e.g. level)
+        :param bool shuffle: use the shuffle filter (improves compression of floats)
+        """
         if meshLink is not None:
             fieldGrp['mesh'] = meshLink
-        fieldGrp.attrs['fieldID'] = self.fieldID.name
-        fieldGrp.attrs['valueType'] = self.valueType
-        # string/bytes may not contain NULL when stored as string in HDF5
-        # see http://docs.h5py.org/en/2.3/strings.html
-        # that's why we cast to opaque type "void" and uncast using tostring before unpickling
-        fieldGrp.attrs['unit'] = numpy.void(pickle.dumps(self.getUnit(), protocol=0))
+        self._writeHdf5Attrs(fieldGrp)
         fieldGrp.attrs['time'] = numpy.void(pickle.dumps(self.time, protocol=0))
-        if self.fieldType == FieldType.FT_vertexBased:
-            val = numpy.empty(shape=(self.getMesh().getNumberOfVertices(), self.getRecordSize()), dtype=numpy.float64)
-            for vert in range(self.getMesh().getNumberOfVertices()):
-                val[vert] = self.getVertexValue(vert).getValue()
-            subGrp = 'vertex_values'
-            fieldGrp[subGrp] = val
-        elif self.fieldType == FieldType.FT_cellBased:
-            # raise NotImplementedError("Saving cell-based fields to HDF5 is not yet implemented.")
-            val = numpy.empty(shape=(self.getMesh().getNumberOfCells(), self.getRecordSize()), dtype=numpy.float64)
-            for cell in range(self.getMesh().getNumberOfCells()):
-                val[cell] = self.getCellValue(cell)
-            subGrp = 'cell_values'
-            fieldGrp[subGrp] = val
-        else:
-            raise RuntimeError("Unknown fieldType %d." % self.fieldType)
+        subGrp = {FieldType.FT_vertexBased: 'vertex_values', FieldType.FT_cellBased: 'cell_values'}.get(self.fieldType, None)
+        if subGrp is None: raise RuntimeError("Unknown fieldType %d." % self.fieldType)
+        shape = (self._recordCount(), self.getRecordSize())
+        if (compression is not None or shuffle) and chunks is None: chunks = True
+        ds = fieldGrp.create_dataset(subGrp, shape=shape, dtype=numpy.float64, chunks=Field._hdf5Chunks_static(shape, chunks), compression=compression, compression_opts=compression_opts, shuffle=shuffle)
+        self._writeRecords(ds)
         if isinstance(self.mesh,uniformmesh.UniformRectilinearMesh):
             import h5py
             src=fieldGrp[subGrp]
@@ -735,21 +808,91 @@ class Field(FieldBase,HeavyConvertible):
         # for compatibility with Hdf5RefQuantity
         fieldGrp[subGrp].attrs['unit'] = str(self.getUnit())
 
+    def _writeHdf5Attrs(self, fieldGrp):
+        fieldGrp.attrs['fieldID'] = self.fieldID.name
+        fieldGrp.attrs['valueType'] = self.valueType
+        # string/bytes may not contain NULL when stored as string in HDF5
+        # see http://docs.h5py.org/en/2.3/strings.html
+        # that's why we cast to opaque type "void" and uncast using tostring before unpickling
+        fieldGrp.attrs['unit'] = numpy.void(pickle.dumps(self.getUnit(), protocol=0))
+
+    def appendToHdf5Group(self, fieldGrp, meshLink=None, *, chunks=True, compression=None, compression_opts=None, shuffle=False):
+        """
+        Append the field as a new time step to time series stored in HDF5 group *fieldGrp*; the series is created with the first call. All time steps share one extendable dataset ``vertex_series`` or ``cell_series`` with shape (steps, records, record size), and times are stored in the ``times`` dataset. Values and times are converted to units of the first step.
+
+        Fields of the series must have the same field ID, value type, field type and number of records (the mesh is assumed to be the same and is only linked with the first step). Use :obj:`makeFromHdf5_groups` with *step* to read a step back.
+
+        :param chunks: chunking of the values (True for automatic, one step per chunk) or explicit chunk shape
+        :param compression: compression filter, see :obj:`toHdf5Group`
+        :param compression_opts: compression filter options
+        :param bool shuffle: use the shuffle filter
+        :return: index of the step appended
+        :rtype: int
+        """
+        subGrp = {FieldType.FT_vertexBased: 'vertex_series', FieldType.FT_cellBased: 'cell_series'}.get(self.fieldType, None)
+        if subGrp is None: raise RuntimeError("Unknown fieldType %d." % self.fieldType)
+        self._checkRecordShape()
+        shape = (self._recordCount(), self.getRecordSize())
+        if subGrp not in fieldGrp:
+            if 'vertex_series' in fieldGrp or 'cell_series' in fieldGrp: raise ValueError(f'{fieldGrp.name}: series of different field type already stored.')
+            if meshLink is not None:
+                fieldGrp['mesh'] = meshLink
+            self._writeHdf5Attrs(fieldGrp)
+            fieldGrp.create_dataset(subGrp, shape=(0,)+shape, maxshape=(None,)+shape, dtype=numpy.float64, chunks=Field._hdf5Chunks_static((1,)+shape, chunks), compression=compression, compression_opts=compression_opts, shuffle=shuffle)
+            # for compatibility with Hdf5RefQuantity
+            fieldGrp[subGrp].attrs['unit'] = str(self.getUnit())
+            fieldGrp.create_dataset('times', shape=(0,), maxshape=(None,), dtype=numpy.float64, chunks=(1024,))
+            fieldGrp['times'].attrs['unit'] = str(self.time.unit if self.time is not None else U.s)
+        ds, times = fieldGrp[subGrp], fieldGrp['times']
+        if ds.shape[1:] != shape: raise ValueError(f'{fieldGrp.name}: series has records of shape {ds.shape[1:]}, field has {shape}.')
+        if fieldGrp.attrs['fieldID'] != self.fieldID.name or fieldGrp.attrs['valueType'] != self.valueType: raise ValueError(f'{fieldGrp.name}: series has different fieldID/valueType ({fieldGrp.attrs["fieldID"]}/{fieldGrp.attrs["valueType"]}).')
+        unit = pickle.loads(fieldGrp.attrs['unit'].tobytes())
+        # check everything before the datasets are resized
+        if unit != self.getUnit(): Quantity(value=0., unit=self.getUnit()).to(unit)
+        t = self.time.to(times.attrs['unit']).value if self.time is not None else numpy.nan
+        step = ds.shape[0]
+        try:
+            ds.resize(step+1, axis=0)
+            self._writeRecords(ds, index=(step,), unit=(unit if unit != self.getUnit() else None))
+            times.resize(step+1, axis=0)
+            times[step] = t
+        except BaseException:
+            # don't leave a partial step behind
+            ds.resize(step, axis=0)
+            times.resize(step, axis=0)
+            raise
+        return step
+
     @staticmethod
-    def makeFromHdf5_groups(*, fieldGrp, meshGrp=None, meshCache=None, heavy=False, h5own=False):
+    def makeFromHdf5_groups(*, fieldGrp, meshGrp=None, meshCache=None, heavy=False, h5own=False, step=None):
+        """
+        Restore field from HDF5 group written by :obj:`toHdf5Group` or :obj:`appendToHdf5Group`.
+
+        :param int step: index of the time step, for groups containing time series (negative indices count from the last step); with *heavy*, the step is accessed through :obj:`mupif.heavydata.Hdf5RefQuantity` with :obj:`mupif.heavydata.Hdf5RefQuantity.step`, otherwise it is read into memory
+        """
         import h5py
         f=fieldGrp
+        series = ('vertex_series' in f or 'cell_series' in f)
+        if series and step is None: raise ValueError(f'{f.name}: time series stored, step must be given.')
+        if not series and step is not None: raise ValueError(f'{f.name}: no time series stored, step must not be given.')
         if 'vertex_values' in f:
             fieldType, valDs = FieldType.FT_vertexBased, f['vertex_values']
         elif 'cell_values' in f:
             fieldType, valDs = FieldType.FT_cellBased, f['cell_values']
+        elif 'vertex_series' in f:
+            fieldType, valDs = FieldType.FT_vertexBased, f['vertex_series']
+        elif 'cell_series' in f:
+            fieldType, valDs = FieldType.FT_cellBased, f['cell_series']
         else:
             raise ValueError("HDF5/mupif format error: unable to determine field type.")
-        fieldID, valueType, unit, time = DataID(f.attrs['fieldID']), f.attrs['valueType'], f.attrs['unit'].tobytes(), f.attrs['time'].tobytes()
+        fieldID, valueType, unit = DataID(f.attrs['fieldID']), f.attrs['valueType'], f.attrs['unit'].tobytes()
+        time = f.attrs['time'].tobytes() if not series else None
         if unit == '':
             unit = None  # special case, handled at saving time
         else: unit = pickle.loads(unit)
-        if time == '':
+        if series:
+            time = Quantity(value=f['times'][step], unit=f['times'].attrs['unit'])
+        elif time == '':
             time = None  # special case, handled at saving time
         else:
             time = pickle.loads(time)
@@ -760,16 +903,22 @@ class Field(FieldBase,HeavyConvertible):
             if 'mesh' not in f:
                 raise ValueError('HDF5/mesh: missing attribute')
             link = f.get('mesh', getlink=True)
-            if isinstance(link, h5py.SoftLink):
+            if isinstance(link, h5py.SoftLink) and meshCache is not None:
                 # assert isinstance(link, (h5py.SoftLink,h5py.HardLink))
                 mPath = link.path
                 if mPath not in meshCache:
                     meshCache[mPath] = mesh.Mesh.makeFromHdf5group(f['mesh'])
                 m = meshCache[mPath]
-            elif isinstance(link, h5py.HardLink):
+            else:
+                # identical meshes are shared through the mesh registry
                 m = mesh.Mesh.makeFromHdf5group(f['mesh'])
-        if not heavy:
-            quantity = Quantity(value=np.array(valDs).tolist(), unit=unit)
+        if series and heavy and not h5own:
+            from .heavydata import Hdf5RefQuantity
+            quantity = Hdf5RefQuantity(dataset=valDs, step=range(valDs.shape[0])[step])
+        elif series:
+            quantity = Quantity(value=valDs[step], unit=unit)
+        elif not heavy:
+            quantity = Quantity(value=np.array(valDs), unit=unit)
         else:
             from .heavydata import Hdf5RefQuantity, Hdf5OwningRefQuantity
             # hack
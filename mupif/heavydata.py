@@ -3,6 +3,8 @@ from dataclasses import dataclass
 from typing import Any, Optional, Annotated
 import typing
 import sys
+import collections
+import threading
 import numpy as np
 # backing storage
 import h5py
@@ -36,44 +38,171 @@ from .units import Quantity, RefQuantity
 import astropy
 
 
+class Hdf5BlockCache(object):
+    """
+    Bounded LRU cache of row blocks of a HDF5 dataset, for out-of-core access to large datasets. Rows are read in blocks aligned with HDF5 chunks of the dataset (if chunked), so that every chunk is decompressed only once while in the cache. Writes go through to the dataset and invalidate affected blocks.
+
+    Returned arrays are read-only (they may be views of cached blocks).
+    """
+    def __init__(self, dataset, *, maxBytes=64*2**20, blockRows=None, step=None):
+        """
+        :param h5py.Dataset dataset: dataset to cache (rows are along the first dimension)
+        :param int maxBytes: maximum memory held by cached blocks (at least one block is always cached)
+        :param int blockRows: number of rows per block; defaults to HDF5 chunk size along the first dimension, or to rows fitting in 1 MB for contiguous datasets
+        :param int step: if given, only access ``dataset[step]`` (time step of a stacked time series), rows being along the second dimension of the dataset
+        """
+        self.dataset, self.step = dataset, step
+        self.shape = dataset.shape if step is None else dataset.shape[1:]
+        self.rowBytes = max(1, dataset.dtype.itemsize*int(np.prod(self.shape[1:], dtype=np.int64)))
+        if blockRows is None: blockRows = dataset.chunks[0 if step is None else 1] if dataset.chunks else max(1, 2**20//self.rowBytes)
+        self.blockRows = blockRows
+        self.maxBlocks = max(1, maxBytes//(blockRows*self.rowBytes))
+        self.blocks = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits, self.misses = 0, 0
+
+    def _block(self, ib):
+        with self.lock:
+            if (blk := self.blocks.get(ib, None)) is not None:
+                self.blocks.move_to_end(ib)
+                self.hits += 1
+                return blk
+        blk = self._read(slice(ib*self.blockRows, (ib+1)*self.blockRows))
+        blk.flags.writeable = False
+        with self.lock:
+            self.misses += 1
+            self.blocks[ib] = blk
+            while len(self.blocks) > self.maxBlocks: self.blocks.popitem(last=False)
+        return blk
+
+    def _read(self, rows):
+        return self.dataset[rows] if self.step is None else self.dataset[self.step, rows]
+
+    def _rowIndices(self, rows):
+        'Convert *rows* (slice, sequence or array) to array of non-negative row indices'
+        n = self.shape[0]
+        if isinstance(rows, slice): return np.arange(*rows.indices(n))
+        rows = np.asarray(rows)
+        if rows.dtype == bool: return np.flatnonzero(rows)
+        rows = rows.astype(np.int64)
+        if len(rows) and (rows.min() < -n or rows.max() >= n): raise IndexError(f'Row index out of range (dataset has {n} rows).')
+        return np.where(rows < 0, rows+n, rows)
+
+    def __getitem__(self, rows):
+        """
+        Return row(s) given as integer, slice, or integer/boolean array (in the same way as numpy indexing along the first axis); further indices (for row components) are applied to the result.
+        """
+        if isinstance(rows, tuple): rows, rest = rows[0], rows[1:]
+        else: rest = ()
+        if isinstance(rows, (int, np.integer)):
+            if rows < 0: rows += self.shape[0]
+            if not 0 <= rows < self.shape[0]: raise IndexError(f'Row {rows} out of range (dataset has {self.shape[0]} rows).')
+            ret = self._block(rows//self.blockRows)[rows % self.blockRows]
+            return ret[rest] if rest else ret
+        else:
+            ix = self._rowIndices(rows)
+            ib0, ib1 = (ix[0]//self.blockRows, ix[-1]//self.blockRows) if len(ix) else (0, -1)
+            if isinstance(rows, slice) and ib0 == ib1 and (rows.step in (None, 1)):
+                # contiguous rows within one block: view of the block
+                ret = self._block(ib0)[ix[0]-ib0*self.blockRows:ix[-1]-ib0*self.blockRows+1]
+            else:
+                ret = np.empty((len(ix),)+self.shape[1:], dtype=self.dataset.dtype)
+                blockIx = ix//self.blockRows
+                for ib in np.unique(blockIx):
+                    sel = (blockIx == ib)
+                    ret[sel] = self._block(ib)[ix[sel]-ib*self.blockRows]
+                ret.flags.writeable = False
+        return ret[(slice(None),)+rest] if rest else ret
+
+    def __setitem__(self, rows, val):
+        if self.step is None: self.dataset[rows] = val
+        else: self.dataset[(self.step,)+(rows if isinstance(rows, tuple) else (rows,))] = val
+        if isinstance(rows, tuple): rows = rows[0]
+        if isinstance(rows, (int, np.integer)): self.invalidate([rows])
+        else: self.invalidate(self._rowIndices(rows))
+
+    def invalidate(self, rows=None):
+        'Drop cached blocks containing *rows* (all blocks if not given)'
+        with self.lock:
+            if rows is None: self.blocks.clear()
+            else:
+                for ib in np.unique(np.asarray(rows, dtype=np.int64)//self.blockRows): self.blocks.pop(ib, None)
+
+    def iterBlocks(self, blockRows=None):
+        """
+        Iterate over the whole dataset in blocks, reading directly (bypassing the cache, so that streaming does not evict blocks in use).
+
+        :param int blockRows: rows per block (by default, multiple of the cache block size close to 1M rows×components)
+        :return: iterator of (first row index, numpy.ndarray)
+        """
+        n = self.shape[0]
+        if blockRows is None: blockRows = self.blockRows*max(1, (2**23//self.rowBytes)//self.blockRows)
+        for i0 in range(0, n, blockRows):
+            yield i0, self._read(slice(i0, min(n, i0+blockRows)))
+
+
 class Hdf5RefQuantity(RefQuantity):
-    'Quantity stored in HDF5 dataset, the HDF5 file being managed somewhere else.'
+    'Quantity stored in HDF5 dataset, the HDF5 file being managed somewhere else. Row access is cached, see :obj:`Hdf5BlockCache`.'
     # unit: astropy.units.UnitBase
     dataset: Annotated[typing.Optional[h5py.Dataset], pydantic.Field(exclude=True)] = None
+    #: if given, the quantity is ``dataset[step]`` (one time step of stacked time series)
+    step: Annotated[typing.Optional[int], pydantic.Field(exclude=True)] = None
+    #: memory limit for cached blocks of the dataset
+    cacheBytes: Annotated[int, pydantic.Field(exclude=True)] = 64*2**20
+    _blockCache: Any = None
 
     def __init__(self, *, unit=None, **kw):
         super().__init__(**kw)
+        self._blockCache = None
         if self.dataset and unit:
             self.dataset.attrs['unit'] = str(unit)
         if not self.dataset and unit:
             raise ValueError(f'{unit=} cannot be specified without dataset (no storage for unit available)')
 
     # this will convert nicesly to arrays
-    def __len__(self): return self.dataset.shape[0]
+    def __len__(self): return self.shape[0]
+
+    def getBlockCache(self):
+        """
+        Return cache of dataset row blocks; it is created when first used, and re-created when the dataset is re-opened or when :obj:`cacheBytes` changes.
+
+        :rtype: Hdf5BlockCache
+        """
+        self._ensureData()
+        c = self._blockCache
+        if c is None or c.dataset is not self.dataset or c.step != self.step or c.maxBlocks != max(1, self.cacheBytes//(c.blockRows*c.rowBytes)):
+            c = self._blockCache = Hdf5BlockCache(self.dataset, maxBytes=self.cacheBytes, step=self.step)
+        return c
+
+    def iterBlocks(self, blockRows=None):
+        'Iterate over the dataset in blocks of rows, see :obj:`Hdf5BlockCache.iterBlocks`.'
+        return self.getBlockCache().iterBlocks(blockRows)
 
     class ValueRowAccessor(object):
-        def __init__(self, refq): self.refq, self.shape = refq, refq.dataset.shape
+        def __init__(self, refq): self.refq, self.shape = refq, refq.shape
+
+        def __len__(self): return self.shape[0]
 
         def __getitem__(self, row):
-            ret = self.refq.dataset[row]
-            ret.flags.writeable = False
-            return ret
+            return self.refq.getBlockCache()[row]
 
         def __setitem__(self, row: int, val):
-            self.refq.dataset[row] = val
+            self.refq.getBlockCache()[row] = val
 
     class QuantityRowAccessor(object):
-        def __init__(self, refq): self.refq, self.shape = refq, refq.dataset.shape
+        def __init__(self, refq): self.refq, self.shape = refq, refq.shape
+
+        def __len__(self): return self.shape[0]
 
         def __getitem__(self, row):
-            ret = self.refq.dataset[row]*units.Unit(self.refq.dataset.attrs['unit'])
+            ret = self.refq.getBlockCache()[row]*units.Unit(self.refq.dataset.attrs['unit'])
             ret.flags.writeable = False
             return ret
 
         def __setitem__(self, row: int, q: units.Quantity):
             if not isinstance(q, units.Quantity):
                 raise ValueError('quantity must be an instance of mupif.units.Quantity (not a {q.__class__.__name__})')
-            self.refq.dataset[row] = q.to(self.refq.dataset.attrs['unit'])
+            self.refq.getBlockCache()[row] = q.to(self.refq.dataset.attrs['unit'])
 
     # def checkValue(self):
     #    import h5py
@@ -83,19 +212,23 @@ class Hdf5RefQuantity(RefQuantity):
         if self.dataset is None:
             raise ValueError('Dataset not allocated yet.')
 
+    def _rowAccess(self):
+        'Whether values are accessed by rows (through the block cache); this is always the case for time steps, unless they are scalar'
+        return len(self.shape) > 1 or (self.step is not None and len(self.shape) == 1)
+
     @property
     def value(self):
         self._ensureData()
-        if len(self.dataset.shape) > 1:
+        if self._rowAccess():
             return Hdf5RefQuantity.ValueRowAccessor(self)
-        return self.dataset
+        return self.dataset if self.step is None else self.dataset[self.step]
 
     @property
     def quantity(self):
         self._ensureData()
-        if len(self.dataset.shape) > 1:
+        if self._rowAccess():
             return Hdf5RefQuantity.QuantityRowAccessor(self)
-        return self.dataset
+        return self.dataset if self.step is None else self.dataset[self.step]*self.unit
 
     @property
     def unit(self):
@@ -105,12 +238,12 @@ class Hdf5RefQuantity(RefQuantity):
     @property
     def ndim(self):
         self._ensureData()
-        return self.dataset.ndim
+        return len(self.shape)
 
     @property
     def shape(self):
         self._ensureData()
-        return self.dataset.shape
+        return self.dataset.shape if self.step is None else self.dataset.shape[1:]
 
     # properties setters don't work with pydantic
     # thus the user can screw up easily
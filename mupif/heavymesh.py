@@ -33,6 +33,7 @@ class HeavyUnstructuredMesh(HeavyDataBase,Mesh):
     GRP_CELL_OFFSETS: ClassVar[str]='cellOffsets'
     GRP_CELL_CONN: ClassVar[str]='connectivity'
     GRP_FIELDS: ClassVar[str]='fields'
+    GRP_CELL_LOCALIZER: ClassVar[str]='cellLocalizer'
 
     # see https://github.com/nschloe/meshio/blob/main/src/meshio/xdmf/common.py
     # and https://www.xdmf.org/index.php/XDMF_Model_and_Format#Arbitrary
@@ -68,10 +69,21 @@ class HeavyUnstructuredMesh(HeavyDataBase,Mesh):
         if not self._hasData(): return -1
         return self._h5grp[self.GRP_CELL_OFFSETS].shape[0]
 
+    def _dataSizes(self):
+        'Lengths of vertex, cell offset and connectivity datasets.'
+        return np.array([self._h5grp[g].shape[0] for g in (self.GRP_VERTS,self.GRP_CELL_OFFSETS,self.GRP_CELL_CONN)],dtype=np.int64)
+
     def dataDigest(self):
+        '''
+        Return hash digest of vertex and cell data. The digest is stored in the mesh group (``dataDigest`` attribute, along with dataset lengths in ``dataSizes``) and only computed again, reading the whole mesh, if it is missing or the lengths do not match; appending vertices or cells removes it. The digest is not stored if the backing storage is read-only.
+        '''
         self._ensureData()
+        attrs,sizes=self._h5grp.attrs,self._dataSizes()
+        if 'dataDigest' in attrs and np.array_equal(attrs.get('dataSizes',[]),sizes): return str(attrs['dataDigest'])
         # FIXME: reads datasets into memory (should just pass buffers?)
-        return util.sha1digest([np.array(self._h5grp[g]) for g in (self.GRP_VERTS,self.GRP_CELL_OFFSETS,self.GRP_CELL_CONN)])
+        digest=util.sha1digest([np.array(self._h5grp[g]) for g in (self.GRP_VERTS,self.GRP_CELL_OFFSETS,self.GRP_CELL_CONN)])
+        if self._h5grp.file.mode!='r': attrs['dataDigest'],attrs['dataSizes']=digest,sizes
+        return digest
 
     def getVertex(self,i):
         self._ensureData()
@@ -91,28 +103,68 @@ class HeavyUnstructuredMesh(HeavyDataBase,Mesh):
         conn=self._h5grp[self.GRP_CELL_CONN][offset+1:offset+1+nVerts]
         return CellType(number=i,label=None,vertices=tuple(conn),mesh=self)
 
+    def getVertices(self):
+        self._ensureData()
+        return np.array(self._h5grp[self.GRP_VERTS])
+
+    def _getCellsChunk(self,start,stop):
+        'Return cell types and padded connectivity (see :obj:`Mesh.getCells`) of cells start…stop-1, read from the (xdmf-style) connectivity array in one go.'
+        _OFF,_CONN=self._h5grp[self.GRP_CELL_OFFSETS],self._h5grp[self.GRP_CELL_CONN]
+        offs=np.array(_OFF[start:stop])
+        if offs.shape[0]==0: return np.empty((0,),dtype=np.int64),np.empty((0,0),dtype=np.int64)
+        c0,c1=offs[0],(_OFF[stop] if stop<_OFF.shape[0] else _CONN.shape[0])
+        dta=np.array(_CONN[c0:c1])
+        offs-=c0
+        types=_xdmf2cgt[dta[offs]]
+        nVerts=_cgt2numVerts[types]
+        if np.any(nVerts<0): raise RuntimeError(f'Unknown xdmf cell type in {self.h5path}::{self.h5group}/{self.GRP_CELL_CONN}.')
+        col=np.arange(np.max(nVerts))
+        valid=(col<nVerts[:,np.newaxis])
+        return types,np.where(valid,dta[np.where(valid,offs[:,np.newaxis]+1+col,0)],-1)
+
+    def getCells(self):
+        self._ensureData()
+        return self._getCellsChunk(0,self.getNumberOfCells())
+
     def getCellLocalizer(self):
+        '''
+        Return cell localizer (octree). The octree is stored in the HDF5 group (:obj:`GRP_CELL_LOCALIZER`) after being built, and loaded from there if its *dataDigest* attribute matches :obj:`dataDigest` of the mesh (which is stored as well, so the mesh is not read for the comparison); it is removed when vertices or cells are appended. The octree is not stored if the backing storage is read-only.
+        '''
         if self._cellOctree: return self._cellOctree
-        bb=self.getGlobalBBox()
-        # move all this to the octree ctor?
-        minc, maxc = bb.coords_ll, bb.coords_ur
-        size = max(y-x for x, y in zip(minc, maxc))
-        mask = [(y-x) > 0.0 for x, y in zip(minc, maxc)]
-        self._cellOctree = octree.Octree(minc, size, tuple(mask))
-        verts=np.array(self._h5grp[self.GRP_VERTS])
-        chunkSize=10000
-        offGrp=self._h5grp[self.GRP_CELL_OFFSETS]
-        import tqdm
-        with tqdm.tqdm(total=offGrp.shape[0],unit=' cells',desc='octree') as pbar:
-            for chunkStart in range(0,offGrp.shape[0],chunkSize):
-                c0=offGrp[chunkStart]
-                c1=(offGrp[chunkStart+chunkSize] if offGrp.shape[0]>chunkStart+chunkSize else None)
-                dta=np.array(self._h5grp[self.GRP_CELL_CONN][c0:c1])
-                self._cellOctree.insertCellArrayChunk(verts,dta,chunkStart,mesh=self)
-                pbar.update(dta.shape[0])
-        assert c1 is None # the last chunk must take the rest of the array
+        self._ensureData()
+        grp=self._h5grp.get(self.GRP_CELL_LOCALIZER,None)
+        digest=self.dataDigest()
+        if grp is not None and grp.attrs.get('dataDigest',None)==digest:
+            log.info(f'Loading cell localizer from {self.h5path}::{grp.name}')
+            self._cellOctree=octree.Octree.fromArrays(grp)
+            return self._cellOctree
+        Mesh.getCellLocalizer(self)
+        if self._h5grp.file.mode=='r': return self._cellOctree
+        try: arrays=self._cellOctree.toArrays()
+        except NotImplementedError: return self._cellOctree
+        if grp is not None: del self._h5grp[self.GRP_CELL_LOCALIZER]
+        grp=self._h5grp.create_group(self.GRP_CELL_LOCALIZER)
+        for name,data in arrays.items(): grp[name]=data
+        grp.attrs['dataDigest']=digest
         return self._cellOctree
 
+    @staticmethod
+    def _invalidateLocalizer_static(h5grp):
+        'Remove stored cell localizer and data digest (see :obj:`dataDigest`), when the mesh is being modified.'
+        if HeavyUnstructuredMesh.GRP_CELL_LOCALIZER in h5grp: del h5grp[HeavyUnstructuredMesh.GRP_CELL_LOCALIZER]
+        for a in ('dataDigest','dataSizes'):
+            if a in h5grp.attrs: del h5grp.attrs[a]
+
+    def getCellBBoxes(self,relPad=1e-5,chunkSize=100000):
+        'Compute cell bounding boxes, reading cell connectivity in chunks of *chunkSize* cells; see :obj:`Mesh.getCellBBoxes`.'
+        self._ensureData()
+        verts,nc=self.getVertices(),self.getNumberOfCells()
+        ret=np.empty((nc,2,verts.shape[1]),dtype=np.float64)
+        for c0 in range(0,nc,chunkSize):
+            c1=min(c0+chunkSize,nc)
+            ret[c0:c1]=Mesh.cellBBoxes_static(verts,self._getCellsChunk(c0,c1)[1],relPad=relPad)
+        return ret
+
     @staticmethod
     def _prepStorage_static(h5grp,dim):
         kw=dict(chunks=True,compression='gzip',compression_opts=9)
@@ -134,16 +186,22 @@ class HeavyUnstructuredMesh(HeavyDataBase,Mesh):
         assert self.GRP_CELL_CONN in self._h5grp
         assert self.GRP_CELL_OFFSETS in self._h5grp
 
+    def closeData(self):
+        'Closes the backing storage; the mesh data are not accessible (see :obj:`_hasData`) until opened again.'
+        HeavyDataBase.closeData(self)
+        self._h5grp=None
 
     def appendVertices(self, coords: np.ndarray):
         self._ensureData()
-        return self.appendVertices_static(self._h5obj,self.dim,coords)
+        self._setDirty()
+        return self.appendVertices_static(self._h5grp,self.dim,coords)
         
     @staticmethod
     def appendVertices_static(h5grp, dim: int, coords: np.ndarray):
         'TODO: add to UnstructuredMesh API (and Mesh as abstract) as well'
         # print('appendVertices coords: ',coords)
         if coords.shape[1]!=dim: raise RuntimeError(f'Dimension mismatch: HeavyUnstructuredMesh.dim={dim}, coords.shape[1]={coords.shape[1]}.')
+        HeavyUnstructuredMesh._invalidateLocalizer_static(h5grp)
         _VERTS=h5grp[HeavyUnstructuredMesh.GRP_VERTS]
         l0,l1=_VERTS.shape[0],_VERTS.shape[0]+coords.shape[0]
         _VERTS.resize((l1,dim))
@@ -151,6 +209,7 @@ class HeavyUnstructuredMesh(HeavyDataBase,Mesh):
 
     def appendCells(self,types,conn):
         self._ensureData()
+        self._setDirty()
         return self.appendCells_static(self._h5grp,types,conn)
 
     @staticmethod
@@ -158,6 +217,7 @@ class HeavyUnstructuredMesh(HeavyDataBase,Mesh):
         'TODO: add to UnstructuredMesh API (and Mesh as abstract) as well'
         _OFF,_CONN=h5grp[HeavyUnstructuredMesh.GRP_CELL_OFFSETS],h5grp[HeavyUnstructuredMesh.GRP_CELL_CONN]
         assert len(types)==len(conn)
+        HeavyUnstructuredMesh._invalidateLocalizer_static(h5grp)
         numCells=h5grp[HeavyUnstructuredMesh.GRP_CELL_OFFSETS].shape[0]
         if numCells==0: off=0
         else:
@@ -322,6 +382,29 @@ class HeavyUnstructuredMesh(HeavyDataBase,Mesh):
             fields.append(Field(quantity=hq,mesh=mesh,fieldID=fieldID,fieldType=fieldType,valueType=valueType,time=time))
         return (mesh,fields)
 
+    def registryKey(self):
+        'Registry key (see :obj:`mupif.mesh.Mesh.registryKey`) is the storage location; None if the storage is not open.'
+        if not self._hasData(): return None
+        return HeavyUnstructuredMesh.hdf5RegistryKey(self._h5grp)
+
+    def _storedRegistryKey(self):
+        # mesh with closed storage is not shared
+        if not self._hasData(): return None
+        return Mesh._storedRegistryKey(self)
+
+    @classmethod
+    def hdf5RegistryKey(klass,h5grp):
+        '''
+        Registry key consisting of the file path, identity of the open file (device and inode) and object address of the group. The object address identifies the group regardless of the (soft-linked) path it was reached by; the inode distinguishes a file deleted and created again under the same path while the old one is still open (and its inode cannot be reused).
+        '''
+        import h5py
+        try: st=os.fstat(h5grp.file.id.get_vfd_handle())
+        except Exception:
+            # drivers without file descriptor (e.g. in-memory files)
+            try: st=os.stat(h5grp.file.filename)
+            except OSError: st=None
+        return ('hdf5',os.path.abspath(h5grp.file.filename),None if st is None else (st.st_dev,st.st_ino),h5py.h5o.get_info(h5grp.id).addr)
+
     @classmethod
     def isHere(klass,*,h5grp):
         for g in HeavyUnstructuredMesh.GRP_VERTS,HeavyUnstructuredMesh.GRP_CELL_OFFSETS,HeavyUnstructuredMesh.GRP_CELL_CONN:
@@ -330,6 +413,14 @@ class HeavyUnstructuredMesh(HeavyDataBase,Mesh):
 
 
 
+# lookup arrays for vectorized conversion of xdmf cell types to mupif cell types and numbers of vertices (-1 for unknown)
+_xdmf2cgt=np.full(max(CGT.xdmfIndex2cgt.keys())+1,-1,dtype=np.int64)
+for _x,_c in CGT.xdmfIndex2cgt.items(): _xdmf2cgt[_x]=_c
+_cgt2numVerts=np.full(max(CGT.cgt2numVerts.keys())+1,-1,dtype=np.int64)
+for _c,_n in CGT.cgt2numVerts.items(): _cgt2numVerts[_c]=_n
+_cgt2numVerts=np.append(_cgt2numVerts,-1) # index -1 (unknown xdmf type) maps to -1 as well
+
+
 def _chunker(it,size):
     rv = [] 
     for i,el in enumerate(it,1) :
@@ -22,6 +22,9 @@ import subprocess
 import shutil
 import itertools
 import numbers
+import collections
+import contextlib
+import threading
 log = logging.getLogger(__name__)
 
 
@@ -370,6 +373,227 @@ def _mupif_from_hdf5_group(*,grp:h5py.Group,index:int,storedType:str):
     # return field.Field.makeFromHeavydf5(h5group=grp,indices=[index])[0]
 
 
+class _RowSlabCache(object):
+    '''
+    Cache of contiguous row slabs of compound datasets, shared by all contexts of one :obj:`HeavyStruct` (so that values written through one context are seen by all others). Getters of individual rows read slabs of *slabRows* rows at once and serve subsequent rows from memory; at most *maxSlabs* slabs are kept, least recently used are evicted. Setters write to the dataset and update the cached slab (write-through), except for datasets in write-back mode (see ``bufferedWrites`` of contexts) where modified slabs are only written when evicted or flushed.
+
+    Subgroups resolved from schema paths (such as ``molecule/{ROW}/``) are cached as well (at most *maxGroups* of them).
+
+    *slabRows* of 0 disables caching of reads.
+    '''
+    def __init__(self, *, slabRows=256, maxSlabs=64, maxGroups=1024):
+        self.slabRows, self.maxSlabs, self.maxGroups = slabRows, max(1, maxSlabs), maxGroups
+        # (dataset name, slab index) -> [dataset, first row, array, dirty]
+        self.slabs = collections.OrderedDict()
+        # dataset name -> slab rows, for datasets in write-back mode
+        self.writeBack = {}
+        # (group name, path) -> group
+        self.groups = collections.OrderedDict()
+
+    def _slabRows(self, ds): return self.writeBack.get(ds.name, self.slabRows)
+
+    def _slab(self, ds, row, load=True):
+        'Return (index within slab, slab) for *row* of *ds*; slab is None if not cached and *load* is False.'
+        sr = self._slabRows(ds)
+        if sr <= 0: raise RuntimeError(f'{ds.name}: slab cache is disabled.')
+        key = (ds.name, row//sr)
+        s = self.slabs.get(key, None)
+        if s is not None:
+            self.slabs.move_to_end(key)
+            return row-s[1], s
+        if not load: return None, None
+        n = ds.shape[0]
+        if not 0 <= row < n: raise IndexError(f'{ds.name}: row index {row} out of range 0…{n}.')
+        r0 = key[1]*sr
+        s = self.slabs[key] = [ds, r0, ds[r0:min(n, r0+sr)], False]
+        while len(self.slabs) > self.maxSlabs:
+            self._write(self.slabs.popitem(last=False)[1])
+        return row-r0, s
+
+    def _write(self, s):
+        if s[3]: s[0][s[1]:s[1]+len(s[2])] = s[2]
+        s[3] = False
+
+    def get(self, ds, row, fq):
+        'Return value of *fq* in *row* of *ds*.'
+        if self._slabRows(ds) <= 0: return ds[fq, row]
+        k, s = self._slab(ds, row)
+        ret = s[2][fq][k]
+        # don't hand out arrays owned by the cache
+        return (ret.copy() if isinstance(ret, np.ndarray) else ret)
+
+    def set(self, ds, row, fq, val, wholeRow=False):
+        '''
+        Set value of *fq* in *row* of *ds*. *wholeRow* is used to work around h5py bugs with variable-length fields and multidimensional subarrays, which cannot be assigned individually (see https://stackoverflow.com/q/67192725/761090 and https://stackoverflow.com/q/67451714/761090).
+        '''
+        if self._slabRows(ds) <= 0:
+            k, s = None, None
+        elif ds.name in self.writeBack:
+            k, s = self._slab(ds, row)
+            s[2][fq][k] = val
+            s[3] = True
+            return
+        else: k, s = self._slab(ds, row, load=False)
+        if s is not None:
+            s[2][fq][k] = val
+            ds[row] = s[2][k]
+        elif wholeRow:
+            rowdata = ds[row]
+            rowdata[fq] = val
+            ds[row] = rowdata
+        else: ds[row, fq] = val
+
+    def flush(self, ds=None, invalidate=False):
+        'Write modified slabs (of *ds*, or of all datasets) to storage; with *invalidate*, also discard them from the cache.'
+        for key in list(self.slabs.keys()):
+            if ds is not None and key[0] != ds.name: continue
+            self._write(self.slabs[key])
+            if invalidate: del self.slabs[key]
+
+    def beginWriteBack(self, ds, slabRows=None):
+        self.flush(ds, invalidate=True)
+        self.writeBack[ds.name] = max(1, slabRows or self.slabRows or 1024)
+
+    def endWriteBack(self, ds):
+        self.flush(ds, invalidate=True)
+        self.writeBack.pop(ds.name, None)
+
+    def dropTree(self, path, write=False):
+        '''
+        Discard cached slabs of all datasets inside group *path* (recursively), and forget their write-back mode; with *write*, modified slabs are written to storage first. This must be called before the group is deleted or its datasets are written to directly, as slabs are keyed by dataset names (which a re-created dataset will have again).
+        '''
+        prefix = path.rstrip('/')+'/'
+        for key in list(self.slabs.keys()):
+            if not key[0].startswith(prefix): continue
+            if write: self._write(self.slabs[key])
+            del self.slabs[key]
+        for name in list(self.writeBack.keys()):
+            if name.startswith(prefix): del self.writeBack[name]
+
+    def group(self, parent, path):
+        'Return subgroup *path* of *parent*, creating it if necessary.'
+        key = (parent.name, path)
+        g = self.groups.get(key, None)
+        if g is not None:
+            self.groups.move_to_end(key)
+            return g
+        g = self.groups[key] = parent.require_group(path)
+        while len(self.groups) > self.maxGroups: self.groups.popitem(last=False)
+        return g
+
+    def dropGroups(self):
+        'Forget cached subgroups (after they were deleted).'
+        self.groups.clear()
+
+
+class _PyroContextRegistry(object):
+    '''
+    Sub-contexts registered with Pyro daemon on behalf of one :obj:`HeavyStruct.openData` call.
+
+    Equal contexts (same type, group and row) are registered only once. When there are more than *maxContexts* contexts registered (0 means no limit), the least recently used ones are unregistered; a context is used when it is returned, and all contexts it was (recursively) obtained from are used along with it. Ids of registered contexts are kept in *pyroIds* as well, thus :obj:`HeavyStruct.closeData` unregisters all remaining ones.
+    '''
+    def __init__(self, pyroIds, maxContexts=10000):
+        self.pyroIds, self.maxContexts = pyroIds, maxContexts
+        # key -> [context, key of the parent context]
+        self.contexts = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key_static(obj):
+        return (obj.__class__, obj.ctx.h5group.name, obj.row)
+
+    def register(self, daemon, obj, parent):
+        '''
+        Register *obj* (obtained from *parent*) with *daemon*, unless an equal context is registered already; return the registered context.
+        '''
+        key, pkey = self.key_static(obj), self.key_static(parent)
+        with self.lock:
+            # mark parent chain as used
+            k = pkey
+            while (e := self.contexts.get(k, None)) is not None:
+                self.contexts.move_to_end(k)
+                k = e[1]
+            e = self.contexts.get(key, None)
+            if e is not None and getattr(e[0], '_pyroDaemon', None) is daemon:
+                self.contexts.move_to_end(key)
+                return e[0]
+            daemon.register(obj)
+            self.pyroIds.append(obj._pyroId)
+            self.contexts[key] = [obj, pkey]
+            while self.maxContexts and len(self.contexts) > self.maxContexts:
+                self._unregister(self.contexts.popitem(last=False)[1][0])
+        return obj
+
+    def release(self, obj):
+        '''
+        Unregister *obj* from its daemon (no-op if not registered).
+        '''
+        key = self.key_static(obj)
+        with self.lock:
+            if (e := self.contexts.get(key, None)) is not None and e[0] is obj:
+                del self.contexts[key]
+            self._unregister(obj)
+
+    def _unregister(self, obj):
+        if (daemon := getattr(obj, '_pyroDaemon', None)) is None:
+            return
+        pyroId = obj._pyroId
+        daemon.unregister(obj)
+        # ids registered the longest time ago are near the beginning
+        try: self.pyroIds.remove(pyroId)
+        except ValueError: pass
+
+
+@dataclass
+class CookedSchemaFragment:
+    'Internal data used when cookSchema is called recursively'
+    dtypes: list    # accumulates numpy dtypes for compound datatype
+    defaults: dict  # default values, nan for floats and 0 for integers
+    subpaths: dict  # accumulates nested paths (for deletion when resizing), as (path,schema) tuple, keyed by FQ
+    units: dict     # accumulates units for normal values types (for dict export), keyed by FQ
+    T: Any = None   # nested context type
+    doc: typing.List[str] = dataclasses.field(default_factory=list)  # accumulates documentation (as markdown nested list)
+    columns: dict = dataclasses.field(default_factory=dict)  # accumulates column access for bulk operations, as (stored fields, reader, writer) tuple, keyed by FQ
+
+    def append(self, other):
+        self.dtypes += other.dtypes
+        self.defaults.update(other.defaults)
+        self.doc += other.doc
+        self.subpaths.update(other.subpaths)
+        self.units.update(other.units)
+        self.columns.update(other.columns)
+
+
+class _LazyDoc(object):
+    '''
+    Descriptor for ``__doc__`` of cooked context types: documentation fragments accumulated while cooking are only joined when the docstring is accessed.
+    '''
+    def __init__(self, fragments):
+        self.fragments, self.doc = fragments, None
+
+    def __get__(self, instance, owner):
+        if self.doc is None:
+            self.doc = '\n'.join(self.fragments)+'\n'
+            self.fragments = None
+        return self.doc
+
+
+def _schemaDigest(desc, digestSize=6):
+    '''
+    Return hex digest of the JSON representation of schema *desc*.
+    '''
+    import hashlib
+    h = hashlib.blake2b(digest_size=digestSize)
+    h.update(json.dumps(desc).encode('utf-8'))
+    return h.hexdigest()
+
+
+# cooked top-level context types, keyed by schema digest; shared by all makeSchemaRegistry calls
+_cookedSchemas = collections.OrderedDict()
+_cookedSchemasLock = threading.Lock()
+_cookedSchemasMax = 256
+
+
 def _cookSchema(desc, prefix='', schemaName='', fakeModule='', datasetName='', namingConvention='get-set'):
     __doc0__ = '''
     Transform dictionary-structured data schema into context access types.
@@ -387,23 +611,6 @@ def _cookSchema(desc, prefix='', schemaName='', fakeModule='', datasetName='', n
     local function defaults, which makes some of the code less readable.
     '''
 
-    @dataclass
-    class CookedSchemaFragment:
-        'Internal data used when cookSchema is called recursively'
-        dtypes: list    # accumulates numpy dtypes for compound datatype
-        defaults: dict  # default values, nan for floats and 0 for integers
-        subpaths: dict  # accumulates nested paths (for deletion when resizing), as (path,schema) tuple, keyed by FQ
-        units: dict     # accumulates units for normal values types (for dict export), keyed by FQ
-        T: Any = None   # nested context type
-        doc: typing.List[str] = dataclasses.field(default_factory=list)  # accumulates documentation (as markdown nested list)
-
-        def append(self, other):
-            self.dtypes += other.dtypes
-            self.defaults.update(other.defaults)
-            self.doc += other.doc
-            self.subpaths.update(other.subpaths)
-            self.units.update(other.units)
-
     def dtypeUnitDefaultDoc(v):
         'Parse dictionary *v* (part of the schema) and return (dtype,unit,default,doc) tuple'
         shape = v['shape'] if 'shape' in v else ()
@@ -466,14 +673,37 @@ def _cookSchema(desc, prefix='', schemaName='', fakeModule='', datasetName='', n
         'Turn the first letter into uppercase'
         return k[0].upper()+k[1:]
 
-    def setEntireDatasetRow_changeOneItem(*,ds,row,fq,val):
-        # workaround for bugs in h5py: for variable-length fields, and dim>1 subarrays:
-        # direct assignment does not work; must read the whole row, modify, write it back
-        # see https://stackoverflow.com/q/67192725/761090 and https://stackoverflow.com/q/67451714/761090
-        rowdata=ds[row]
-        # rowdata[ds.dtype.names.index(fq)]=val # this does not seem to be needed (anymore?)
-        rowdata[fq]=val
-        ds[row]=rowdata
+    def readColumn(col,*,unit,isStr,isVlen,delim,isJson):
+        'Convert column of stored values (for many rows) to values as returned by getters (unit is applied to the whole column)'
+        if isStr:
+            col=[(v.decode('utf-8') if isinstance(v,bytes) else v) for v in col]
+            if delim is not None: return [tuple(v.split(delim)) for v in col]
+            if isJson: return [json.loads(v) for v in col]
+            return np.array(col,dtype=str)
+        if unit is None: return col
+        if isVlen: return [units.Quantity(value=v,unit=unit) for v in col]
+        return units.Quantity(value=col,unit=unit)
+    def writeColumn(vals,*,fq,unit,dtype,basedtype,isStr,isVlen,delim,isJson):
+        'Convert values (for many rows) to column of stored values, with checks as in setters (unit is converted for the whole column)'
+        if unit:
+            if isVlen: vals=[units.Quantity(v).to(unit).value for v in vals]
+            else: vals=units.Quantity(vals).to(unit).value
+        if isStr:
+            if delim is not None:
+                for v in vals:
+                    if isinstance(v,(str,bytes)): raise TypeError(f'{fq}: string list cannot be set with str/bytes (pass list of chars if this is really what you mean)')
+                    for i,vv in enumerate(v):
+                        if delim in vv: raise RuntimeError(f'{fq}: item {i} contains delimiter "{delim}".')
+                vals=[str(delim).join(v) for v in vals]
+            if isJson: vals=[json.dumps(v) for v in vals]
+            vals=[(v.encode('utf-8') if isinstance(v,str) else v) for v in vals]
+        if basedtype.kind=='O':
+            ret=np.empty(len(vals),dtype=object)
+            dt2=(h5py.check_vlen_dtype(dtype) if isVlen else None)
+            for i,v in enumerate(vals): ret[i]=(np.array(v).astype(dt2,casting='safe') if dt2 is not None else v)
+            return ret
+        return np.asarray(vals).astype(basedtype,casting='safe')
+
     def addAccessors(meth,attr,getter,setter=None):
         if namingConvention=='get-set':
             meth['get'+capitalize(attr)]=getter
@@ -503,10 +733,7 @@ def _cookSchema(desc, prefix='', schemaName='', fakeModule='', datasetName='', n
         datasetName = desc.get('_datasetName',schemaName)
         assert len(prefix) == 0
         T_name = 'Context_'+schemaName.replace('.', '_')
-        import hashlib
-        h = hashlib.blake2b(digest_size=6)
-        h.update(json.dumps(desc).encode('utf-8'))
-        fakeModule = types.ModuleType('_mupif_heavydata_'+h.hexdigest(), 'Synthetically generated module for mupif.HeavyStruct schemas')
+        fakeModule = types.ModuleType('_mupif_heavydata_'+_schemaDigest(desc), 'Synthetically generated module for mupif.HeavyStruct schemas')
         # this somehow breaks imports, so better to avoid it until understood
         # if fakeModule.__name__ in sys.modules: return getattr(sys.modules[fakeModule.__name__],T_name)
         # sys.modules[fakeModule.__name__]=fakeModule
@@ -548,11 +775,11 @@ def _cookSchema(desc, prefix='', schemaName='', fakeModule='', datasetName='', n
                         SchemaT=self.ctx.schemaRegistry[refSchema]
                     if self.row is None:
                         # returns the entire dataset referenced
-                        return SchemaT(top=HeavyStruct.TopContext(h5group=self.ctx.h5group,schemaRegistry=self.ctx.schemaRegistry,pyroIds=self.ctx.pyroIds),row=None)
+                        return _T_subContext(self,SchemaT,self.ctx.h5group)
                     _T_assertDataset(self,f'when looking up index array')
-                    index=np.array(self.ctx.dataset[indexName][self.row])
+                    index=np.array(_T_cell(self,indexName,self.row))
                     indices=([index] if index.ndim==0 else index)
-                    ret=[SchemaT(top=HeavyStruct.TopContext(h5group=self.ctx.h5group,schemaRegistry=self.ctx.schemaRegistry,pyroIds=self.ctx.pyroIds),row=idx) for idx in indices]
+                    ret=[_T_subContext(self,SchemaT,self.ctx.h5group,row=idx) for idx in indices]
                     #log.error(f'{index=}, {indices=}, {index.ndim=}')
                     return (ret[0] if index.ndim==0 else ret)
                 addAccessors(meth,key,indexGetter)
@@ -568,7 +795,7 @@ def _cookSchema(desc, prefix='', schemaName='', fakeModule='', datasetName='', n
                     _T_assertDataset(self, f"when looking up '{fq}' based on '{lKey}'.")
 
                     def _lookup(row):
-                        k=self.ctx.dataset[lKey, row]
+                        k=_T_cell(self,lKey,row)
                         if isinstance(k, bytes):
                             k = k.decode('utf8')
                         try:
@@ -578,6 +805,7 @@ def _cookSchema(desc, prefix='', schemaName='', fakeModule='', datasetName='', n
                         return val
                     # fake broadcasting
                     if self.row is None:
+                        _T_flush(self)
                         val = np.array([_lookup(r) for r in range(self.ctx.dataset.shape[0])])
                     else:
                         val = _lookup(self.row)
@@ -586,6 +814,16 @@ def _cookSchema(desc, prefix='', schemaName='', fakeModule='', datasetName='', n
                     else:
                         return val
                 addAccessors(meth,key,inherentGetter)
+                def lookupColumn(slab,*,fq=fq,dtype=dtype,unit=unit,lKey=lKey,lDict=lDict):
+                    keys,inv=np.unique(slab[lKey],return_inverse=True)
+                    table=[]
+                    for k in keys:
+                        if isinstance(k,bytes): k=k.decode('utf8')
+                        try: table.append(lDict[k])
+                        except KeyError: raise KeyError(f"{fq}: key '{k}' ({lKey}) not found in the lookup table with keys {list(lDict.keys())}") from None
+                    val=np.array(table,dtype=dtype)[inv.reshape(-1)]
+                    return (val if unit is None else units.Quantity(value=val,unit=unit))
+                ret.columns[fq]=((lKey,),lookupColumn,None)
             elif 'choice' in val:
                 choices=val['choice']
                 num=0
@@ -604,12 +842,20 @@ def _cookSchema(desc, prefix='', schemaName='', fakeModule='', datasetName='', n
                 ret.defaults[fq]=list(num2str.keys())[0] # first key is the default
                 ret.units[fq]=None
                 def getter(self,*,fq=fq):
-                    if self.row is not None: return num2str[self.ctx.dataset[fq,self.row]]
-                    else: return [num2str[self.ctx.dataset[fq,r]] for r in range(self.ctx.dataset.shape[0])]
+                    if self.row is not None: return num2str[_T_cell(self,fq,self.row)]
+                    _T_flush(self)
+                    return [num2str[n] for n in self.ctx.dataset[fq]]
                 def setter(self,val,*,fq=fq):
-                    if self.row is not None: self.ctx.dataset[fq,self.row]=str2num[val]
-                    else: self.ctx.dataset[fq]=np.full(self.ctx.dataset.shape[0],str2num[val])
+                    if self.row is not None: _T_setCell(self,fq,self.row,str2num[val])
+                    else:
+                        _T_flush(self,invalidate=True)
+                        self.ctx.dataset[fq]=np.full(self.ctx.dataset.shape[0],str2num[val])
                 addAccessors(meth,key,getter,setter)
+                ret.columns[fq]=(
+                    (fq,),
+                    lambda slab,*,fq=fq,labels=np.array([num2str[n] for n in range(num)]): labels[slab[fq]],
+                    lambda vals,*,dtype=dtype,str2num=str2num: np.array([str2num[v] for v in vals],dtype=dtype)
+                )
             elif 'mupifType' in val: ## XXX experimental
                 dtype,unit,default,doc=dtypeUnitDefaultDoc(val)
                 if issubclass(dtype.type,numbers.Integral): ndim=0
@@ -621,28 +867,28 @@ def _cookSchema(desc, prefix='', schemaName='', fakeModule='', datasetName='', n
                     if self.row is None:
                         raise NotImplementedError(f'{fq}: broadcasting.')
                     if ndim==0:
-                        index=self.ctx.dataset[self.row,fq]
+                        index=_T_cell(self,fq,self.row)
                         grp=self.ctx.h5group[mupifObjectGrp]
                         return _mupif_from_hdf5_group(grp=grp,index=index,storedType=val['mupifType'])
                     else:
                         assert ndim==1
-                        return [_mupif_from_hdf5_group(grp=self.ctx.h5group[mupifObjectGrp],index=ix,storedType=val['mupifType']) for ix in np.array(self.ctx.dataset[self.row,fq])]
+                        return [_mupif_from_hdf5_group(grp=self.ctx.h5group[mupifObjectGrp],index=ix,storedType=val['mupifType']) for ix in np.array(_T_cell(self,fq,self.row))]
                 def setter(self,val,metadata={},*,dtype=dtype,fq=fq,ndim=ndim):
                     if self.row is None: raise NotImplementedError(f'{fq}: broadcasting.')
                     if mupifObjectGrp not in self.ctx.h5group: self.ctx.h5group.create_group(mupifObjectGrp)
                     if ndim==0:
                         index=_mupif_to_hdf5_group__return_index(grp=self.ctx.h5group[mupifObjectGrp],obj=val)
-                        self.ctx.dataset[self.row,fq]=index
+                        _T_setCell(self,fq,self.row,index)
                     else:
                         assert ndim==1
                         indices=np.array([_mupif_to_hdf5_group__return_index(grp=self.ctx.h5group[mupifObjectGrp],obj=v) for v in val])
-                        setEntireDatasetRow_changeOneItem(ds=self.ctx.dataset,row=self.row,fq=fq,val=indices.astype(h5py.check_vlen_dtype(dtype)))
+                        _T_setCell(self,fq,self.row,indices.astype(h5py.check_vlen_dtype(dtype)),wholeRow=True)
                 def appender(self,val,*,dtype=dtype,ndim=ndim,fq=fq):
                     assert ndim==1
                     if mupifObjectGrp not in self.ctx.h5group: self.ctx.h5group.create_group(mupifObjectGrp)
                     newIx=_mupif_to_hdf5_group__return_index(grp=self.ctx.h5group[mupifObjectGrp],obj=val)
-                    indices=np.array(self.ctx.dataset[self.row,fq].tolist()+[newIx])
-                    setEntireDatasetRow_changeOneItem(ds=self.ctx.dataset,row=self.row,fq=fq,val=indices.astype(h5py.check_vlen_dtype(dtype)))
+                    indices=np.array(_T_cell(self,fq,self.row).tolist()+[newIx])
+                    _T_setCell(self,fq,self.row,indices.astype(h5py.check_vlen_dtype(dtype)),wholeRow=True)
                 addAccessors(meth,key,getter,setter)
                 if ndim==1:
                     assert namingConvention=='get-set'
@@ -659,8 +905,10 @@ def _cookSchema(desc, prefix='', schemaName='', fakeModule='', datasetName='', n
                 if default is not None: ret.defaults[fq]=default # add to the defaults
                 def getter(self,*,fq=fq,unit=unit,delim=delim,isJson=isJson):
                     _T_assertDataset(self,f"when getting the value of '{fq}'")
-                    if self.row is not None: value=self.ctx.dataset[fq,self.row]
-                    else: value=self.ctx.dataset[fq]
+                    if self.row is not None: value=_T_cell(self,fq,self.row)
+                    else:
+                        _T_flush(self)
+                        value=self.ctx.dataset[fq]
                     if isinstance(value,bytes): value=value.decode('utf-8')
                     if delim is not None: value=tuple(value.split(delim))
                     if isJson: value=json.loads(value)
@@ -696,8 +944,10 @@ def _cookSchema(desc, prefix='', schemaName='', fakeModule='', datasetName='', n
                     #_T_assertWritable(self,f"when setting the value of '{fq}'")
                     val=_cookValue(val,unit=unit,dtype=dtype,basedtype=basedtype,delim=delim)
                     # sys.stderr.write(f'{fq}: direct setting {val}\n')
-                    if self.row is None: self.ctx.dataset[fq]=val
-                    else: self.ctx.dataset[self.row,fq]=val
+                    if self.row is None:
+                        _T_flush(self,invalidate=True)
+                        self.ctx.dataset[fq]=val
+                    else: _T_setCell(self,fq,self.row,val)
                 def setter_wholeRow(self,val,*,fq=fq,unit=unit,dtype=dtype,basedtype=basedtype,delim=delim,isJson=isJson):
                     _T_assertDataset(self,f"when setting the value of '{fq}'")
                     #_T_assertWritable(self,f"when setting the value of '{fq}'")
@@ -705,9 +955,16 @@ def _cookSchema(desc, prefix='', schemaName='', fakeModule='', datasetName='', n
                     #sys.stderr.write(f'{fq}: wholeRow setting {repr(val)}\n')
                     # kind=='O' covers h5py.vlen_dtype and strings (h5py.string_dtype) with variable length
                     if self.row is None: raise NotImplementedError('Broadcasting to variable-length fields or multidimensional subarrays not yet implemented.')
-                    setEntireDatasetRow_changeOneItem(ds=self.ctx.dataset,row=self.row,fq=fq,val=val)
+                    _T_setCell(self,fq,self.row,val,wholeRow=True)
                     #log.error(f'{rowdata=}')
                 addAccessors(meth,key,getter,(setter_wholeRow if (dtype.kind=='O' or dtype.ndim>1) else setter_direct))
+                isStr=(h5py.check_string_dtype(dtype) is not None or basedtype.kind=='S')
+                isVlen=(not isStr and h5py.check_vlen_dtype(dtype) is not None)
+                ret.columns[fq]=(
+                    (fq,),
+                    lambda slab,*,fq=fq,unit=unit,isStr=isStr,isVlen=isVlen,delim=delim,isJson=isJson: readColumn(slab[fq],unit=unit,isStr=isStr,isVlen=isVlen,delim=delim,isJson=isJson),
+                    lambda vals,*,fq=fq,unit=unit,dtype=dtype,basedtype=basedtype,isStr=isStr,isVlen=isVlen,delim=delim,isJson=isJson: writeColumn(vals,fq=fq,unit=unit,dtype=dtype,basedtype=basedtype,isStr=isStr,isVlen=isVlen,delim=delim,isJson=isJson)
+                )
             elif 'schema' in val:
                 schema,path=val['schema'],val.get('path','{NAME}/{ROW}/')
                 path=path.replace('{NAME}',key)
@@ -723,10 +980,8 @@ def _cookSchema(desc, prefix='', schemaName='', fakeModule='', datasetName='', n
                     #_T_assertDataset(self,f"when accessing subschema '{path}'.")
                     #self.ctx.dataset[self.row] # catch invalid row index, data unused
                     #print(f"{fq}: getting {path}")
-                    path=path.replace('{ROW}',str(row))
-                    subgrp=self.ctx.h5group.require_group(path)
-                    SchemaT=self.ctx.schemaRegistry[schema]
-                    ret=SchemaT(top=HeavyStruct.TopContext(h5group=subgrp,schemaRegistry=self.ctx.schemaRegistry,pyroIds=self.ctx.pyroIds),row=None)
+                    subgrp=self.ctx.slabCache.group(self.ctx.h5group,path.replace('{ROW}',str(row)))
+                    ret=_T_subContext(self,self.ctx.schemaRegistry[schema],subgrp)
                     # print(f"{fq}: schema is {SchemaT}, returning: {ret}.")
                     return _registeredWithDaemon(self,ret)
                 ret.doc+=[docHead+': '+makeDoc(key,'nested data at `{path}`, schema `{schema}`.',ro=True)]
@@ -746,6 +1001,7 @@ def _cookSchema(desc, prefix='', schemaName='', fakeModule='', datasetName='', n
             raise
     def _registeredWithDaemon(context,obj):
         if not hasattr(context,'_pyroDaemon'): return obj
+        if context.ctx.pyroContexts is not None: return context.ctx.pyroContexts.register(context._pyroDaemon,obj,context)
         context._pyroDaemon.register(obj)
         context.ctx.pyroIds.append(obj._pyroId)
         return obj
@@ -795,6 +1051,122 @@ def _cookSchema(desc, prefix='', schemaName='', fakeModule='', datasetName='', n
         #log.error(f'{self.ctx.h5group.file=}')
         #log.error(f'{self.ctx.h5group.file.mode=}')
         if self.ctx.h5group.file.mode!='r+': raise RuntimeError(f'Underlying HDF5 file was not open for writing ({msg}).')
+    def _T_cell(self,fq,row):
+        'Return stored value of *fq* in *row*, through the slab cache.'
+        return self.ctx.slabCache.get(self.ctx.dataset,row,fq)
+    def _T_setCell(self,fq,row,val,wholeRow=False):
+        'Store value of *fq* in *row*, through the slab cache; *wholeRow* works around h5py bugs with variable-length fields and subarrays.'
+        self.ctx.slabCache.set(self.ctx.dataset,row,fq,val,wholeRow=wholeRow)
+    def _T_flush(self,invalidate=False):
+        'Write buffered rows to the dataset, before the dataset is accessed directly; with *invalidate*, also discard cached rows (before the dataset is modified directly).'
+        if self.ctx.dataset is None:
+            # dataset might have been opened (and cached) through another context
+            if self.__class__.datasetName not in self.ctx.h5group: return
+            _T_assertDataset(self)
+        self.ctx.slabCache.flush(self.ctx.dataset,invalidate=invalidate)
+    def _T_subContext(self,SchemaT,h5group,row=None):
+        'Return context of *SchemaT* for data in *h5group*, sharing caches with this context.'
+        return SchemaT(top=HeavyStruct.TopContext(h5group=h5group,schemaRegistry=self.ctx.schemaRegistry,pyroIds=self.ctx.pyroIds,slabCache=self.ctx.slabCache,pyroContexts=self.ctx.pyroContexts),row=row)
+    def _T_columnRange(self,start,stop,msg):
+        _T_assertDataset(self,msg=msg)
+        if self.row is not None: raise IndexError(f'Row index already set ({msg}), use context without row index.')
+        return range(self.ctx.dataset.shape[0])[start:stop]
+    def T_readColumns(self,fields=None,start=0,stop=None,*,ret=ret):
+        '''
+        Read values of many rows at once, as columns. Only the fields needed are read from the dataset, in one operation.
+
+        :param fields: fully-qualified names (such as ``identity.element``) of data attributes to read (including lookups and choices); all of them if not given
+        :param int start: first row
+        :param int stop: one past the last row (the end of the dataset if not given)
+        :return: dictionary of columns, keyed by field name; columns with unit are returned as Quantity, strings as array of str, string lists and json data as lists
+        '''
+        rr=_T_columnRange(self,start,stop,'when reading columns')
+        if fields is None: fields=list(ret.columns.keys())
+        for fq in fields:
+            if fq not in ret.columns: raise KeyError(f'{fq}: not a data attribute of schema {self.schemaName} (data attributes are: {", ".join(ret.columns.keys())}).')
+        stored=list(dict.fromkeys(itertools.chain.from_iterable(ret.columns[fq][0] for fq in fields)))
+        _T_flush(self)
+        slab=(self.ctx.dataset.fields(stored)[rr.start:rr.stop] if stored else None)
+        return dict([(fq,ret.columns[fq][1](slab)) for fq in fields])
+    def T_writeColumns(self,columns,start=0,*,ret=ret):
+        '''
+        Write values of many rows at once. Units and types are converted once per column, rows are read and written back in one operation.
+
+        :param dict columns: values keyed by fully-qualified field names; all columns must have the same length, rows must exist already (see ``resize``)
+        :param int start: first row to write
+        '''
+        _T_assertWritable(self,msg='when writing columns')
+        if not columns: return
+        lens=set(len(v) for v in columns.values())
+        if len(lens)!=1: raise ValueError(f'All columns must have the same length (lengths are {", ".join(str(l) for l in lens)}).')
+        n=lens.pop()
+        rr=_T_columnRange(self,start,start+n,'when writing columns')
+        if len(rr)!=n: raise IndexError(f'Rows {start}…{start+n} out of range 0…{self.ctx.dataset.shape[0]} (resize first).')
+        cooked={}
+        for fq,vals in columns.items():
+            if fq not in ret.columns: raise KeyError(f'{fq}: not a data attribute of schema {self.schemaName}.')
+            if (writer:=ret.columns[fq][2]) is None: raise AttributeError(f'{fq}: read-only attribute.')
+            cooked[fq]=writer(vals)
+        _T_flush(self,invalidate=True)
+        slab=self.ctx.dataset[rr.start:rr.stop]
+        for fq,col in cooked.items(): slab[fq]=col
+        self.ctx.dataset[rr.start:rr.stop]=slab
+    def T_readRows(self,start=0,stop=None):
+        'Return rows *start*…*stop* as structured numpy array, with values as stored (in units of the schema).'
+        rr=_T_columnRange(self,start,stop,'when reading rows')
+        _T_flush(self)
+        return self.ctx.dataset[rr.start:rr.stop]
+    def T_writeRows(self,rows,start=0):
+        'Write structured numpy array *rows* (as returned by ``readRows``), starting at row *start*; rows must exist already.'
+        _T_assertWritable(self,msg='when writing rows')
+        rows=np.asarray(rows,dtype=self.ctx.dataset.dtype)
+        rr=_T_columnRange(self,start,start+len(rows),'when writing rows')
+        if len(rr)!=len(rows): raise IndexError(f'Rows {start}…{start+len(rows)} out of range 0…{self.ctx.dataset.shape[0]} (resize first).')
+        _T_flush(self,invalidate=True)
+        self.ctx.dataset[rr.start:rr.stop]=rows
+    @contextlib.contextmanager
+    def T_bufferedWrites(self,slabRows=None):
+        '''
+        Context manager buffering writes: setters of individual rows modify slabs of *slabRows* rows (default is the slab size of the cache) held in memory; modified slabs are written back in one operation when evicted from the cache, and when the context manager exits.
+        '''
+        _T_assertDataset(self,msg='when buffering writes')
+        cache,ds=self.ctx.slabCache,self.ctx.dataset
+        if ds.name in cache.writeBack:
+            yield self
+            return
+        cache.beginWriteBack(ds,slabRows=slabRows)
+        try: yield self
+        finally: cache.endWriteBack(ds)
+    def T_readPacked(self,fields=None,start=0,stop=None,sub=None,*,ret=ret):
+        '''
+        Read columns of rows *start*…*stop* (as ``readColumns``), packed as plain arrays so that they can be transferred over the network in one call; use :obj:`unpackColumns` to get the columns back.
+
+        :param sub: name of subschema entry (such as ``molecules``), or list of names following subschemas over several levels (such as ``['molecules','atoms']``); if given, *fields* are read from all rows of the nested data of each row *start*…*stop* (``None`` for rows without nested data), returned as list under the ``rows`` key instead of ``columns``
+        :return: dictionary with ``start`` and ``stop`` (row range) and ``columns`` (packed columns, see :obj:`packColumns`)
+        '''
+        rr=_T_columnRange(self,start,stop,'when reading packed columns')
+        if isinstance(sub,str): sub=[sub]
+        if not sub: return {'start':rr.start,'stop':rr.stop,'columns':packColumns(self.readColumns(fields,rr.start,rr.stop))}
+        if sub[0] not in ret.subpaths: raise KeyError(f'{sub[0]}: not a subschema entry of schema {self.schemaName} (subschema entries are: {", ".join(ret.subpaths.keys())}).')
+        path,schema=ret.subpaths[sub[0]]
+        rows=[]
+        for row in rr:
+            p=path.replace('{ROW}',str(row))
+            if p not in self.ctx.h5group: rows.append(None)
+            elif len(subctx:=_T_subContext(self,self.ctx.schemaRegistry[schema],self.ctx.slabCache.group(self.ctx.h5group,p)))==0: rows.append(None)
+            else: rows.append(subctx.readPacked(fields,sub=sub[1:]))
+        return {'start':rr.start,'stop':rr.stop,'rows':rows}
+    def T_writePacked(self,columns,start=0):
+        'Write columns packed by :obj:`packColumns` (such as the ``columns`` entry returned by ``readPacked``), starting at row *start*; this is ``writeColumns`` usable over the network.'
+        self.writeColumns(unpackColumns(columns),start=start)
+    def T_release(self):
+        'Unregister this context from Pyro daemon (no-op if not registered); proxies of the context become invalid.'
+        if not hasattr(self,'_pyroDaemon'): return
+        if self.ctx.pyroContexts is not None: self.ctx.pyroContexts.release(self)
+        else:
+            pyroId=self._pyroId
+            self._pyroDaemon.unregister(self)
+            if pyroId in self.ctx.pyroIds: self.ctx.pyroIds.remove(pyroId)
     def T_resize(self,size,reset=False,*,ret=ret):
         'Resizes the backing dataset; this will, as necessary, create a new dataset, or grow/shrink size of an existing dataset. New records are always default-initialized.'
         def _initrows(ds,rowmin,rowmax):
@@ -804,6 +1176,7 @@ def _cookSchema(desc, prefix='', schemaName='', fakeModule='', datasetName='', n
             ds[rowmin+1:rowmax+1]=defrow
         assert size>=0
         _T_assertWritable(self,msg=f'when resizing to {size}.')
+        _T_flush(self,invalidate=True)
         if reset: self.resize(size=0)
         if self.ctx.dataset is None:
             dsname=self.__class__.datasetName
@@ -827,63 +1200,140 @@ def _cookSchema(desc, prefix='', schemaName='', fakeModule='', datasetName='', n
                 for r in range(size,size0):
                     p=subpath.replace('{ROW}',str(r))
                     # sys.stderr.write(f'Resizing {self.ctx.dataset}, {prevSize} → {size}: deleting {p}\n')
-                    if p in self.ctx.h5group: del self.ctx.h5group[p]
+                    if p in self.ctx.h5group:
+                        self.ctx.slabCache.dropTree(self.ctx.h5group[p].name)
+                        del self.ctx.h5group[p]
                     else: pass # sys.stderr.write(f'{self.ctx.h5group}: does not contain {p}, not deleted')
-    def T_inject(self,other):
-        self.from_dump(other.to_dump())
-    def T_to_dump(self,*,ret=ret):
+            self.ctx.slabCache.dropGroups()
+    def _T_checkSchema(self,other):
+        'Check that data of *other* (context class) can be assigned to *self*; raise ValueError if not.'
+        if other.schemaName!=self.schemaName: raise ValueError(f'Schema mismatch: source {other.schemaName}, target {self.schemaName}')
+        if other.schemaVersion!=self.schemaVersion: log.warning(f'Schema {other.schemaName} version mismatch: source {other.schemaVersion}, target {self.schemaVersion}')
+        for fq in itertools.chain(other._units,other._subpaths):
+            if fq not in self._units and fq not in self._subpaths: raise ValueError(f'Key {fq} not in target schema {self.schemaName}, in {self.ctx.h5group}.')
+    def _T_copyRows(self,other,srcRows,dstStart,*,ret=ret):
+        '''
+        Copy rows *srcRows* of *other* to rows starting at *dstStart*, slab by slab; units are converted once per column (the slab is copied as-is if datatypes and units are the same). Nested data are copied recursively afterwards.
+        '''
+        src,dst=other.ctx.dataset,self.ctx.dataset
+        conv=dict([(fq,(u,ret.units[fq])) for fq,u in other._units.items() if u is not None and ret.units[fq] is not None and u!=ret.units[fq]])
+        raw=(src.dtype==dst.dtype and not conv)
+        step=max(self.ctx.slabCache.slabRows,1)
+        for r0 in range(srcRows.start,srcRows.stop,step):
+            r1=min(r0+step,srcRows.stop)
+            d0=dstStart+r0-srcRows.start
+            slab=src[r0:r1]
+            if not raw:
+                out=dst[d0:d0+r1-r0]
+                for fq in other._units:
+                    col=slab[fq]
+                    if fq in conv:
+                        if col.dtype.kind=='O':
+                            col2=np.empty(len(col),dtype=object)
+                            for i,v in enumerate(col): col2[i]=units.Quantity(value=v,unit=conv[fq][0]).to(conv[fq][1]).value
+                            col=col2
+                        else: col=units.Quantity(value=col,unit=conv[fq][0]).to(conv[fq][1]).value
+                    out[fq]=col
+                slab=out
+            dst[d0:d0+r1-r0]=slab
+        for fq,(subpath,schema) in other._subpaths.items():
+            dstPath,dstSchema=ret.subpaths[fq]
+            for i,row in enumerate(srcRows):
+                p=subpath.replace('{ROW}',str(row))
+                if p not in other.ctx.h5group: continue
+                srcCtx=_T_subContext(other,other.ctx.schemaRegistry[schema],other.ctx.h5group[p])
+                if not _T_hasDataset(srcCtx): continue
+                dstCtx=_T_subContext(self,self.ctx.schemaRegistry[dstSchema],self.ctx.slabCache.group(self.ctx.h5group,dstPath.replace('{ROW}',str(dstStart+i))))
+                dstCtx.inject(srcCtx)
+    def T_inject(self,other,*,ret=ret):
+        '''
+        Replace data of this context with data of *other* (recursively), resizing as necessary; both contexts must either have the row index set, or not. Local contexts are copied directly between the underlying datasets, in slabs of rows; remote contexts (Pyro proxies) are transferred using ``to_dump``.
+        '''
+        if isinstance(other,Pyro5.api.Proxy): return self.from_dump(other.to_dump())
+        _T_checkSchema(self,other)
+        if (self.row is None)!=(other.row is None): raise ValueError(f'Row index must be set for both contexts, or for neither (target row={self.row}, source row={other.row}).')
+        _T_assertWritable(self,msg='when injecting')
+        _T_flush(other)
+        # datasets are written directly: cached slabs of the whole target subtree must go
+        if self.row is None:
+            self.ctx.slabCache.dropTree(self.ctx.h5group.name,write=True)
+            self.resize(len(other),reset=True)
+            if len(other)==0: return
+            _T_copyRows(self,other,range(len(other)),0)
+        else:
+            _T_assertDataset(other,msg=f'when injecting row {other.row}')
+            _T_assertDataset(self,msg=f'when injecting into row {self.row}')
+            _T_flush(self,invalidate=True)
+            for subpath,schema in ret.subpaths.values():
+                if (p:=subpath.replace('{ROW}',str(self.row))) in self.ctx.h5group: self.ctx.slabCache.dropTree(self.ctx.h5group[p].name,write=True)
+            _T_copyRows(self,other,range(other.row,other.row+1),self.row)
+    def T_iterDump(self,*,ret=ret):
+        '''
+        Generate the data in the format of ``to_dump``, one row (dictionary) at a time; rows are read in slabs, and nested data are generators as well. Thus the data are never held in memory as a whole, as long as they are consumed by a streaming consumer (such as ``from_dump``).
+        '''
         _T_assertDataset(self,msg=f'when dumping')
-        def _onerow(row):
-            d={'_schema':{"name":schemaName,"version":schemaVersion}}
-            for fq,unit in ret.units.items(): #
-                d[fq]=(self.ctx.dataset[row,fq],unit)
-            for fq,(subpath,schema) in ret.subpaths.items():
-                SchemaT=self.ctx.schemaRegistry[schema]
-                subpath=subpath.replace('{ROW}',str(row))
-                if subpath not in self.ctx.h5group: continue
-                subgrp=self.ctx.h5group[subpath]
-                subcontext=SchemaT(top=HeavyStruct.TopContext(h5group=subgrp,schemaRegistry=self.ctx.schemaRegistry,pyroIds=[]),row=None)
-                d[fq]=subcontext.to_dump()
-            return d
-        if self.row is not None: return _onerow(self.row)
-        else: return [_onerow(r) for r in range(self.ctx.dataset.shape[0])]
+        _T_flush(self)
+        rows=(range(self.row,self.row+1) if self.row is not None else range(self.ctx.dataset.shape[0]))
+        step=max(self.ctx.slabCache.slabRows,1)
+        for r0 in range(rows.start,rows.stop,step):
+            slab=self.ctx.dataset[r0:min(r0+step,rows.stop)]
+            cols=dict([(fq,slab[fq]) for fq in ret.units])
+            for i in range(len(slab)):
+                d={'_schema':{"name":schemaName,"version":schemaVersion}}
+                for fq,unit in ret.units.items(): d[fq]=(cols[fq][i],unit)
+                for fq,(subpath,schema) in ret.subpaths.items():
+                    subpath=subpath.replace('{ROW}',str(r0+i))
+                    if subpath not in self.ctx.h5group: continue
+                    subcontext=_T_subContext(self,self.ctx.schemaRegistry[schema],self.ctx.h5group[subpath])
+                    if not _T_hasDataset(subcontext): continue
+                    d[fq]=subcontext.iterDump()
+                yield d
+    def T_to_dump(self):
+        '''
+        Return the data as list of rows (dictionary for context with the row index set), each row being dictionary with values as ``(value,unit)`` tuples and nested data as lists of rows; see ``iterDump`` for generating the rows one by one.
+        '''
+        def _materialized(d): return dict([(k,([_materialized(r) for r in v] if isinstance(v,types.GeneratorType) else v)) for k,v in d.items()])
+        ret=[_materialized(d) for d in self.iterDump()]
+        return (ret[0] if self.row is not None else ret)
     def T_from_dump(self,dump,*,ret=ret,extend=False):
+        '''
+        Assign data from *dump* (as returned by ``to_dump``): a dictionary for context with the row index set; a list of them, or any iterable (such as ``iterDump`` of another context) otherwise, replacing existing rows (or appending to them, with *extend*). Rows are written in slabs.
+        '''
         _T_assertWritable(self,msg=f'when applying dump')
-        def _onerow(row,di):
-            rowdata=self.ctx.dataset[row]
+        _T_flush(self,invalidate=True)
+        def _fill(slab,i,row,di):
             s2n,s2v=di['_schema']['name'],di['_schema']['version']
             if s2n!=self.schemaName: raise ValueError(f'Schema mismatch: source {s2n}, target {self.schemaName}')
-            if s2v!=self.schemaVersion: log.warning('Schema {s2n} version mismatch: source {s2v}, target {self.schemaVersion}')
+            if s2v!=self.schemaVersion: log.warning(f'Schema {s2n} version mismatch: source {s2v}, target {self.schemaVersion}')
             for fq,valUnit in di.items():
                 if fq=='_schema': continue
                 if fq in ret.units: # value field
-                    rowdata[fq]=valUnit[0] if (valUnit[1] is None) else units.Quantity(value=valUnit[0],unit=valUnit[1]).to(ret.units[fq]).value
+                    slab[fq][i]=valUnit[0] if (valUnit[1] is None) else units.Quantity(value=valUnit[0],unit=valUnit[1]).to(ret.units[fq]).value
                 elif fq in ret.subpaths: # subpath
-                    assert isinstance(valUnit,list)
+                    assert not isinstance(valUnit,dict)
                     subpath,schema=ret.subpaths[fq]
-                    SchemaT=self.ctx.schemaRegistry[schema]
-                    subpath=subpath.replace('{ROW}',str(row))
-                    subgrp=self.ctx.h5group.require_group(subpath)
-                    subcontext=SchemaT(top=HeavyStruct.TopContext(h5group=subgrp,schemaRegistry=self.ctx.schemaRegistry,pyroIds=[]),row=None)
-                    subcontext.from_dump(valUnit)
+                    subgrp=self.ctx.slabCache.group(self.ctx.h5group,subpath.replace('{ROW}',str(row)))
+                    _T_subContext(self,self.ctx.schemaRegistry[schema],subgrp).from_dump(valUnit)
                 else:
                     raise ValueError(f'Key {fq} not in target schema {self.schemaName}, in {self.ctx.h5group}.')
                     # key not in target schema
-            self.ctx.dataset[row]=rowdata
         if self.row is not None:
             assert isinstance(dump,dict)
             _T_assertDataset(self,msg=f'when applying dump with row={self.row}')
-            _onerow(self.row,dump)
-        else:
-            assert isinstance(dump,list)
-            if not extend:
-                offset=0
-                self.resize(len(dump),reset=True)
-            else:
-                offset=self.ctx.dataset.shape[0]
-                self.resize(offset+len(dump),reset=False)
-            _T_assertDataset(self,msg=f'when applying dump')
-            for row,di in enumerate(dump): _onerow(offset+row,di)
+            slab=self.ctx.dataset[self.row:self.row+1]
+            _fill(slab,0,self.row,dump)
+            self.ctx.dataset[self.row:self.row+1]=slab
+            return
+        assert not isinstance(dump,dict)
+        if not extend: self.resize(0)
+        offset=len(self)
+        rows=iter(dump)
+        while chunk:=list(itertools.islice(rows,max(self.ctx.slabCache.slabRows,1))):
+            self.resize(offset+len(chunk))
+            slab=self.ctx.dataset[offset:offset+len(chunk)]
+            for i,di in enumerate(chunk): _fill(slab,i,offset+i,di)
+            self.ctx.dataset[offset:offset+len(chunk)]=slab
+            offset+=len(chunk)
 
     def T_iter(self):
         _T_assertDataset(self,msg=f'when iterating')
@@ -893,6 +1343,7 @@ def _cookSchema(desc, prefix='', schemaName='', fakeModule='', datasetName='', n
     meth['__str__']=meth['__repr__']=T_str
     meth['__getitem__']=T_getitem
     meth['__len__']=T_len
+    meth['release']=T_release
     meth['row']=None
     meth['ctx']=None
     # __del__ note: it would be nice to use context destructor to unregister contexts from Pyro
@@ -905,6 +1356,14 @@ def _cookSchema(desc, prefix='', schemaName='', fakeModule='', datasetName='', n
         meth['to_dump']=T_to_dump
         meth['from_dump']=T_from_dump
         meth['inject']=T_inject
+        meth['iterDump']=T_iterDump
+        meth['readColumns']=T_readColumns
+        meth['writeColumns']=T_writeColumns
+        meth['readRows']=T_readRows
+        meth['writeRows']=T_writeRows
+        meth['bufferedWrites']=T_bufferedWrites
+        meth['readPacked']=T_readPacked
+        meth['writePacked']=T_writePacked
         ret.dtypes=np.dtype(ret.dtypes)
         T_bases=()
     else:
@@ -919,21 +1378,74 @@ def _cookSchema(desc, prefix='', schemaName='', fakeModule='', datasetName='', n
     if not prefix:
         T.schemaName=schemaName # schema knows its own name, for convenience of creating schema registry
         T.schemaVersion=schemaVersion
-        T.__doc__='\n'.join(ret.doc)+'\n'
+        T._units,T._subpaths=ret.units,ret.subpaths # used when copying data from other contexts
+        T.__doc__=_LazyDoc(ret.doc)
         return T
     else:
         ret.T=T
         return ret
 
 
-def makeSchemaRegistry(dd):
+def _cookSchemaCached(desc):
+    '''
+    Return context type for top-level schema *desc*, cooking it only if the same schema (by digest of its JSON representation) was not cooked before. Context types keep no per-file state (that lives in the ``ctx`` of instances), thus are shared between all opened files.
+    '''
+    digest = _schemaDigest(desc, digestSize=16)
+    with _cookedSchemasLock:
+        T = _cookedSchemas.get(digest, None)
+        if T is not None:
+            _cookedSchemas.move_to_end(digest)
+            return T
+    T = _cookSchema(desc)
+    with _cookedSchemasLock:
+        T = _cookedSchemas.setdefault(digest, T)
+        while len(_cookedSchemas) > _cookedSchemasMax: _cookedSchemas.popitem(last=False)
+    return T
+
+
+def makeSchemaRegistry(dd, cache=True):
     '''
     Compile schema registry from dictionary representation; use ``json.loads`` to convert JSON schema to its dictionary representation.
+
+    :param bool cache: reuse context types cooked previously for identical schemas; with ``False``, new types are always created
     '''
-    return dict([((T:=_cookSchema(d)).schemaName,T) for d in dd])
+    cook = (_cookSchemaCached if cache else _cookSchema)
+    return dict([((T:=cook(d)).schemaName,T) for d in dd])
+
 
+def packColumns(columns):
+    '''
+    Pack columns (as returned by ``readColumns``) for transfer over the network: quantities are split into values (numpy arrays) and unit (string), since Pyro only transfers plain arrays.
 
-def _make_grains(h5name):
+    :return: dictionary keyed by field name, each packed column being dictionary with ``value``, ``unit`` (string or ``None``) and ``vlen`` (whether value is list of per-row arrays)
+    '''
+    ret={}
+    for fq,col in columns.items():
+        unit,vlen=None,isinstance(col,list)
+        if isinstance(col,units.Quantity): unit,col=col.unit,col.value
+        elif vlen and col and isinstance(col[0],units.Quantity): unit,col=col[0].unit,[c.value for c in col]
+        elif isinstance(col,np.ndarray) and col.dtype.kind=='O': col,vlen=list(col),True
+        ret[fq]={'value':col,'unit':(None if unit is None else unit.to_string()),'vlen':vlen}
+    return ret
+
+
+def unpackColumns(packed):
+    '''
+    Reverse of :obj:`packColumns`: return columns keyed by field name, with units applied.
+    '''
+    ret={}
+    for fq,p in packed.items():
+        col,unit=p['value'],p['unit']
+        if unit is None: ret[fq]=col
+        elif p['vlen']: ret[fq]=[units.Quantity(value=v,unit=unit) for v in col]
+        else: ret[fq]=units.Quantity(value=col,unit=unit)
+    return ret
+
+
+def _make_grains(h5name,bulk=False):
+    '''
+    Benchmark writing sample data; with *bulk*, atoms of each molecule are written column-wise (see ``writeColumns``).
+    '''
     import time, random
     from mupif.units import U as u
     t0=time.time()
@@ -960,6 +1472,17 @@ def _make_grains(h5name):
                 # print('molecule: ',m)
                 m.getIdentity().setMolecularWeight(random.randint(1,10)*u.yg)
                 m.getAtoms().resize(size=random.randint(30,60))
+                if bulk:
+                    atoms=m.getAtoms()
+                    n=len(atoms)
+                    atoms.writeColumns({
+                        'identity.element':[random.choice(['H','N','Cl','Na','Fe']) for i in range(n)],
+                        'properties.topology.position':np.tile((1,2,3),(n,1))*u.nm,
+                        'properties.topology.velocity':np.tile((24,5,77),(n,1))*u.m/u.s,
+                        'properties.topology.structure':[np.array([random.randint(1,20) for i in range(random.randint(5,20))],dtype='l') for j in range(n)],
+                    })
+                    atomCounter+=n
+                    continue
                 for a in m.getAtoms():
                     #for ia in range(len(m.getAtoms())):
                     #a=m.getAtoms()[ia]
@@ -974,7 +1497,10 @@ def _make_grains(h5name):
     log.info(f'{atomCounter} atoms created in {t1-t0:g} sec ({atomCounter/(t1-t0):g}/sec).')
 
 
-def _read_grains(h5name):
+def _read_grains(h5name,bulk=False):
+    '''
+    Benchmark reading sample data; with *bulk*, atoms of each molecule are read column-wise (see ``readColumns``).
+    '''
     import time
     # note how this does NOT need any schemas defined, they are all pulled from the HDF5
     t0 = time.time()
@@ -988,6 +1514,10 @@ def _read_grains(h5name):
             log.info(f'Grain #{g.row} has {len(g.getMolecules())} molecules.')
             for m in g.getMolecules():
                 m.getIdentity().getMolecularWeight()
+                if bulk:
+                    cols=m.getAtoms().readColumns(['identity.element','properties.topology.position','properties.topology.velocity','properties.topology.structure'])
+                    atomCounter+=len(cols['identity.element'])
+                    continue
                 for a in m.getAtoms():
                     a.getIdentity().getElement()
                     a.getProperties().getTopology().getPosition()
@@ -1009,6 +1539,10 @@ class HeavyStruct(HeavyDataBase):
     schemaName: typing.Optional[str] = None
     schemasJson: typing.Optional[str] = None
     id: dataid.DataID = dataid.DataID.ID_None
+    #: number of rows read at once (and cached) when accessing individual rows; 0 disables caching
+    slabCacheRows: int = 256
+    #: maximum number of sub-contexts registered with Pyro daemon at a time, least recently used ones are unregistered; 0 for no limit
+    pyroContextsMax: int = 10000
 
     # __doc__ is a computed property which will add documentation for the sample JSON schemas
     __doc0__ = '''
@@ -1081,7 +1615,14 @@ Data are accesse using *Contexts*, special classes abstracting away the underlyi
 Top contexts (on the level of the schema) define a few special methods:
 
 * ``resize`` which will change the number of rows; new rows will be always set to the default values. When passing the argument ``reset=True`` to ``resize``, all rows will be default-initialized.
-* ``inject`` will replace the current context's data with data from another context (recursively); the routine will take care to resize structures as necessary. Schema names must be matching, and differences in schema versions will be reported as warning (it will be possible to user-define transformation for converting between different schema versions). The data exchange happens using serialized format which can be obtained and consumed using ``to_dump()`` and ``from_dump(…)`` methods.
+* ``inject`` will replace the current context's data with data from another context (recursively); the routine will take care to resize structures as necessary. Schema names must be matching, and differences in schema versions will be reported as warning (it will be possible to user-define transformation for converting between different schema versions). Local contexts are copied directly between the underlying datasets, in slabs of rows, with units converted per column. Data can be also exchanged using serialized format which can be obtained and consumed using ``to_dump()`` and ``from_dump(…)`` methods; ``iterDump()`` generates the same rows lazily, one by one, and ``from_dump(…)`` accepts the generator, so that large data never need to be held in memory as a whole.
+* ``readColumns`` and ``writeColumns`` read/write values of many rows at once, as columns keyed by fully-qualified attribute names (such as ``identity.element``); units are converted once per column. ``readRows`` and ``writeRows`` transfer row ranges as structured numpy arrays (values as stored, in units of the schema).
+* ``bufferedWrites`` is a context manager under which setters of individual rows modify row slabs held in memory, written back to the storage in bulk.
+* ``readPacked`` and ``writePacked`` transfer columns of row ranges (optionally of nested data over several subschema levels, such as atoms of all molecules) packed as plain arrays, see :obj:`packColumns` and :obj:`unpackColumns`; this is the efficient way of accessing many rows remotely, as it takes one network call instead of one (or more) per row.
+
+Getters of individual rows read slabs of :obj:`slabCacheRows` rows at once and serve following rows from memory; the cache is shared by all contexts returned from one :obj:`openData` call, and kept consistent with writes done through them. Data modified in the same file by other means (e.g. another :obj:`HeavyStruct` instance) might not be seen.
+
+Contexts returned by a :obj:`HeavyStruct` registered with Pyro daemon are registered with the same daemon (and passed by proxy); equal contexts are registered only once, and at most :obj:`pyroContextsMax` of them at a time (least recently used contexts are unregistered, and their proxies become invalid). ``release()`` unregisters a context explicitly; all contexts are unregistered by :obj:`closeData`.
 
 Each parent group defines a special property ``schema_fragment`` which returns the schema as Python structure; this is to allow custom entries in the schema (such as descriptions or ontology mappings) to be accessed by the user.
 
@@ -1115,6 +1656,8 @@ Each parent group defines a special property ``schema_fragment`` which returns t
         pyroIds: list
         schemaRegistry: dict
         dataset: Any = None
+        slabCache: Any = dataclasses.field(default_factory=_RowSlabCache)
+        pyroContexts: Any = None
 
         def __str__(self):
             return f'{self.__module__}.{self.__class__.__name__}(h5group={str(self.h5group)},dataset={str(self.dataset)},schemaRegistry=<<{",".join(self.schemaRegistry.keys())}>>)'
@@ -1133,7 +1676,7 @@ Each parent group defines a special property ``schema_fragment`` which returns t
             # for modes readonly, readwrite
             grp = self._h5obj[self.h5group]
             schemaRegistry = makeSchemaRegistry(json.loads(grp.attrs['schemas']))
-            top=schemaRegistry[grp.attrs['schema']](top=HeavyStruct.TopContext(h5group=grp, schemaRegistry=schemaRegistry, pyroIds=self.pyroIds))
+            top=schemaRegistry[grp.attrs['schema']](top=HeavyStruct.TopContext(h5group=grp, schemaRegistry=schemaRegistry, pyroIds=self.pyroIds, slabCache=_RowSlabCache(slabRows=self.slabCacheRows), pyroContexts=_PyroContextRegistry(self.pyroIds, maxContexts=self.pyroContextsMax)))
             self.updateMetadata(json.loads(grp.attrs['metadata']))
             return self._returnProxy(top)
         else:
@@ -1145,7 +1688,7 @@ Each parent group defines a special property ``schema_fragment`` which returns t
             grp.attrs['schema'] = self.schemaName
             grp.attrs['metadata'] = json.dumps(self.getAllMetadata())
             schemaRegistry = makeSchemaRegistry(json.loads(self.schemasJson))
-            top = schemaRegistry[grp.attrs['schema']](top=HeavyStruct.TopContext(h5group=grp, schemaRegistry=schemaRegistry, pyroIds=self.pyroIds))
+            top = schemaRegistry[grp.attrs['schema']](top=HeavyStruct.TopContext(h5group=grp, schemaRegistry=schemaRegistry, pyroIds=self.pyroIds, slabCache=_RowSlabCache(slabRows=self.slabCacheRows), pyroContexts=_PyroContextRegistry(self.pyroIds, maxContexts=self.pyroContextsMax)))
             return self._returnProxy(top)
     def getSchemaName(self):
         self._ensureData()
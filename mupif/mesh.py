@@ -34,6 +34,8 @@ from . import localizer
 from .heavydata import HeavyConvertible
 import copy
 import time
+import threading
+import weakref
 import sys
 import os.path
 import numpy
@@ -55,6 +57,53 @@ CELLS = 1
 # debug flag
 debug = 0
 
+# process-wide registry of meshes, see registerMesh
+_meshRegistry = weakref.WeakValueDictionary()
+_meshRegistryLock = threading.Lock()
+
+
+def registeredMesh(key):
+    """
+    Return mesh registered under *key* (see :obj:`Mesh.registryKey`), or None if there is no such mesh (or it was modified since being registered).
+
+    The key stored with the mesh is compared, without computing :obj:`Mesh.registryKey` again, unless the mesh was modified.
+    """
+    if key is None: return None
+    with _meshRegistryLock:
+        m = _meshRegistry.get(key, None)
+    if m is not None and m._storedRegistryKey() != key: return None
+    return m
+
+
+def registerMesh(mesh, key=None):
+    """
+    Register *mesh* in the process-wide mesh registry, under *key* (defaults to :obj:`Mesh.registryKey`). If an equivalent mesh is registered already, it is returned and *mesh* is not registered; HDF5 readers use the returned mesh, so that fields defined on identical meshes share one mesh instance.
+
+    The registry only holds weak references: meshes disappear from it once they are not referenced anywhere else.
+
+    .. note:: Meshes are shared, not copied: modifying a mesh returned by a reader modifies it for all fields using it (the modified mesh is not returned by subsequent reads, though). Use :obj:`Mesh.copy` to obtain an independent mesh.
+
+    :param key: registry key; if given, it must be the current :obj:`Mesh.registryKey` of *mesh* (such as the one stored in HDF5 along with the mesh, see :obj:`Mesh.hdf5RegistryKey`)
+    :return: registered mesh (*mesh* itself or an equivalent mesh registered previously)
+    :rtype: Mesh
+    """
+    if key is None: key = mesh._storedRegistryKey()
+    else: mesh._registryKey = key
+    if key is None: return mesh
+    with _meshRegistryLock:
+        m = _meshRegistry.get(key, None)
+    # validity of the registered mesh is checked without holding the lock (may be expensive if it was modified)
+    if m is not None and m is not mesh and m._storedRegistryKey() == key: return m
+    with _meshRegistryLock:
+        _meshRegistry[key] = mesh
+    return mesh
+
+
+def clearMeshRegistry():
+    'Remove all meshes from the mesh registry.'
+    with _meshRegistryLock:
+        _meshRegistry.clear()
+
 
 @Pyro5.api.expose
 class MeshIterator(object):
@@ -136,9 +185,17 @@ class Mesh(baredata.BareData):
         if hasattr(self,'_postDump'): self._postDump()
 
     def _setDirty(self):
-        'Invalidate (reset) cached data'
+        'Invalidate (reset) cached data; called when the mesh is modified, also by its vertices and cells when their attributes are assigned (vertex coordinates are read-only arrays, so they cannot be modified in-place).'
         self._vertexOctree=None
         self._cellOctree=None
+        self._geometryArrays=None
+        self._dataDigest=None
+        self._registryKey=None
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        # assigning data (e.g. vertexList or vertexCoords) modifies the mesh
+        if not name.startswith('_'): self._setDirty()
 
     @classmethod
     def loadFromLocalFile(cls, fileName) -> typing.Self:
@@ -193,7 +250,7 @@ class Mesh(baredata.BareData):
 
     def getVertices(self):
         """
-        Return all vertex coordinates as 2D (Nx3) numpy.array; each i-th row contains 3d coordinates of the i-th vertex.
+        Return all vertex coordinates as 2D (Nx3) numpy.array; each i-th row contains 3d coordinates of the i-th vertex. For meshes with 2D vertex coordinates, the array is Nx2.
 
         :return: vertices
         :rtype: numpy.array
@@ -201,10 +258,9 @@ class Mesh(baredata.BareData):
         .. note:: This method has not been tested yet.
         """
         nv = self.getNumberOfVertices()
-        ret = numpy.empty((nv, 3), dtype=numpy.float64)
-        for i in range(0, nv):
-            ret[i] = numpy.array(self.getVertex(i).getCoordinates())
-        return ret
+        if nv == 0:
+            return numpy.empty((0, 3), dtype=numpy.float64)
+        return numpy.array([self.getVertex(i).getCoordinates() for i in range(0, nv)], dtype=numpy.float64)
 
     def getCell(self, i) -> cell.Cell:
         """
@@ -240,6 +296,54 @@ class Mesh(baredata.BareData):
             cc[i, :len(vv)] = vv  # excess elements in the row stay at -1
         return tt, cc
 
+    def _getGeometryArrays(self):
+        """
+        Return vertex coordinates and cell connectivity as arrays, i.e. :obj:`getVertices` and :obj:`getCells` combined. The result is cached until the mesh is modified (see :obj:`_setDirty`).
+
+        :return: (vertex_coords,cell_types,cell_vertices)
+        :rtype: (numpy.array,numpy.array,numpy.array)
+        """
+        if self._geometryArrays is None:
+            self._geometryArrays = (self.getVertices(),)+tuple(self.getCells())
+        return self._geometryArrays
+
+    @staticmethod
+    def cellBBoxes_static(vertexCoords, cellVertices, relPad=1e-5):
+        """
+        Compute bounding boxes of many cells at once, from vertex coordinates and cell connectivity arrays. The boxes are padded in the same way as in :obj:`mupif.cell.Cell.getBBox`.
+
+        :param numpy.array vertexCoords: (nVertices,dim) array of vertex coordinates
+        :param numpy.array cellVertices: (nCells,maxVerts) array of vertex numbers, padded with -1 (as returned by :obj:`getCells`)
+        :param float relPad: relative padding of the boxes
+        :return: (nCells,2,dim) array, with lower and upper corner of each box
+        :rtype: numpy.array
+        """
+        if cellVertices.shape[0] == 0: return np.empty((0, 2, vertexCoords.shape[1]), dtype=np.float64)
+        valid = (cellVertices >= 0)[:, :, np.newaxis]
+        cc = vertexCoords[np.where(valid[:, :, 0], cellVertices, 0)]
+        ret = np.stack((np.min(np.where(valid, cc, np.inf), axis=1), np.max(np.where(valid, cc, -np.inf), axis=1)), axis=1)
+        if relPad:
+            sz = ret[:, 1, :]-ret[:, 0, :]
+            # replace zero size by maximum for the purposes of padding
+            sz = np.where(sz == 0, np.max(sz, axis=1)[:, np.newaxis], sz)
+            ret[:, 0, :] -= relPad*sz
+            ret[:, 1, :] += relPad*sz
+        return ret
+
+    def getCellBBoxes(self, relPad=1e-5):
+        """
+        Return bounding boxes of all cells as one array; see :obj:`cellBBoxes_static`.
+
+        :return: (nCells,2,dim) array
+        :rtype: numpy.array
+        """
+        try:
+            vc, ct, cv = self._getGeometryArrays()
+        except NotImplementedError:
+            # cells without known geometry type (generic Cell instances): ask each cell separately
+            return np.array([(c.getBBox(relPad=relPad).coords_ll, c.getBBox(relPad=relPad).coords_ur) for c in self.cells()], dtype=np.float64).reshape(self.getNumberOfCells(), 2, -1)
+        return Mesh.cellBBoxes_static(np.asarray(vc, dtype=np.float64), cv, relPad=relPad)
+
     def toMeshioPointsCells(self):
         import numpy as np
         ret = {}
@@ -391,11 +495,9 @@ class Mesh(baredata.BareData):
             if debug: 
                 t0 = time.clock()
                 print("Mesh: setting up vertex octree ...\nminc=", minc, "size:", size, "mask:", mask, "\n")
-            # add mesh vertices into octree
-            for iv, vertex in enumerate(self.vertices()):
-                if debug:
-                    print(f'  {iv=}, {vertex=}')
-                self._vertexOctree.insert(iv, vertex.getBBox())
+            # add mesh vertices into octree (bbox of a vertex is the vertex itself)
+            vc = np.asarray(self.getVertices(), dtype=np.float64)
+            self._vertexOctree.insertArray(np.arange(vc.shape[0]), np.stack((vc, vc), axis=1))
             if debug:
                 print("done in ", time.clock() - t0, "[s]")
 
@@ -428,9 +530,9 @@ class Mesh(baredata.BareData):
         if debug:
             print('Octree ctor: ', time.time()-t0)
             print("Mesh: setting up cell octree ...\nminc=", minc, "size:", size, "mask:", mask, "\n")
-        import tqdm
-        for ic, cell in enumerate(tqdm.tqdm(self.cells(), unit=' cells', total=self.getNumberOfCells())):
-            self._cellOctree.insert(ic, cell.getBBox())
+        # bounding boxes of all cells computed at once, the tree is built top-down
+        bboxes = self.getCellBBoxes()
+        self._cellOctree.insertArray(np.arange(bboxes.shape[0]), bboxes)
         if debug:
             print("done in ", time.time() - t0, "[s]")
         return self._cellOctree
@@ -439,11 +541,37 @@ class Mesh(baredata.BareData):
     def asHdf5Object(self, parentgroup, heavyMesh=False):
         raise NotImplementedError('This method is abstract, derived classes must override.')
 
+    def registryKey(self):
+        """
+        Key identifying the mesh in the mesh registry (see :obj:`registerMesh`): in-memory meshes are identified by :obj:`dataDigest`; meshes backed by HDF5 storage override this and use the storage location.
+
+        :return: hashable key, or None if the mesh cannot be registered
+        """
+        return ('digest', self.dataDigest())
+
+    def _storedRegistryKey(self):
+        'Return :obj:`registryKey` stored when the mesh was registered (or checked last); it is only computed again after the mesh was modified.'
+        if self._registryKey is None: self._registryKey = self.registryKey()
+        return self._registryKey
+
+    @classmethod
+    def hdf5RegistryKey(cls, h5grp):
+        """
+        Registry key of the mesh stored in *h5grp*, if it can be determined without reading the mesh data (see :obj:`registryKey`). In-memory meshes use the ``dataDigest`` attribute written along with the mesh.
+
+        :return: hashable key, or None
+        """
+        digest = h5grp.attrs.get('dataDigest', None)
+        return None if digest is None else ('digest', str(digest))
+
     @classmethod
     def isHere(cls,*,h5grp) -> bool: return False
 
     @staticmethod
     def makeFromHdf5group(h5grp):
+        """
+        Create mesh from HDF5 group, using the appropriate subclass. Meshes go through the mesh registry (see :obj:`registerMesh`): if an identical mesh is alive already, it is returned instead of reading the mesh again.
+        """
         def _get_subclasses(cls):
             ret=set([cls])
             for sc in cls.__subclasses__():
@@ -451,7 +579,10 @@ class Mesh(baredata.BareData):
             return ret
         for sub in _get_subclasses(Mesh):
             if sub.isHere(h5grp=h5grp):
-                return sub.makeFromHdf5group(h5grp=h5grp)
+                key = sub.hdf5RegistryKey(h5grp)
+                m = registeredMesh(key)
+                if m is not None: return m
+                return registerMesh(sub.makeFromHdf5group(h5grp=h5grp), key=key)
 
 
 
@@ -488,11 +619,18 @@ class UnstructuredMesh(Mesh,HeavyConvertible):
         # print('Mesh._postDump…')
         for i in range(self.getNumberOfCells()):
             self.getCell(i).mesh=self
+        for v in self.vertexList: v._addMesh(self)
 
 
     # this is necessary for putting the mesh into set (in localizer)
     def __hash__(self): return id(self)
 
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        # vertices invalidate cached data of the mesh when modified; cells do the same through their mesh attribute
+        if name == 'vertexList':
+            for v in value: v._addMesh(self)
+
     # @pydantic.validate_call
     def setup(self, vertexList: typing.List[vertex.Vertex], cellList: typing.List[cell.Cell]) -> None:
         """
@@ -503,6 +641,7 @@ class UnstructuredMesh(Mesh,HeavyConvertible):
         """
         self.vertexList = vertexList
         self.cellList = cellList
+        self._setDirty()
 
 
     def copy(self) -> typing.Self:
@@ -516,6 +655,9 @@ class UnstructuredMesh(Mesh,HeavyConvertible):
         for i in self.cells():
             cellList.append(i.copy())
         ans = UnstructuredMesh()
+        # copied cells must refer to the copied vertices
+        for c in cellList:
+            c.mesh = ans
         ans.setup(vertexList, cellList)
         return ans
 
@@ -612,7 +754,8 @@ class UnstructuredMesh(Mesh,HeavyConvertible):
                     print(v.label)
             else:
                 indx = len(self.vertexList)
-                self.vertexList[indx:] = [copy.deepcopy(v)]
+                self.vertexList[indx:] = [vcopy := copy.deepcopy(v)]
+                vcopy._addMesh(self)
                 self._vertexDict[v.label] = indx
 
         # renumber _vertexDict verices 
@@ -641,16 +784,16 @@ class UnstructuredMesh(Mesh,HeavyConvertible):
                     updatedVertices.append(self._vertexDict[v.label])
                 if 1:
                     ccopy = c.copy()
-                    ccopy.vertices = tuple(updatedVertices)
+                    # re-point first, so that the source mesh is not invalidated
                     ccopy.mesh = self
+                    ccopy.vertices = tuple(updatedVertices)
                 else: ccopy=dataclasses.replace(c,vertices=tuple(updatedVertices),mesh=self)
                 indx = len(self.cellList)
                 self.cellList[indx:] = [ccopy]
                 self._cellDict[ccopy.label] = indx
         print()
         # last step: invalidate receiver
-        self._vertexOctree = None
-        self._cellOctree = None
+        self._setDirty()
 
     def getVTKRepresentation(self):
         """
@@ -780,9 +923,10 @@ class UnstructuredMesh(Mesh,HeavyConvertible):
         return ret
 
     def dataDigest(self):
-        """Internal function returning hash digest of all internal data, for the purposes of identity test."""
-        mvc, (mct, mci) = self.getVertices(), self.getCells()
-        return util.sha1digest([mvc,mct,mci])
+        """Internal function returning hash digest of all internal data, for the purposes of identity test. The digest is cached until the mesh is modified (see :obj:`_setDirty`)."""
+        if self._dataDigest is None:
+            self._dataDigest = util.sha1digest(list(self._getGeometryArrays()))
+        return self._dataDigest
 
     def asHdf5Object(self, parentgroup, heavyMesh=False):
         """
@@ -807,6 +951,8 @@ class UnstructuredMesh(Mesh,HeavyConvertible):
         group.attrs['unit']=('' if self.unit is None else str(self.unit))
         group.attrs['__class__'] = self.__class__.__name__
         group.attrs['__module__'] = self.__class__.__module__
+        group.attrs['dataDigest'] = self.dataDigest()
+        registerMesh(self, key=self.hdf5RegistryKey(group))
 
     @classmethod
     def isHere(cls,*,h5grp) -> bool:
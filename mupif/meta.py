@@ -194,6 +194,8 @@ class ModelInWorkflowMeta(BaseMeta):
     Module: str = ''
     Class: str = ''
     Jobmanager: str = ''
+    Startup_timeout: float = Field(0,description='Maximum time in seconds for allocating the model, and for initializing it; unlimited if non-positive')
+    Depends_on: List[str] = Field([],description='Names of models whose solution step must finish before this model starts solving the step (they provide its inputs); see Workflow.solveModelsStep')
 
     @pydantic.model_validator(mode='after')
     def _moduleClass_or_jobmanager(self):
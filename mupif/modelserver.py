@@ -35,6 +35,8 @@ import time
 import collections
 import uuid
 import warnings
+import queue
+import select
 from . import modelserverbase
 from .modelserverbase import ModelServerBase, ModelServerStatus
 from . import pyroutil
@@ -75,6 +77,10 @@ class ModelServer (modelserverbase.ModelServerBase):
         remoteLogUri: str
 
     ticketExpireTimeout = 10
+    #: timeout for spawned process to report its URI
+    spawnTimeout = 10
+    #: whether readiness pipe (instead of polling for URI file) and pidfd-based child monitoring (instead of periodic polling of all jobs) are used; requires Linux
+    _useEventLoop = hasattr(os, 'pidfd_open') and hasattr(select, 'poll')
 
     def __init__(
             self,
@@ -87,6 +93,8 @@ class ModelServer (modelserverbase.ModelServerBase):
             maxJobs=1,
             daemon=None,
             includeFiles=None,
+            jobLogLevel='INFO',
+            poolSize=0,
             # overrideNsPort=0
     ):
         """
@@ -104,18 +112,38 @@ class ModelServer (modelserverbase.ModelServerBase):
         self.server = server
         self.acceptingJobs = True
         self.includeFiles = includeFiles
+        # log level of spawned jobs (MUPIF_LOG_LEVEL); None to inherit the environment of the server
+        self.jobLogLevel = jobLogLevel
+        # pre-started worker processes (with mupif and the application module imported) waiting for a job
+        self.poolSize = poolSize
+        self.pool = collections.deque()
+        self.poolLock = threading.Lock()
+        self._poolStarting = 0  # workers being started (outside poolLock)
 
         app = appClass()
         self.modelMetadata = app.getAllMetadata()
 
-        threading.Thread(target=self._childMonitorLoop, daemon=True).start()
+        # jobs to be watched by the child monitor, and pipe to wake it up
+        self._watchQueue = queue.SimpleQueue()
+        self._monitorWake = os.pipe() if ModelServer._useEventLoop else None
+        self._monitorLock = threading.Lock()
+        self._childMonitorFlag = True
+        self._childMonitorThread = threading.Thread(target=self._childMonitorLoop, daemon=True)
+        self._childMonitorThread.start()
+        self._replenishPool()
 
         log.debug('ModelServer: initialization done for application name %s' % self.applicationName)
 
     def __del__(self):
-        # will cause the child monitoring thread to exit gracefully within 1 second
-        # (or it dies with the main process, if that comes sooner)
-        self._childMonitorFlag = False
+        self._stopChildMonitor()
+
+    def _stopChildMonitor(self):
+        'Make the child monitoring thread exit gracefully within 1 second (or immediately, with the event loop); it closes the wake pipe on exit.'
+        if not hasattr(self, '_monitorLock'): return
+        with self._monitorLock:
+            if not self._childMonitorFlag: return
+            self._childMonitorFlag = False
+            if self._monitorWake: os.write(self._monitorWake[1], b'.')
 
     def runServer(self):
         return pyroutil.runJobManagerServer(jobman=self, ns=self.ns)
@@ -128,6 +156,12 @@ class ModelServer (modelserverbase.ModelServerBase):
         jobID: str
         cwd: str
         appClass: object
+        #: job-specific environment (only used by pre-started workers, which are not spawned with it)
+        env: typing.Dict[str, str] = {}
+        #: file where stdout and stderr are redirected (only used by pre-started workers)
+        jobLogName: typing.Optional[str] = None
+        #: file descriptor (inherited from the server) where the URI is written once the app server runs; if None, the URI is written to *uriFileName*
+        readyFd: typing.Optional[int] = None
 
         def pickle(self):
             # protocol=0 so that there are no NULLs
@@ -142,6 +176,42 @@ class ModelServer (modelserverbase.ModelServerBase):
         # the process receives MUPIF_LOG_PYRO (URI) and MUPIF_LOG_PYRONAME (jobID); used at import time in mupif.util.setupLogginAtStartup
         import mupif # import eplicitly, though the unpickle would do it automatically as well
         args = ModelServer.SpawnedProcessArgs.unpickle(sys.argv[-1])
+        ModelServer._runSpawnedApp(args)
+
+    @staticmethod
+    def _spawnedProcessPool():
+        """
+        Entry point of pre-started worker: import modules given on the command line, then wait for :obj:`SpawnedProcessArgs` on stdin and run the job.
+        """
+        import sys
+        import importlib
+        import mupif
+        import numpy
+        try:
+            import astropy.units
+        except ImportError:
+            pass
+        for mod in sys.argv[2:]:
+            importlib.import_module(mod)
+        data = sys.stdin.buffer.read()
+        # stdin closed without a job: the pool is being shut down
+        if not data: return
+        args = ModelServer.SpawnedProcessArgs.unpickle(data.decode('ascii'))
+        # what would be done by Popen for a freshly spawned process
+        fd = os.open(args.jobLogName, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(fd, 1)
+        os.dup2(fd, 2)
+        os.close(fd)
+        os.environ.update(args.env)
+        from . import util
+        util.setupJobLogging()
+        ModelServer._runSpawnedApp(args)
+
+    @staticmethod
+    def _runSpawnedApp(args):
+        import mupif
         log.info(f'New subprocess: nameserver {args.nsUri}, cwd {args.cwd}')
         os.chdir(args.cwd)
         app = args.appClass()
@@ -151,8 +221,141 @@ class ModelServer (modelserverbase.ModelServerBase):
             appName=args.jobID,
             ns=Pyro5.api.Proxy(args.nsUri)
         )
-        open(args.uriFileName+'~', 'w').write(str(uri))
-        os.rename(args.uriFileName+'~', args.uriFileName)
+        if args.readyFd is not None:
+            os.write(args.readyFd, (str(uri)+'\n').encode('ascii'))
+            os.close(args.readyFd)
+        else:
+            open(args.uriFileName+'~', 'w').write(str(uri))
+            os.rename(args.uriFileName+'~', args.uriFileName)
+
+    def _subprocessEnv(self):
+        'Environment for spawned processes: add sys.path to PYTHONPATH so that if some module is only importable because of modified sys.path, the subprocess will be able to import it as well.'
+        env = os.environ.copy()
+        env['PYTHONPATH'] = os.pathsep.join(sys.path)+((os.pathsep+env['PYTHONPATH']) if 'PYTHONPATH' in env else '')
+        return env
+
+    def _jobEnv(self, jobID, remoteLogUri):
+        'Job-specific environment variables, read when mupif is imported by the job process (or by pre-started worker when it receives the job).'
+        env = {'MUPIF_LOG_PROCESSNAME': f'{jobID}'}
+        # this will redirect logs the moment mupif is imported on the remote side
+        if remoteLogUri:
+            env['MUPIF_LOG_PYRO'] = remoteLogUri
+        if self.jobLogLevel is not None:
+            env['MUPIF_LOG_LEVEL'] = self.jobLogLevel
+        return env
+
+    def _replenishPool(self):
+        """
+        Start pre-started workers in the background until there are *poolSize* of them.
+        """
+        if self.poolSize <= 0 or not self.acceptingJobs: return
+
+        def _replenish():
+            while True:
+                # reserve a slot under the lock, start the worker without holding it (so that _takeFromPool is not blocked)
+                with self.poolLock:
+                    if len(self.pool)+self._poolStarting >= self.poolSize or not self.acceptingJobs: return
+                    self._poolStarting += 1
+                try:
+                    env = self._subprocessEnv()
+                    env.pop('MUPIF_LOG_PYRO', None)
+                    env['MUPIF_LOG_PROCESSNAME'] = f'{self.applicationName}-pool'
+                    preload = [m for m in (self.applicationClass.__module__,) if m != '__main__']
+                    ready = os.pipe() if ModelServer._useEventLoop else (None, None)
+                    proc = subprocess.Popen([sys.executable, '-c', 'import mupif; mupif.ModelServer._spawnedProcessPool()', '-']+preload, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, env=env, pass_fds=ready[1:] if ready[1] is not None else ())
+                    if ready[1] is not None: os.close(ready[1])
+                except Exception:
+                    with self.poolLock: self._poolStarting -= 1
+                    log.exception('Error starting pre-started worker.')
+                    return
+                with self.poolLock:
+                    self._poolStarting -= 1
+                    # the write end keeps its number in the child
+                    if self.acceptingJobs:
+                        self.pool.append((proc, ready))
+                        continue
+                # the pool was shut down meanwhile; EOF on stdin makes the worker exit
+                if ready[0] is not None: os.close(ready[0])
+                proc.stdin.close()
+                return
+        threading.Thread(target=_replenish, daemon=True).start()
+
+    def _takeFromPool(self, args):
+        """
+        Hand *args* to a pre-started worker; return its Popen object and read end of its readiness pipe (None if not used), or (None,None) if no worker is ready.
+        """
+        with self.poolLock:
+            while self.pool:
+                proc, (readyR, readyW) = self.pool.popleft()
+                try:
+                    if proc.poll() is not None: raise BrokenPipeError()
+                    proc.stdin.write(args.model_copy(update=dict(readyFd=readyW)).pickle())
+                    proc.stdin.close()
+                    break
+                except BrokenPipeError:
+                    log.warning(f'Pre-started worker {proc.pid} died (exit status {proc.poll()}).')
+                    if readyR is not None: os.close(readyR)
+            else:
+                proc, readyR = None, None
+        self._replenishPool()
+        return proc, readyR
+
+    def _spawn(self, args, jobEnv, jobLogName):
+        """
+        Spawn new process running the job; return its Popen object and read end of its readiness pipe (None if not used).
+        """
+        jobLog = open(jobLogName, 'w')
+        env = self._subprocessEnv()
+        env.update(jobEnv)
+        readyR, readyW = os.pipe() if ModelServer._useEventLoop else (None, None)
+        try:
+            proc = subprocess.Popen([sys.executable, '-c', 'import mupif; mupif.ModelServer._spawnedProcessPopen()', '-', args.model_copy(update=dict(readyFd=readyW)).pickle()], stdout=jobLog, stderr=subprocess.STDOUT, env=env, pass_fds=(readyW,) if readyW is not None else ())
+        finally:
+            if readyW is not None: os.close(readyW)
+        return proc, readyR
+
+    def _waitForUri(self, proc, readyR, uriFileName, jobLogName):
+        """
+        Return URI reported by the spawned process, via the readiness pipe (returns as soon as the URI is written, or fails as soon as the process exits), or by polling the URI file if the pipe is not used.
+        """
+        def _fail(what):
+            log.error('This is the subprocess log file contents: \n'+open(jobLogName, 'r').read())
+            raise RuntimeError(f'{what}. The process log inline follows:\n'+open(jobLogName, 'r').read())
+        tMax = ModelServer.spawnTimeout
+        t0 = time.time()
+        if readyR is not None:
+            buf = b''
+            try:
+                while not buf.endswith(b'\n'):
+                    if not select.select([readyR], [], [], max(0, tMax-(time.time()-t0)))[0]:
+                        _fail(f'Timeout waiting {tMax}s for URI from spawned process')
+                    if not (data := os.read(readyR, 4096)):
+                        # all write ends closed
+                        proc.wait(1)
+                        _fail(f'Spawned process died before reporting URI (exit status {proc.poll()})')
+                    buf += data
+            finally:
+                os.close(readyR)
+            return buf.decode('ascii').strip()
+        while time.time()-t0 < tMax:
+            if os.path.exists(uriFileName):
+                uri = open(uriFileName, 'r').read()
+                os.remove(uriFileName)
+                return uri
+            time.sleep(.1)
+        _fail(f'Timeout waiting {tMax}s for URI from spawned process'+(f' (process died meanwhile with exit status {proc.returncode})' if proc.poll() else ''))
+
+    def _shutdownPool(self):
+        with self.poolLock:
+            while self.pool:
+                proc, (readyR, readyW) = self.pool.popleft()
+                if readyR is not None: os.close(readyR)
+                # EOF on stdin makes the worker exit
+                proc.stdin.close()
+                try:
+                    proc.wait(2)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
 
     def __checkTicket(self, ticket):
         """ Returns true, if ticket is valid, false otherwise"""
@@ -175,6 +378,8 @@ class ModelServer (modelserverbase.ModelServerBase):
         return len(self.tickets)
 
     def _updateActiveJobs(self):
+        # with the event loop, the child monitor moves jobs to doneJobs the moment they exit
+        if ModelServer._useEventLoop: return
         with self.lock:
             # take note of processes terminated asynchronously
             dead = []
@@ -199,11 +404,75 @@ class ModelServer (modelserverbase.ModelServerBase):
                     # instead terminate the process, this will be picked up above in later
                     job.proc.terminate()
 
+    def _watchJob(self, jobID):
+        'Make the child monitor watch newly allocated job (no-op without the event loop).'
+        if not ModelServer._useEventLoop: return
+        self._watchQueue.put(jobID)
+        with self._monitorLock:
+            if self._monitorWake: os.write(self._monitorWake[1], b'.')
+
     def _childMonitorLoop(self):
-        self._childMonitorFlag = True
+        if not ModelServer._useEventLoop:
+            while self._childMonitorFlag:
+                time.sleep(1)
+                self._updateActiveJobs()
+            return
+        # wait for exit of any watched process (its pidfd becomes readable), new job to watch (wake pipe), or the nearest job timeout
+        poller = select.poll()
+        poller.register(self._monitorWake[0], select.POLLIN)
+        pidfds = {}  # pidfd -> (jobID, proc)
+        deadlines = {}  # jobID -> (time, proc)
+        try:
+            self._childMonitorPoll(poller, pidfds, deadlines)
+        finally:
+            for fd in pidfds: os.close(fd)
+            with self._monitorLock:
+                for fd in self._monitorWake: os.close(fd)
+                self._monitorWake = None
+
+    def _childMonitorPoll(self, poller, pidfds, deadlines):
+        'Body of :obj:`_childMonitorLoop` with the event loop; runs until the monitor is stopped.'
         while self._childMonitorFlag:
-            time.sleep(1)
-            self._updateActiveJobs()
+            now = time.time()
+            for jobID, (t, proc) in list(deadlines.items()):
+                if t <= now:
+                    log.error(f'Job {jobID}: timeout exceeded, terminating.')
+                    # the exit is picked up via pidfd
+                    proc.terminate()
+                    del deadlines[jobID]
+            timeout = min([t for t, proc in deadlines.values()], default=None)
+            events = poller.poll(None if timeout is None else max(0, 1000*(timeout-now)))
+            for fd, ev in events:
+                if fd == self._monitorWake[0]:
+                    os.read(fd, 4096)
+                    while True:
+                        try: jobID = self._watchQueue.get_nowait()
+                        except queue.Empty: break
+                        if (job := self.activeJobs.get(jobID, None)) is None: continue
+                        try: pidfd = os.pidfd_open(job.proc.pid)
+                        except ProcessLookupError:
+                            # already reaped
+                            self._jobExited(jobID, job.proc)
+                            continue
+                        pidfds[pidfd] = (jobID, job.proc)
+                        poller.register(pidfd, select.POLLIN)
+                        if job.timeout > 0: deadlines[jobID] = (job.starttime+job.timeout, job.proc)
+                    continue
+                jobID, proc = pidfds.pop(fd)
+                poller.unregister(fd)
+                os.close(fd)
+                deadlines.pop(jobID, None)
+                self._jobExited(jobID, proc)
+
+    def _jobExited(self, jobID, proc):
+        'Move exited job from activeJobs to doneJobs (if it is still there, i.e. not terminated via terminateJob).'
+        code = proc.wait()
+        with self.lock:
+            if self.activeJobs.get(jobID, None) is None or self.activeJobs[jobID].proc is not proc: return
+            log.debug(f'Job {jobID} finished, exit status {code}.')
+            if code != 0:
+                log.error(f'Job {jobID} has non-zero exit status {code}')
+            self.doneJobs[jobID] = self.activeJobs.pop(jobID)
 
     def getNumberOfFreeJobs(self):
         return self.maxJobs - len(self.activeJobs) - self.__getNumberOfActiveTickets()
@@ -284,31 +553,12 @@ class ModelServer (modelserverbase.ModelServerBase):
                         appClass=self.applicationClass,
                     )
                     jobLogName = targetWorkDir+'/_mupif_job.log'
-                    jobLog = open(jobLogName, 'w')
                     log.info(f'Logging into {jobLogName} (+ {remoteLogUri} remotely)')
-                    # this env trickery add sys.path to PYTHONPATH so that if some module is only importable because of modified sys.path
-                    # the subprocess will be able to import it as well
-                    env = os.environ.copy()
-                    env['PYTHONPATH'] = os.pathsep.join(sys.path)+((os.pathsep+env['PYTHONPATH']) if 'PYTHONPATH' in env else '')
-                    # this will redirect logs the moment mupif is imported on the remote side
-                    if remoteLogUri:
-                        env['MUPIF_LOG_PYRO'] = remoteLogUri
-                    # to be tuned?
-                    env['MUPIF_LOG_LEVEL'] = 'DEBUG'
-                    env['MUPIF_LOG_PROCESSNAME'] = f'{jobID}'
-                    proc = subprocess.Popen([sys.executable, '-c', 'import mupif; mupif.ModelServer._spawnedProcessPopen()', '-', args.pickle()], stdout=jobLog, stderr=subprocess.STDOUT, env=env)
-                    t0 = time.time()
-                    tMax = 10
-                    while time.time()-t0 < tMax:
-                        if os.path.exists(args.uriFileName):
-                            uri = open(args.uriFileName, 'r').read()
-                            os.remove(args.uriFileName)
-                            break
-                        else:
-                            time.sleep(.1)
-                    else:
-                        log.error('This is the subprocess log file contents: \n'+open(jobLogName, 'r').read())
-                        raise RuntimeError(f'Timeout waiting {tMax}s for URI from spawned process'+(f' (process died meanwhile with exit status {proc.returncode})' if proc.poll() else '')+'. The process log inline follows:\n'+open(jobLogName, 'r').read())
+                    jobEnv = self._jobEnv(jobID, remoteLogUri)
+                    proc, readyR = self._takeFromPool(args.model_copy(update=dict(env=jobEnv, jobLogName=jobLogName))) if self.poolSize > 0 else (None, None)
+                    if proc is None:
+                        proc, readyR = self._spawn(args, jobEnv, jobLogName)
+                    uri = self._waitForUri(proc, readyR, args.uriFileName, jobLogName)
 
                     log.info('Received URI: %s' % uri)
                     jobPort = int(uri.split(':')[-1])
@@ -325,6 +575,7 @@ class ModelServer (modelserverbase.ModelServerBase):
                 # either by doing some sort of regexp or query ns for it
                 start = timeTime.time()
                 self.activeJobs[jobID] = ModelServer.ActiveJob(proc=proc, starttime=start, timeout=timeout, user=user, uri=uri, port=jobPort, jobLogName=jobLogName, remoteLogUri=remoteLogUri)
+                self._watchJob(jobID)
                 log.debug('ModelServer: new process ')
                 log.debug(self.activeJobs[jobID])
 
@@ -386,6 +637,7 @@ class ModelServer (modelserverbase.ModelServerBase):
         self._updateActiveJobs()
         self.acceptingJobs = False
         log.info('No more jobs will be accepted.')
+        self._shutdownPool()
         if not force and self.activeJobs:
             raise RuntimeError(f'There are {len(self.activeJobs)} active jobs; call terminate(force=True) to kill them.')
         try:
@@ -396,6 +648,8 @@ class ModelServer (modelserverbase.ModelServerBase):
         except Exception as e:
             log.debug("Can not remove job manager %s from a nameServer %s" % (self.applicationName, self.ns))
             log.exception(f"Can not remove job {self.applicationName} from nameserver {self.ns}")
+        # the monitoring thread references the instance, so __del__ would not stop it
+        self._stopChildMonitor()
         if self.pyroDaemon:
             try:
                 self.pyroDaemon.unregister(self)
@@ -443,13 +697,13 @@ class ModelServer (modelserverbase.ModelServerBase):
         return pf
         # return self.getPyroFile(self.doneJobs[jobID].jobLogName)
 
-    def getPyroFile(self, jobID, filename, mode="r", buffSize=2**20):
+    def getPyroFile(self, jobID, filename, mode="rb", buffSize=2**20):
         """
         See :func:`JobManager.getPyroFile`
         """
         targetFileName = self.getJobWorkDir(jobID)+os.path.sep+filename
         log.info('ModelServer:getPyroFile ' + targetFileName)
-        pfile = PyroFile(targetFileName, mode, buffSize)
+        pfile = PyroFile(filename=targetFileName, mode=mode, bufSize=buffSize)
         self.pyroDaemon.register(pfile)
 
         return pfile
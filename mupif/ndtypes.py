@@ -13,6 +13,9 @@ NDArr6=NDArray[Shape["6"],Float]
 NDArr6x2=NDArray[Shape["6,2"],Float]
 NDArr8=NDArray[Shape["8"],Float]
 NDArr3xX=NDArray[Shape["3,*"],Float]
+# arrays of many 2D/3D points (one point per row)
+NDArrXx2=NDArray[Shape["*,2"],Float]
+NDArrXx3=NDArray[Shape["*,3"],Float]
 NDArr123=NDArray[Shape["1-3"],Float]
 NDArr23=NDArray[Shape["2-3"],Float]
 NDArr123xX=NDArray[Shape['1-3,*'],Float]
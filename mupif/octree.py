@@ -59,6 +59,7 @@ class Octant_py(object):
         The contructor. Octant_py class contains:
 
         * data: Container storing the indexed objects (cells, vertices, etc)
+        * ids, lo, hi: Arrays of indexed objects and their bounding boxes, filled by bulk insertion (:obj:`insertArray`); None if unused
         * children: Container storing the children octants (if not terminal). 
         * octree: Link to octree object 
         * parent: Link to parent Octant_py
@@ -71,6 +72,7 @@ class Octant_py(object):
         :param float size: Size (dimension) of receiver
         """
         self.data = []
+        self.ids, self.lo, self.hi = None, None, None
         self.children = []
         self.octree = octree
         self.parent = parent
@@ -86,7 +88,8 @@ class Octant_py(object):
 
         :return: iterator over 3-tuples with child indices; functionally equivalent to 3 nested loops, a bit faster and more readable.
         """
-        return itertools.product(range(self.octree.mask[0]+1), range(self.octree.mask[1]+1), range(self.octree.mask[2]+1))
+        mask = tuple(self.octree.mask)+(0,)*(3-len(self.octree.mask))
+        return itertools.product(range(mask[0]+1), range(mask[1]+1), range(mask[2]+1))
 
     def isTerminal(self):
         """
@@ -102,12 +105,13 @@ class Octant_py(object):
         if not self.isTerminal(): raise RuntimeError("Could not divide non-terminal octant (programming error)")
         if self.level>maxSubdivLevel: raise RuntimeError(f'Subdivision {maxSubdivLevel=} reached. ?!')
         self.children = []
-        for i in range(self.octree.mask[0]+1):
+        mask = tuple(self.octree.mask)+(0,)*(3-len(self.octree.mask))
+        for i in range(mask[0]+1):
             self.children.append([])
-            for j in range(self.octree.mask[1]+1):
+            for j in range(mask[1]+1):
                 self.children[i].append([])
-                for k in range(self.octree.mask[2]+1):
-                    origin = (self.origin[0]+i*self.size/2., self.origin[1]+j*self.size/2., self.origin[2]+k*self.size/2.)
+                for k in range(mask[2]+1):
+                    origin = tuple(o+ijk*self.size/2. for o, ijk in zip(self.origin, (i, j, k)))
                     self.children[i][j].append(Octant_py(octree=self.octree, parent=self, origin=origin, size=self.size/2., level=self.level+1))
                     if debug:
                         print("  Children: ", self.children[i][j][k].getBBox())
@@ -119,8 +123,8 @@ class Octant_py(object):
         """
         if self.bbox: return self.bbox
         # create self bbox
-        cc = [0, 0, 0]
-        for i in range(3):
+        cc = [0]*len(self.origin)
+        for i in range(len(self.origin)):
             if self.octree.mask[i]:
                 cc[i] = self.origin[i]+self.size
             else:
@@ -147,19 +151,65 @@ class Octant_py(object):
         if self.containsBBox(bbox):
             if self.isTerminal():
                 self.data.append(ItemBbox(item,bbox))
-                if len(self.data) > refineLimit:
+                if self.getNumberOfItems() > refineLimit:
                     if debug: print(f'Octant_py insert: {refineLimit=} reached ({len(self.data)=}), subdividing...')
-                    self.divide()
-                    for itemBbox in self.data:
-                        for i, j, k in self.childrenIJK():
-                            self.children[i][j][k].insert(itemBbox.item,itemBbox.bbox)
-                    # empty item list (items already inserted into its childrenren)
-                    self.data = []
+                    self._divideAndDistribute()
 
             else:
                 for i, j, k in self.childrenIJK():
                     self.children[i][j][k].insert(item, bbox)
 
+    def getNumberOfItems(self):
+        """
+        :return: number of items stored in the receiver (only meaningful for terminal octants)
+        """
+        return len(self.data)+(0 if self.ids is None else self.ids.shape[0])
+
+    def _divideAndDistribute(self):
+        """
+        Divides the receiver and moves all its items (both those inserted one-by-one and in bulk) to the children.
+        """
+        self.divide()
+        for itemBbox in self.data:
+            for i, j, k in self.childrenIJK():
+                self.children[i][j][k].insert(itemBbox.item,itemBbox.bbox)
+        if self.ids is not None:
+            for i, j, k in self.childrenIJK():
+                self.children[i][j][k].insertArray(self.ids, self.lo, self.hi)
+        # empty item list (items already inserted into its children)
+        self.data = []
+        self.ids, self.lo, self.hi = None, None, None
+
+    def _getBBoxArrays(self, dim):
+        """
+        :return: receiver's bounding box as two arrays (lower and upper corner) of length *dim*
+        """
+        bb = self.getBBox()
+        return numpy.array(bb.coords_ll[:dim]), numpy.array(bb.coords_ur[:dim])
+
+    def insertArray(self, ids, lo, hi):
+        """
+        Insert many objects at once; the tree is built top-down: items intersecting the receiver are selected with one array operation, and if their number exceeds :obj:`refineLimit`, the receiver is subdivided and the selection passed to the children. This is much faster than calling :obj:`insert` for each item.
+
+        Items are stored in the *ids*, *lo* and *hi* arrays of terminal octants (rather than in *data*). Subdivision stops silently at :obj:`maxSubdivLevel` (the terminal octant then holds more than :obj:`refineLimit` items).
+
+        :param numpy.array ids: (N,) array of objects (typically integer cell/vertex numbers)
+        :param numpy.array lo: (N,dim) array of lower corners of object bounding boxes
+        :param numpy.array hi: (N,dim) array of upper corners of object bounding boxes
+        """
+        ll, ur = self._getBBoxArrays(lo.shape[1])
+        sel = numpy.all((lo <= ur) & (hi >= ll), axis=1)
+        if not numpy.all(sel): ids, lo, hi = ids[sel], lo[sel], hi[sel]
+        if ids.shape[0] == 0: return
+        if self.isTerminal():
+            if self.getNumberOfItems()+ids.shape[0] <= refineLimit or self.level >= maxSubdivLevel:
+                if self.ids is None: self.ids, self.lo, self.hi = ids, lo, hi
+                else: self.ids, self.lo, self.hi = numpy.concatenate((self.ids, ids)), numpy.concatenate((self.lo, lo)), numpy.concatenate((self.hi, hi))
+                return
+            self._divideAndDistribute()
+        for i, j, k in self.childrenIJK():
+            self.children[i][j][k].insertArray(ids, lo, hi)
+
     #def delete(self, item, itemBBox=None):
     #    """
     #    Deletes/removes the given object from receiver
@@ -196,12 +246,50 @@ class Octant_py(object):
                         #    itemList.add(i)
                         # else:
                         #    itemList.append(i)
+                if self.ids is not None:
+                    dim = self.lo.shape[1]
+                    ll, ur = numpy.array(bbox.coords_ll[:dim]), numpy.array(bbox.coords_ur[:dim])
+                    itemSet.update(self.ids[numpy.all((self.lo <= ur) & (self.hi >= ll), axis=1)].tolist())
             else:
                 # if debug: print(tab, "Parent containing bbox found ....", self.getBBox())
                 for i, j, k in self.childrenIJK():
                     # if debug: print(tab, "  Checking child .....", self.children[i][j][k].getBBox())
                     self.children[i][j][k].getItemsInBBox(itemSet, bbox)
 
+    def queryBoxes(self, qIds, lo, hi, result):
+        """
+        Find items intersecting many query boxes at once. Query boxes intersecting the receiver are selected with one array operation and passed to the children; in terminal octants, all (query,item) pairs are tested at once.
+
+        Items are reported as many times as they are stored in different octants; see :obj:`Octree.queryBoxes` for the de-duplicated result.
+
+        :param numpy.array qIds: (Q,) indices of query boxes
+        :param numpy.array lo: (Q,dim) lower corners of query boxes
+        :param numpy.array hi: (Q,dim) upper corners of query boxes
+        :param list result: list where (query indices, item ids) pairs of arrays are appended
+        """
+        ll, ur = self._getBBoxArrays(lo.shape[1])
+        sel = numpy.all((lo <= ur) & (hi >= ll), axis=1)
+        if not numpy.all(sel): qIds, lo, hi = qIds[sel], lo[sel], hi[sel]
+        if qIds.shape[0] == 0: return
+        if not self.isTerminal():
+            for i, j, k in self.childrenIJK():
+                self.children[i][j][k].queryBoxes(qIds, lo, hi, result)
+            return
+        if self.data:
+            dim = lo.shape[1]
+            ids = numpy.array([d.item for d in self.data], dtype=numpy.int64)
+            iLo = numpy.array([d.bbox.coords_ll[:dim] for d in self.data], dtype=numpy.float64)
+            iHi = numpy.array([d.bbox.coords_ur[:dim] for d in self.data], dtype=numpy.float64)
+            if self.ids is not None: ids, iLo, iHi = numpy.concatenate((self.ids, ids)), numpy.concatenate((self.lo, iLo)), numpy.concatenate((self.hi, iHi))
+        elif self.ids is not None: ids, iLo, iHi = self.ids, self.lo, self.hi
+        else: return
+        # limit the size of the (query,item) matrix
+        chunk = max(1, 1000000//max(1, ids.shape[0]))
+        for c0 in range(0, qIds.shape[0], chunk):
+            cLo, cHi = lo[c0:c0+chunk], hi[c0:c0+chunk]
+            q, i = numpy.nonzero(numpy.all((cLo[:, numpy.newaxis, :] <= iHi[numpy.newaxis, :, :]) & (cHi[:, numpy.newaxis, :] >= iLo[numpy.newaxis, :, :]), axis=2))
+            if q.shape[0] > 0: result.append((qIds[c0:c0+chunk][q], ids[i]))
+
     def insertCellArrayChunk(self,vertices,cellData,cellOffset,mesh):
         from . import cellgeometrytype
         icd=0
@@ -250,6 +338,136 @@ class Octree(localizer.Localizer):
     def insertCellArrayChunk(self,vertices,cellData,cellOffset,mesh):
         self.root.insertCellArrayChunk(vertices,cellData,cellOffset,mesh)
 
+    def insertArray(self, ids, bboxes):
+        """
+        Inserts many objects at once, building the tree top-down. See :func:`Octant_py.insertArray`.
+
+        Falls back to inserting items one-by-one if the octant implementation (e.g. the accelerated one) does not support bulk insertion.
+
+        :param numpy.array ids: (N,) array of objects (typically integer cell/vertex numbers)
+        :param numpy.array bboxes: (N,2,dim) array of bounding boxes (lower and upper corners)
+        """
+        ids, bboxes = numpy.asarray(ids), numpy.asarray(bboxes, dtype=numpy.float64)
+        if bboxes.ndim != 3 or bboxes.shape[1] != 2 or bboxes.shape[0] != ids.shape[0]: raise ValueError(f'bboxes must have shape ({ids.shape[0]},2,dim) (not {bboxes.shape}).')
+        if hasattr(self.root, 'insertArray'):
+            self.root.insertArray(ids, numpy.ascontiguousarray(bboxes[:, 0, :]), numpy.ascontiguousarray(bboxes[:, 1, :]))
+        else:
+            for item, bb in zip(ids.tolist(), bboxes):
+                self.root.insert(item, bbox.BBox(tuple(bb[0]), tuple(bb[1])))
+
+    def queryBoxes(self, lo, hi):
+        """
+        Find objects intersecting each of many query boxes, in one call.
+
+        :param numpy.array lo: (N,dim) lower corners of query boxes
+        :param numpy.array hi: (N,dim) upper corners of query boxes
+        :return: (offsets,ids) in CSR layout: objects intersecting i-th box are ``ids[offsets[i]:offsets[i+1]]`` (sorted, without duplicates); *offsets* has N+1 items
+        :rtype: (numpy.array,numpy.array)
+        """
+        lo, hi = numpy.atleast_2d(numpy.asarray(lo, dtype=numpy.float64)), numpy.atleast_2d(numpy.asarray(hi, dtype=numpy.float64))
+        if lo.shape != hi.shape: raise ValueError(f'lo and hi must have the same shape (not {lo.shape} and {hi.shape}).')
+        n, dim = lo.shape[0], min(lo.shape[1], len(self.root.origin))
+        result = []
+        if hasattr(self.root, 'queryBoxes'):
+            self.root.queryBoxes(numpy.arange(n), lo[:, :dim], hi[:, :dim], result)
+        else:
+            for i in range(n):
+                items = set()
+                self.root.getItemsInBBox(items, bbox.BBox(tuple(lo[i]), tuple(hi[i])))
+                if items: result.append((numpy.full(len(items), i), numpy.array(list(items), dtype=numpy.int64)))
+        offsets = numpy.zeros(n+1, dtype=numpy.int64)
+        if not result: return offsets, numpy.empty((0,), dtype=numpy.int64)
+        q, ids = numpy.concatenate([r[0] for r in result]), numpy.concatenate([r[1] for r in result])
+        # items stored in several octants are reported several times; sorting (query,item) pairs also sorts items of each query
+        order = numpy.lexsort((ids, q))
+        q, ids = q[order], ids[order]
+        keep = numpy.ones(q.shape[0], dtype=bool)
+        keep[1:] = (q[1:] != q[:-1]) | (ids[1:] != ids[:-1])
+        numpy.cumsum(numpy.bincount(q[keep], minlength=n), out=offsets[1:])
+        return offsets, ids[keep]
+
+    def getItemsContainingPoints(self, points, eps=0.):
+        """
+        Find objects whose bounding box contains each of many points; see :obj:`queryBoxes`.
+
+        :param numpy.array points: (N,dim) array of points
+        :param float eps: tolerance, the points are enlarged to boxes of this half-size
+        :return: (offsets,ids) in CSR layout, see :obj:`queryBoxes`
+        :rtype: (numpy.array,numpy.array)
+        """
+        points = numpy.atleast_2d(numpy.asarray(points, dtype=numpy.float64))
+        return self.queryBoxes(points-eps, points+eps)
+
+    def toArrays(self):
+        """
+        Return the tree flattened into arrays, e.g. for storing it on disk; complementary to :obj:`fromArrays`. Only trees built from :obj:`Octant_py` with integer items are supported.
+
+        Octants are numbered breadth-first (root is 0), children of each octant are consecutive (in :obj:`Octant_py.childrenIJK` order). Items of i-th octant are ``items[nodeItems[itemOffsets[i]:itemOffsets[i+1]]]``, with bounding boxes ``bboxes[nodeItems[...]]``.
+
+        :return: dictionary with arrays *mask*, *origin*, *size*, *level*, *firstChild* (-1 for terminal octants), *itemOffsets*, *nodeItems*, *items* and *bboxes*
+        :rtype: dict
+        """
+        if not isinstance(self.root, Octant_py): raise NotImplementedError(f'Only trees of Octant_py can be flattened (not {self.root.__class__.__name__}).')
+        dim = len(self.root.origin)
+        nodes, firstChild, ids, lo, hi = [self.root], [], [], [], []
+        # breadth-first traversal, the list grows as children are appended
+        for node in nodes:
+            firstChild.append(-1 if node.isTerminal() else len(nodes))
+            if not node.isTerminal():
+                nodes += [node.children[i][j][k] for i, j, k in node.childrenIJK()]
+            nIds = [] if node.ids is None else [node.ids]
+            nLo = [] if node.ids is None else [node.lo]
+            nHi = [] if node.ids is None else [node.hi]
+            if node.data:
+                nIds.append(numpy.array([d.item for d in node.data], dtype=numpy.int64))
+                nLo.append(numpy.array([d.bbox.coords_ll[:dim] for d in node.data], dtype=numpy.float64))
+                nHi.append(numpy.array([d.bbox.coords_ur[:dim] for d in node.data], dtype=numpy.float64))
+            ids.append(numpy.concatenate(nIds) if nIds else numpy.empty((0,), dtype=numpy.int64))
+            lo.append(numpy.concatenate(nLo) if nLo else numpy.empty((0, dim)))
+            hi.append(numpy.concatenate(nHi) if nHi else numpy.empty((0, dim)))
+        allIds = numpy.concatenate(ids).astype(numpy.int64)
+        # items are typically stored in several octants; keep each bbox only once
+        items, first, nodeItems = numpy.unique(allIds, return_index=True, return_inverse=True)
+        itemOffsets = numpy.zeros(len(nodes)+1, dtype=numpy.int64)
+        numpy.cumsum([len(i) for i in ids], out=itemOffsets[1:])
+        return dict(
+            mask=numpy.array(self.mask, dtype=numpy.int64),
+            origin=numpy.array([n.origin for n in nodes], dtype=numpy.float64),
+            size=numpy.array([n.size for n in nodes], dtype=numpy.float64),
+            level=numpy.array([n.level for n in nodes], dtype=numpy.int64),
+            firstChild=numpy.array(firstChild, dtype=numpy.int64),
+            itemOffsets=itemOffsets,
+            nodeItems=nodeItems.astype(numpy.int64),
+            items=items,
+            bboxes=numpy.stack((numpy.concatenate(lo)[first], numpy.concatenate(hi)[first]), axis=1)
+        )
+
+    @staticmethod
+    def fromArrays(arrays):
+        """
+        Reconstruct the tree from arrays returned by :obj:`toArrays`. Octants are always :obj:`Octant_py` instances, items are stored in their array storage.
+
+        :param dict arrays: mapping of array names to arrays (can also be e.g. an HDF5 group)
+        :rtype: Octree
+        """
+        mask, origin, size, level, firstChild, itemOffsets, nodeItems, items, bboxes = [numpy.asarray(arrays[k]) for k in ('mask', 'origin', 'size', 'level', 'firstChild', 'itemOffsets', 'nodeItems', 'items', 'bboxes')]
+        ret = Octree(tuple(origin[0]), float(size[0]), tuple(bool(m) for m in mask))
+        nodes = [None]*origin.shape[0]
+        nodes[0] = ret.root = Octant_py(octree=ret, parent=None, origin=tuple(origin[0]), size=float(size[0]), level=int(level[0]))
+        for i, node in enumerate(nodes):
+            if firstChild[i] < 0:
+                ii = nodeItems[itemOffsets[i]:itemOffsets[i+1]]
+                if ii.shape[0] > 0: node.ids, node.lo, node.hi = items[ii], bboxes[ii, 0, :], bboxes[ii, 1, :]
+                continue
+            node.children = []
+            for c, (ci, cj, ck) in enumerate(node.childrenIJK()):
+                ch = firstChild[i]+c
+                nodes[ch] = Octant_py(octree=ret, parent=node, origin=tuple(origin[ch]), size=float(size[ch]), level=int(level[ch]))
+                if cj == 0 and ck == 0: node.children.append([])
+                if ck == 0: node.children[ci].append([])
+                node.children[ci][cj].append(nodes[ch])
+        return ret
+
     #def delete(self, item):
     #    """
     #    Removes the given object from octree.
@@ -35,13 +35,35 @@ import pydantic
 import requests
 import uuid
 import os.path
+import threading
+import concurrent.futures
+import Pyro5.errors
 from .baredata import Utility
+from . import util
 from typing import Optional
 from .dataid import DataID
 from typing import Any
 
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
 log = logging.getLogger(__name__)
 
+# chunk codecs for offset-addressed transfers (each chunk is encoded independently): name -> (encode, decode)
+_chunkCodecs = {
+    'zlib': (zlib.compress, zlib.decompress),
+    'zlib-fast': (lambda data: zlib.compress(data, 1), zlib.decompress),
+}
+if lz4: _chunkCodecs['lz4'] = (lz4.frame.compress, lz4.frame.decompress)
+
+
+def _getChunkCodec(codec):
+    if codec is None: return (lambda data: data, lambda data: data)
+    if codec not in _chunkCodecs: raise ValueError(f'Unknown or unavailable chunk codec {codec} (available: {", ".join(_chunkCodecs.keys())}).')
+    return _chunkCodecs[codec]
+
 
 class PyroFile(Utility):
     """
@@ -56,14 +78,19 @@ class PyroFile(Utility):
     _fileobj: Any=None
     _compressor: Any=None
     _decompressor: Any=None
+    _lock: Any=None
 
     def __init__(self, **kw):
         super().__init__(**kw)
-        if self.mode not in ('rb', 'wb'):
-            raise ValueError(f"mode must be 'rb' or 'wb' (not '{self.mode}').")
+        if self.mode not in ('rb', 'wb', 'r+b'):
+            raise ValueError(f"mode must be 'rb', 'wb' or 'r+b' (not '{self.mode}').")
+        # r+b: write without truncating (for resumed transfers), create if it does not exist
+        if self.mode == 'r+b' and not os.path.exists(self.filename): open(self.filename, 'wb').close()
         self._fileobj = open(self.filename, self.mode)
         self._compressor = None
         self._decompressor = None
+        # offset-addressed access may come from several (Pyro) threads at once
+        self._lock = threading.Lock()
 
     @Pyro5.api.expose
     def getDataID(self):
@@ -98,6 +125,92 @@ class PyroFile(Utility):
                 self.rewind()
                 return
 
+    @Pyro5.api.expose
+    def getSize(self):
+        """
+        :return: current size of the file in bytes
+        :rtype: int
+        """
+        with self._lock:
+            self._fileobj.flush()
+            return os.fstat(self._fileobj.fileno()).st_size
+
+    @Pyro5.api.expose
+    def getChunkAt(self, offset, size, codec=None):
+        """
+        Reads and returns *size* bytes starting at *offset* (less if end-of-file is reached); the file position used by :obj:`getChunk` is not affected. Unlike :obj:`getChunk`, chunks are encoded independently and can be requested concurrently and in any order.
+
+        :param int offset: starting position in the file
+        :param int size: number of bytes to read
+        :param str codec: compression of the returned chunk (None, 'zlib', 'zlib-fast' or, if the lz4 module is installed, 'lz4')
+        :return: (encoded) data
+        :rtype: bytes
+        """
+        encode = _getChunkCodec(codec)[0]
+        with self._lock:
+            pos = self._fileobj.tell()
+            self._fileobj.seek(offset)
+            data = self._fileobj.read(size)
+            self._fileobj.seek(pos)
+        return encode(data)
+
+    @Pyro5.api.expose
+    def setChunkAt(self, offset, buffer, codec=None):
+        """
+        Writes chunk of data (as returned by :obj:`getChunkAt` with the same *codec*) at *offset*, which may lie beyond the current end of the file; the file should be opened in write mode.
+
+        :param int offset: position in the file
+        :param bytes buffer: (encoded) data
+        :param str codec: compression of the chunk
+        """
+        if type(buffer) == dict:
+            buffer = serpent.tobytes(buffer)
+        data = _getChunkCodec(codec)[1](buffer)
+        with self._lock:
+            self._fileobj.seek(offset)
+            self._fileobj.write(data)
+
+    @Pyro5.api.expose
+    def truncate(self, size):
+        """
+        Truncate (or extend) the file to *size* bytes; the file should be opened in write mode.
+        """
+        with self._lock:
+            self._fileobj.truncate(size)
+
+    def _readRange(self, offset, size):
+        'Yield file content between *offset* and *offset+size* (or end-of-file, if *size* is None) in bufSize blocks; uses separate file handle, thus works in all modes.'
+        with self._lock:
+            if not self._fileobj.closed and self.mode != 'rb': self._fileobj.flush()
+        with open(self.filename, 'rb') as f:
+            f.seek(offset)
+            while size is None or size > 0:
+                data = f.read(self.bufSize if size is None else min(size, self.bufSize))
+                if not data: return
+                if size is not None: size -= len(data)
+                yield data
+
+    @Pyro5.api.expose
+    def getDigest(self, offset=0, size=None):
+        """
+        :param int offset: start of the digested range
+        :param int size: length of the digested range (None for the rest of the file)
+        :return: SHA1 digest (see :obj:`mupif.util.sha1digest`) of the file content (whole file by default)
+        :rtype: str
+        """
+        return util.sha1digest(self._readRange(offset, size))
+
+    @Pyro5.api.expose
+    def getChunkDigests(self, chunkSize, size=None):
+        """
+        :param int chunkSize: chunk size
+        :param int size: only digest chunks covering the first *size* bytes (whole file if None)
+        :return: SHA1 digests of subsequent chunks of *chunkSize* bytes (the last one may be shorter)
+        :rtype: list[str]
+        """
+        if size is None: size = self.getSize()
+        return [self.getDigest(offset, min(chunkSize, size-offset)) for offset in range(0, size, chunkSize)]
+
     @Pyro5.api.expose
     def getBasename(self):
         return os.path.basename(self.filename)
@@ -150,12 +263,23 @@ class PyroFile(Utility):
     # @pydantic.validate_call # does not work yet, see https://stackoverflow.com/q/70965979
     def copy(src: typing.Union[PyroFile, Pyro5.api.Proxy, str, pathlib.Path],
              dst: typing.Union[PyroFile, Pyro5.api.Proxy, str, pathlib.Path],
-             compress=True):
+             compress=True, inFlight=0, codec=None, chunkSize=2**22):
         """
         Copy the content of *src* to *dst*; any of them might be local instance of PyroFile,
         Pyro5.api.Proxy to remote PyroFile, or *str* or *pathlib.Path*. If both are local
         paths, fast-copy is done (without compression), otherwise the tranfer is done by
         chunks.
+
+        By default, chunks are transferred sequentially (with compression done by the reading
+        side as a single zlib stream). With *inFlight* > 0, the pipelined mode is used instead:
+        *inFlight* threads, each with their own Pyro connection to both ends, read
+        (:obj:`getChunkAt`), compress, transmit and write (:obj:`setChunkAt`) independent chunks
+        of *chunkSize* bytes concurrently. Both ends must support offset-addressed chunks in that case.
+
+        :param bool compress: compress data in transit (zlib); in the pipelined mode, only used when *codec* is not given
+        :param int inFlight: number of chunks transferred concurrently (0 for sequential transfer)
+        :param str codec: chunk codec for the pipelined mode (see :obj:`getChunkAt`); defaults to 'zlib' with *compress*, to no compression otherwise
+        :param int chunkSize: chunk size for the pipelined mode
         """
         # fast-path if both are local files
         if isinstance(src, (str, pathlib.Path)) and isinstance(dst, (str, pathlib.Path)):
@@ -167,6 +291,10 @@ class PyroFile(Utility):
             src.rewind()  # necessary if the file was used already
         if isinstance(dst, (str, pathlib.Path)):
             dst = PyroFile(filename=dst, mode='wb')
+        if inFlight > 0:
+            PyroFile.copyPipelined_static(src, dst, inFlight=inFlight, codec=codec if codec is not None else ('zlib' if compress else None), chunkSize=chunkSize)
+            dst.close()
+            return
         # both ends must have the same compression options
         src.setCompressionFlag(compress)
         dst.setCompressionFlag(compress)
@@ -175,6 +303,83 @@ class PyroFile(Utility):
             dst.setChunk(data)
         dst.close()
 
+    @staticmethod
+    def resume(src: typing.Union[PyroFile, Pyro5.api.Proxy, str, pathlib.Path],
+               dst: typing.Union[PyroFile, Pyro5.api.Proxy, str, pathlib.Path],
+               *, inFlight=1, codec='zlib', chunkSize=2**22, retries=3):
+        """
+        Resumable, verified copy of *src* to *dst*. Content already present in *dst* is kept:
+        per-chunk digests (:obj:`getChunkDigests`) of both ends are compared and only chunks
+        which are missing or differ are transferred (see :obj:`copy` for *inFlight*, *codec*
+        and *chunkSize*). Whole-file digests (:obj:`getDigest`) are compared at the end.
+        Communication errors and digest mismatches trigger new attempt (with the same
+        comparison, so only the rest is transferred), at most *retries* times.
+
+        Local *dst* path is opened without truncation (mode ``r+b``); remote *dst* must be
+        opened in mode ``r+b`` to resume transfer of existing data (in mode ``wb``, it is
+        truncated when opened, thus the transfer starts from scratch, but is still verified).
+
+        :return: number of bytes transferred
+        :rtype: int
+        """
+        if isinstance(src, (str, pathlib.Path)): src = PyroFile(filename=src, mode='rb')
+        if isinstance(dst, (str, pathlib.Path)): dst = PyroFile(filename=dst, mode='r+b')
+        transferred = 0
+        for attempt in range(retries+1):
+            try:
+                size = src.getSize()
+                if dst.getSize() > size: dst.truncate(size)
+                dstDigests = dst.getChunkDigests(chunkSize)
+                srcDigests = src.getChunkDigests(chunkSize, size=len(dstDigests)*chunkSize)
+                offsets = [i*chunkSize for i in range(len(srcDigests)) if srcDigests[i] != dstDigests[i]]+list(range(len(dstDigests)*chunkSize, size, chunkSize))
+                if offsets: log.info(f'{src.getBasename()}: transferring {len(offsets)} chunk(s) of {chunkSize} bytes.')
+                PyroFile.copyPipelined_static(src, dst, inFlight=inFlight, codec=codec, chunkSize=chunkSize, offsets=offsets)
+                transferred += sum(min(chunkSize, size-o) for o in offsets)
+                if src.getDigest() == dst.getDigest():
+                    dst.close()
+                    return transferred
+                log.warning(f'{src.getBasename()}: digest mismatch after transfer (attempt {attempt+1}/{retries+1}).')
+            except Pyro5.errors.CommunicationError as e:
+                log.warning(f'Transfer interrupted (attempt {attempt+1}/{retries+1}): {e}')
+                for f in (src, dst):
+                    # next remote call will reconnect
+                    if isinstance(f, Pyro5.api.Proxy): f._pyroRelease()
+                if attempt == retries: raise
+        raise RuntimeError(f'{src.getBasename()}: digest mismatch after {retries+1} transfer attempts.')
+
+    @staticmethod
+    def copyPipelined_static(src, dst, inFlight, codec, chunkSize, offsets=None):
+        """
+        Copy chunks from *src* to *dst* concurrently (see :obj:`copy`); *dst* is not closed.
+
+        :param list[int] offsets: only transfer chunks starting at these offsets (all chunks if None)
+        """
+        _getChunkCodec(codec)  # fail early if unavailable locally
+        if offsets is None: offsets = range(0, src.getSize(), chunkSize)
+        # Pyro proxies can only be used from the thread which owns them; use a new proxy in each thread
+        local = threading.local()
+        proxies, proxiesLock = [], threading.Lock()
+
+        def _ends():
+            if not hasattr(local, 'ends'):
+                local.ends = tuple((Pyro5.api.Proxy(f._pyroUri) if isinstance(f, Pyro5.api.Proxy) else f) for f in (src, dst))
+                with proxiesLock: proxies.extend(e for e in local.ends if isinstance(e, Pyro5.api.Proxy))
+            return local.ends
+
+        def _transfer(offset):
+            s, d = _ends()
+            d.setChunkAt(offset, s.getChunkAt(offset, chunkSize, codec), codec)
+
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=inFlight)
+        try:
+            # consume results in order so that the first error is raised
+            for fut in [pool.submit(_transfer, offset) for offset in offsets]: fut.result()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+            for p in proxies:
+                p._pyroClaimOwnership()
+                p._pyroRelease()
+
     @staticmethod
     def makeFromUrl(url):
         r = requests.get(url, allow_redirects=True)
@@ -8,29 +8,143 @@ import serpent
 import threading
 import itertools
 import collections
+import copy
+import queue
 
 
-class PyroLogHandler(logging.StreamHandler):
+class PyroLogHandler(logging.Handler):
     """
     Handler which sends records over Pyro; there is no formatting happening on this side of the logger,
-    it only sends pickled LogRecord over to the PyroLogReceiver side, which forwards the record to the
+    it only sends pickled LogRecords over to the PyroLogReceiver side, which forwards the records to the
     logger on the remote side. That is where formatting happens.
 
+    Records are put into a queue (which never blocks the logging call) and sent by a background thread,
+    in batches of up to *batchSize* records (:obj:`PyroLogReceiver.handleRecords`), at least every
+    *flushInterval* seconds. Under backpressure (the queue is more than half full), only every
+    *sampleEvery*-th record below WARNING is queued; when the queue is full, records are dropped.
+    Numbers of sent, sampled-out and dropped records are kept in *counters* (updated by logging threads and
+    the background thread, under *countersLock*); the remote side is notified
+    about records which were sampled out or dropped. Pending records are sent by :obj:`flush` and
+    :obj:`close` (the latter is called by the logging system at exit).
+
     The handler should be set up automatically when MUPIF_LOG_PYRO is set.
 
     The *tag* is currently unused, but something similar should be used (and added to the formatter on
     the remote side) so that records are identified with their originating machine and model.
     """
-    def __init__(self, *, uri):
-        self.uri = uri
-        self.remoteLog = Pyro5.api.Proxy(uri)
-        self.lock = threading.Lock()
+    def __init__(self, *, uri, capacity=10000, batchSize=500, flushInterval=.5, sampleEvery=10):
         super().__init__()
+        self.uri = uri
+        self.batchSize = batchSize
+        self.flushInterval = flushInterval
+        self.sampleEvery = sampleEvery
+        self.queue = queue.Queue(maxsize=capacity)
+        self.counters = collections.Counter(sent=0, sampled=0, dropped=0)
+        self.countersLock = threading.Lock()
+        # counters already reported to the remote side
+        self._reported = collections.Counter(sampled=0, dropped=0)
+        self._sampleCounter = itertools.count()
+        self._closed = False
+        self.thread = threading.Thread(target=self._run, name='PyroLogHandler', daemon=True)
+        self.thread.start()
 
     def emit(self, record):
-        with self.lock:
-            self.remoteLog._pyroClaimOwnership()
-            self.remoteLog.handleRecord(pickle.dumps(record))
+        if self._closed: return
+        q = self.queue
+        if record.levelno < logging.WARNING and q.qsize() > q.maxsize//2 and next(self._sampleCounter) % self.sampleEvery != 0:
+            self._count('sampled')
+            return
+        try:
+            q.put_nowait(self.prepare(record))
+        except queue.Full:
+            self._count('dropped')
+        except Exception:
+            self.handleError(record)
+
+    def _count(self, what, num=1):
+        'Increment counter *what* by *num*.'
+        with self.countersLock:
+            self.counters[what] += num
+
+    @staticmethod
+    def prepare(record):
+        'Return copy of *record* which can be pickled: message is merged with args and exception info is formatted.'
+        msg = record.getMessage()
+        ret = copy.copy(record)
+        ret.msg, ret.args = msg, None
+        if ret.exc_info:
+            ret.exc_text = logging.Formatter().formatException(ret.exc_info)
+            ret.exc_info = None
+        return ret
+
+    def _run(self):
+        # the proxy is only used from this thread
+        remoteLog = Pyro5.api.Proxy(self.uri)
+        batched = True
+        while True:
+            batch, stop = [], False
+            deadline = time.monotonic()+self.flushInterval
+            while len(batch) < self.batchSize:
+                try:
+                    rec = self.queue.get(timeout=max(0., deadline-time.monotonic()))
+                except queue.Empty:
+                    break
+                # flush request: the event is set once records queued before it were sent
+                if isinstance(rec, threading.Event):
+                    self._send(remoteLog, batch, batched)
+                    batch = []
+                    rec.set()
+                    continue
+                # close request
+                if rec is None:
+                    stop = True
+                    break
+                batch.append(rec)
+            batched = self._send(remoteLog, batch, batched)
+            if stop: return
+
+    def _send(self, remoteLog, batch, batched):
+        'Send *batch*; return whether the remote side supports batches.'
+        for what in ('sampled', 'dropped'):
+            with self.countersLock:
+                num = self.counters[what]-self._reported[what]
+                self._reported[what] += num
+            if num > 0:
+                batch.append(logging.makeLogRecord(dict(name=__name__, levelno=logging.WARNING, levelname='WARNING', msg=f'PyroLogHandler: {num} record(s) {what} (queue overloaded).')))
+        if not batch: return batched
+        try:
+            if batched:
+                try: remoteLog.handleRecords(pickle.dumps(batch))
+                except AttributeError:
+                    # receiver from older mupif version
+                    batched = False
+            if not batched:
+                for rec in batch: remoteLog.handleRecord(pickle.dumps(rec))
+            self._count('sent', len(batch))
+        except Exception:
+            self._count('dropped', len(batch))
+            sys.stderr.write(f'PyroLogHandler: failed to send {len(batch)} log record(s) to {self.uri}.\n')
+        return batched
+
+    def flush(self, timeout=10.):
+        """
+        Wait (at most *timeout* seconds) until records logged so far are sent.
+        """
+        if self._closed or not self.thread.is_alive(): return
+        ev = threading.Event()
+        self.queue.put(ev)
+        ev.wait(timeout)
+
+    def close(self):
+        """
+        Send pending records and stop the background thread.
+        """
+        if not self._closed:
+            self._closed = True
+            if self.thread.is_alive():
+                self.queue.put(None)
+                self.thread.join(10.)
+        super().close()
 
 
 @Pyro5.api.expose
@@ -55,7 +169,17 @@ class PyroLogReceiver(object):
     def handleRecord(self, recPickle):
         if isinstance(recPickle, dict):
             recPickle = serpent.tobytes(recPickle)
-        rec = pickle.loads(recPickle)
+        self._handle(pickle.loads(recPickle))
+
+    def handleRecords(self, recsPickle):
+        """
+        Handle list of pickled LogRecords (sent by :obj:`PyroLogHandler` in one call).
+        """
+        if isinstance(recsPickle, dict):
+            recsPickle = serpent.tobytes(recsPickle)
+        for rec in pickle.loads(recsPickle): self._handle(rec)
+
+    def _handle(self, rec):
         if Pyro5.callcontext.current_context.client:
             rec.processName=Pyro5.callcontext.current_context.client_sock_addr[0]+':'+rec.processName
         self.log.handle(rec)
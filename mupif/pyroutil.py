@@ -203,13 +203,130 @@ def getDaemon(proxy: Pyro5.api.Proxy = None, exclusive=False) -> Pyro5.api.Daemo
     return dNew
 
 
+#: caching of nameserver lookups (used by :obj:`connectApp`, :obj:`connectModelServer` and friends) and pooling of proxies to remote objects (only with ``connectApp(…,pooled=True)``):
+#:
+#: * *enabled*: use the caches at all;
+#: * *lookupTtl*: seconds for which nameserver lookups (URI and metadata) are cached;
+#: * *healthCheckInterval*: pooled proxy not verified for this many seconds is tested (by calling ``getApplicationSignature``) before being returned; within the interval, only proxies with connection still open are returned (a dead server is not detected then);
+#: * *maxIdle*: pooled proxies unused for this many seconds are released.
+connectionCache = dict(enabled=True, lookupTtl=10., healthCheckInterval=5., maxIdle=300.)
+
+# (nameserver URI, name) -> (expiry time, URI, metadata)
+_nsLookupCache = {}
+# (thread ident, URI) -> [proxy, time of last check, time of last use]
+_proxyPool = {}
+_connectionCacheLock = threading.Lock()
+
+
+def clearConnectionCache(*, ns=None, name=None):
+    """
+    Remove cached nameserver lookups and pooled proxies. Without arguments, everything is cleared; otherwise only lookups of *name* (on nameserver *ns*) and proxies for the URIs it was resolved to. Proxies already returned to callers remain usable.
+    """
+    with _connectionCacheLock:
+        keys = [k for k in _nsLookupCache.keys() if (name is None or k[1] == name) and (ns is None or k[0] == str(ns._pyroUri))]
+        uris = set([str(_nsLookupCache[k][1]) for k in keys if isinstance(k[1], str)])
+        for k in keys: del _nsLookupCache[k]
+        drop = [k for k in _proxyPool.keys() if (ns is None and name is None) or k[1] in uris]
+        proxies = [_proxyPool.pop(k)[0] for k in drop]
+    for proxy in proxies: _releaseProxy(proxy)
+
+
+def _releaseProxy(proxy):
+    # proxies owned by other threads (possibly still used by the caller who got them) are only dropped from the pool
+    if proxy._Proxy__pyroOwnerThread != threading.get_ident(): return
+    try: proxy._pyroRelease()
+    except Exception: log.debug(f'Error releasing pooled proxy for {proxy._pyroUri} (ignored).')
+
+
+def _nsLookup(ns, name):
+    """
+    Look up *name* on nameserver *ns*, using cached result (see :obj:`connectionCache`) if available.
+
+    :return: (URI, metadata, whether the result came from the cache)
+    """
+    key, now = (str(ns._pyroUri), name), time.time()
+    if connectionCache['enabled']:
+        with _connectionCacheLock:
+            if (hit := _nsLookupCache.get(key, None)) is not None and hit[0] > now: return hit[1], hit[2], True
+    uri, mdata = ns.lookup(name, return_metadata=True)
+    if connectionCache['enabled']:
+        with _connectionCacheLock: _nsLookupCache[key] = (now+connectionCache['lookupTtl'], uri, mdata)
+    return uri, mdata, False
+
+
+def _testConnection(proxy, connectionTestTimeOut):
+    """
+    Test that the remote object is operational, by calling its ``getApplicationSignature`` method with *connectionTestTimeOut*.
+
+    By default, Pyro waits an indefinite amount of time for the call to return; the timeout is set for the test call only, and reset to default afterwards. When timeout passes, Pyro5.errors.CommunicationError is thrown. This is essential to detect the case when, for example, object has been registered at namesever, but is not operational at the moment.
+
+    :return: application signature
+    """
+    proxy._pyroTimeout = connectionTestTimeOut
+    try: return proxy.getApplicationSignature()
+    finally: proxy._pyroTimeout = None
+
+
+def _pooledProxy(uri, connectionTestTimeOut):
+    """
+    Return proxy for *uri* owned by the current thread, connected and tested, re-using pooled proxy if possible (see :obj:`connectionCache`). The pooled proxy is the same object for all callers in the thread: they must not release it, use it as context manager or change its timeout.
+
+    :raises Pyro5.errors.CommunicationError: connection test failed
+    """
+    now, thread = time.time(), threading.get_ident()
+    if not connectionCache['enabled']:
+        proxy = Pyro5.api.Proxy(uri)
+        _testConnection(proxy, connectionTestTimeOut)
+        return proxy
+    key = (thread, str(uri))
+    with _connectionCacheLock:
+        # release idle proxies and proxies of threads which are gone
+        alive = set([t.ident for t in threading.enumerate()])
+        stale = [k for k, (p, checked, used) in _proxyPool.items() if k[0] not in alive or now-used > connectionCache['maxIdle']]
+        staleProxies = [_proxyPool.pop(k)[0] for k in stale]
+        rec = _proxyPool.get(key, None)
+    for p in staleProxies: _releaseProxy(p)
+    # ownership could have been transferred to another thread by the caller, don't use the proxy then
+    if rec is not None and rec[0]._Proxy__pyroOwnerThread == thread:
+        proxy, checked, used = rec
+        if now-checked < connectionCache['healthCheckInterval'] and proxy._pyroConnection is not None:
+            rec[2] = now
+            return proxy
+        try:
+            _testConnection(proxy, connectionTestTimeOut)
+            rec[1] = rec[2] = now
+            return proxy
+        except Exception:
+            log.debug(f'Pooled proxy for {uri} failed health check, reconnecting.')
+    with _connectionCacheLock:
+        if _proxyPool.get(key, None) is rec: _proxyPool.pop(key, None)
+    proxy = Pyro5.api.Proxy(uri)
+    _testConnection(proxy, connectionTestTimeOut)
+    with _connectionCacheLock: _proxyPool[key] = [proxy, now, now]
+    return proxy
+
+
+def _nsYplookup(ns, metaAll):
+    """
+    Like ``ns.yplookup(meta_all=metaAll)``, but cached in the same way as :obj:`_nsLookup`.
+    """
+    key, now = (str(ns._pyroUri), ('yplookup', frozenset(metaAll))), time.time()
+    if connectionCache['enabled']:
+        with _connectionCacheLock:
+            if (hit := _nsLookupCache.get(key, None)) is not None and hit[0] > now: return hit[1]
+    ret = ns.yplookup(meta_all=metaAll)
+    if connectionCache['enabled']:
+        with _connectionCacheLock: _nsLookupCache[key] = (now+connectionCache['lookupTtl'], ret, None)
+    return ret
+
+
 def getNSmetadata(ns, name):
     """
-    Returns name server metadata for given entry identified by name
+    Returns name server metadata for given entry identified by name (the lookup is cached, see :obj:`connectionCache`)
     :return entry metadata 
     :rtype: list of strings
     """
-    (uri, mdata) = ns.lookup(name, return_metadata=True)
+    (uri, mdata, cached) = _nsLookup(ns, name)
     return mdata
 
 
@@ -228,50 +345,50 @@ def getNSConnectionInfo(ns, name):
     return None, None
 
 
-def _connectApp(ns, name, connectionTestTimeOut=10.):
+def _connectApp(ns, name, connectionTestTimeOut=10., pooled=False):
     """
-    Connects to a remote application.
+    Connects to a remote application. Nameserver lookup is cached (see :obj:`connectionCache`); if the connection test fails, the connection is retried with fresh lookup.
 
     :param Pyro5.naming.Nameserver ns: Instance of a nameServer
     :param str name: Name of the application to be connected to
     :param connectionTestTimeOut timeout for connection test
+    :param bool pooled: return proxy shared with other pooled callers in the current thread, see :obj:`_pooledProxy` (saves connecting and testing the connection); by default, a new proxy is returned, which the caller owns (and may release, or pass to another thread)
     :return: Application
     :rtype: Instance of an application
     :raises Exception: When cannot find registered server or Cannot connect to application or Timeout passes
     """
-    try:
-        uri = ns.lookup(name)
-        log.debug(f"Application {name}, found URI {uri} on {getNSConnectionInfo(ns,name)} from a nameServer {ns._pyroUri}")
-        app2 = Pyro5.api.Proxy(uri)
-    except Exception as e:
-        log.error(f"Cannot find registered server {name} on {ns}")
-        raise
-
-    try:
-        log.info(f"Connecting to application {name} with {app2._pyroUri}")
-        # By default, Pyro waits an indefinite amount of time for the call to return. 
-        # When testing connection to an remote object via _connectApp, the object getSignature method is called.
-        # The connection timeout is set for this call. after this, the timeout is reset to default.
-        # When timeout is passed, Pyro4.errors.CommunicationError is thrown.
-        # This is essential to detect the case when, for example, object has been registered at namesever, 
-        # but is not operational at the moment.
-        app2._pyroTimeout = connectionTestTimeOut
-        sig = app2.getApplicationSignature()
-        app2._pyroTimeout = None
-        log.debug("Connected to " + sig + " with the application " + name)
-    except Pyro5.core.errors.CommunicationError as e:
-        log.exception("Communication error (network config?).")
-        print("|".join(Pyro5.errors.get_pyro_traceback()))
-        raise
-    except Exception as e:
-        log.exception(f"Cannot connect to application {name}. Is the server running?")
-        raise
+    for attempt in (0, 1):
+        try:
+            uri, mdata, cached = _nsLookup(ns, name)
+            log.debug(f"Application {name}, found URI {uri} on {getNSConnectionInfo(ns,name)} from a nameServer {ns._pyroUri}")
+        except Exception as e:
+            log.error(f"Cannot find registered server {name} on {ns}")
+            raise
 
-    return app2
+        try:
+            log.info(f"Connecting to application {name} with {uri}")
+            if pooled: app2 = _pooledProxy(uri, connectionTestTimeOut)
+            else:
+                app2 = Pyro5.api.Proxy(uri)
+                _testConnection(app2, connectionTestTimeOut)
+            log.debug(f"Connected to the application {name}")
+            return app2
+        except Exception as e:
+            # the cached lookup might be outdated (application re-registered): retry with fresh one
+            if attempt == 0 and cached:
+                log.debug(f'Connection to {name} at {uri} failed, retrying with fresh nameserver lookup.')
+                clearConnectionCache(ns=ns, name=name)
+                continue
+            if isinstance(e, Pyro5.core.errors.CommunicationError):
+                log.exception("Communication error (network config?).")
+                print("|".join(Pyro5.errors.get_pyro_traceback()))
+            else:
+                log.exception(f"Cannot connect to application {name}. Is the server running?")
+            raise
 
 
-def connectApp(ns, name, connectionTestTimeOut=10.):
-    return _connectApp(ns, name, connectionTestTimeOut)
+def connectApp(ns, name, connectionTestTimeOut=10., pooled=False):
+    return _connectApp(ns, name, connectionTestTimeOut, pooled=pooled)
 
 
 def _connectAppWithMetadata(ns, requiredMData, optionalMData=[], connectionTestTimeOut=10.):
@@ -288,7 +405,7 @@ def _connectAppWithMetadata(ns, requiredMData, optionalMData=[], connectionTestT
     """
     raise NotImplementedError('Execution profiles not yet implemented correctly.')
     try:
-        candidates = ns.yplookup(meta_all=requiredMData)
+        candidates = _nsYplookup(ns, requiredMData)
         if not candidates:
             raise Exception('_connectAppWithMetadata: NS yplookup failed')
         # now to select optimal candidate
@@ -316,13 +433,11 @@ def _connectAppWithMetadata(ns, requiredMData, optionalMData=[], connectionTestT
         for key, val in orderedCandidates.items():
             name = key
             uri=val[0]
-            app = Pyro5.api.Proxy(uri)
             log.info(f"Trying to Connect to application {name} with {uri}")
             try:
-                app._pyroTimeout = connectionTestTimeOut
-                sig = app.getApplicationSignature()
-                app._pyroTimeout = None
-                log.info("Connected to " + sig + " with the application " + name)
+                app = Pyro5.api.Proxy(uri)
+                _testConnection(app, connectionTestTimeOut)
+                log.info("Connected to the application " + name)
                 return app
             except Exception as e:
                 log.exception(f"Cannot connect to application {name}. Is the server running?")
@@ -579,7 +694,8 @@ def allocateApplicationWithModelServer(*, ns, jobMan, remoteLogUri):
         log.exception("ModelServerBase allocateJob() failed")
         print("| ".join(Pyro5.errors.get_pyro_traceback()))
         raise
-    return model.RemoteModel(_connectApp(ns, jobid), jobMan=jobMan, jobID=jobid)
+    # the job is new, there is nothing to re-use; the proxy is owned by the caller, who can pass it to another thread
+    return model.RemoteModel(_connectApp(ns, jobid, pooled=False), jobMan=jobMan, jobID=jobid)
 
 
 def allocateNextApplication(*, ns, jobMan, remoteLogUri):
@@ -9,6 +9,7 @@ import pydantic
 import astropy.units as au
 import typing
 import pickle
+import collections
 import Pyro5.api
 import numpy as np
 import os.path
@@ -17,6 +18,8 @@ import os.path
 class _FieldLocation(pydantic.BaseModel):
     field: str
     mesh: str
+    #: index of the time step, for fields stored in time series
+    step: typing.Optional[int] = None
 
 
 class _FieldMetadata(pydantic.BaseModel):
@@ -34,43 +37,105 @@ class _FieldMetadata(pydantic.BaseModel):
 
 @Pyro5.api.expose
 class TemporalField(Data):
+    """
+    Field defined at discrete time points. Metadata are kept sorted by time, with times (in seconds) mirrored in an array, so that lookups are binary searches. Fields constructed from storage are kept in LRU cache of at most :obj:`cacheSize` fields.
+
+    :obj:`evaluate` interpolates linearly between the neighbouring time steps for times which are not stored.
+    """
     fieldMeta: typing.List[_FieldMetadata] = []
+    #: maximum number of fields kept in memory
+    cacheSize: int = 8
+
+    _cache: typing.Any = None
+    _times: typing.Any = None
 
     def __init__(self, *a, **kw):
         super().__init__(*a, **kw)
-        self._cache={}
+        self._resetIndex(self.fieldMeta)
+
+    def _resetIndex(self, fieldMeta=[]):
+        'Clear cached fields and rebuild the time index from *fieldMeta*.'
+        self._cache = collections.OrderedDict()
+        self.fieldMeta, self._times = [], np.empty(0)
+        for md in fieldMeta: self._insertMetadata(md)
+
+    def _insertMetadata(self, md):
+        t = md['time'].to_value(au.s)
+        i = int(np.searchsorted(self._times, t, side='right'))
+        self._times = np.insert(self._times, i, t)
+        self.fieldMeta.insert(i, md)
+
     def timeList(self) -> typing.List[Quantity]:
         return [md['time'] for md in self.fieldMeta]
+
+    def _timeRange(self, time, epsTime):
+        'Return index range of stored times within *epsTime* from *time*.'
+        t, e = time.to_value(au.s), abs(epsTime.to_value(au.s))
+        return int(np.searchsorted(self._times, t-e, side='left')), int(np.searchsorted(self._times, t+e, side='right'))
+
     def timeMetadata(self, time, epsTime=0.0*au.s) -> dict:
-        mmd=[md for md in self.fieldMeta if np.abs(md['time']-time)<=epsTime]
-        if len(mmd)>=2: raise ValueError('Ambiguous time specification {time} with given eps={eps} ({len(mmd)} fields matching).')
-        assert len(mmd)<2
-        if len(mmd)==1: return mmd[0]
+        i0, i1 = self._timeRange(time, epsTime)
+        if i1-i0 >= 2: raise ValueError(f'Ambiguous time specification {time} with given eps={epsTime} ({i1-i0} fields matching).')
+        if i1-i0 == 1: return self.fieldMeta[i0]
         return None
+
+    def _fieldFromMetadata(self, md):
+        key = md['time']
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        # construct field from location
+        ret = self._cache[key] = self._field_make_from_loc(md['loc'])
+        while len(self._cache) > max(1, self.cacheSize): self._cache.popitem(last=False)
+        return ret
+
     def getField(self, time: Quantity, epsTime=0.0*au.s):
-        # don't fetch field we already have
-        if time in self._cache:
-            return self._cache[time]
         # get metadata, raise exception if no data for given time
-        md = self.timeMetadata(time)
+        md = self.timeMetadata(time, epsTime=epsTime)
         if md is None:
             raise ValueError(f'Field not defined for time {time}')
-        # construct field from location
-        self._cache[time] = self._field_make_from_loc(md['loc'])
-        return self._cache[time]
+        return self._fieldFromMetadata(md)
 
     def getCachedTimes(self):
         return set(self._cache.keys())
-    def evaluate(self,time: Quantity, positions, eps: float=0.0, epsTime=0.0*au.s):
-        return self.getField(time,epsTime=epsTime).evaluate(positions=positions,eps=eps)
-    def addField(self,field,userMetadata):
-        time=field.getTime()
+
+    def evaluate(self, time: Quantity, positions, eps: float=0.0, epsTime=0.0*au.s, interpolate=True):
+        """
+        Evaluate the field at *time*. If no field is stored for *time* (within *epsTime*), values of fields at the neighbouring time steps are interpolated linearly; fields defined on the same mesh are evaluated with a single :obj:`mupif.transferoperator.TransferOperator` (positions are localized only once).
+
+        :param positions: position or positions, see :obj:`mupif.field.Field.evaluate`
+        :param bool interpolate: interpolate between time steps; if False, raise ValueError for time which is not stored
+        :except ValueError: *time* is outside of stored times (or not stored, without *interpolate*)
+        """
+        md = self.timeMetadata(time, epsTime=epsTime)
+        if md is not None or not interpolate:
+            return self.getField(time, epsTime=epsTime).evaluate(positions=positions, eps=eps)
+        i = int(np.searchsorted(self._times, time.to_value(au.s)))
+        if i == 0 or i == len(self._times):
+            raise ValueError(f'Field not defined for time {time}' + (f' (stored times are {self.fieldMeta[0]["time"]} … {self.fieldMeta[-1]["time"]})' if self.fieldMeta else ''))
+        md0, md1 = self.fieldMeta[i-1], self.fieldMeta[i]
+        w = (time.to_value(au.s)-self._times[i-1])/(self._times[i]-self._times[i-1])
+        f0, f1 = self._fieldFromMetadata(md0), self._fieldFromMetadata(md1)
+        batch = isinstance(positions, list) or (isinstance(positions, np.ndarray) and not isinstance(positions, Quantity) and positions.ndim > 1)
+        if batch and md0['loc'].get('mesh') == md1['loc'].get('mesh') and f0.getFieldType() == f1.getFieldType():
+            from .transferoperator import TransferOperator
+            op = TransferOperator.make(mesh=f0.getMesh(), points=np.asarray(positions, dtype=np.float64), fieldType=f0.getFieldType(), eps=eps)
+            v0, v1 = Quantity(value=op.apply(f0.value), unit=f0.getUnit()), Quantity(value=op.apply(f1.value), unit=f1.getUnit())
+        else:
+            v0, v1 = f0.evaluate(positions=positions, eps=eps), f1.evaluate(positions=positions, eps=eps)
+        return (1-w)*v0+w*v1.to(v0.unit)
+
+    def addField(self, field, userMetadata):
+        time = field.getTime()
+        if time is None: raise ValueError('Field without time cannot be added.')
         if self.timeMetadata(time): raise ValueError(f'Field already saved for time {time}')
-        loc=self._field_save_return_loc(field) # TODO: save userMetadata to the container redundantly
-        self.fieldMeta.append({'time':time,'loc':loc,'user':userMetadata})
-    def _field_make_from_loc(self,loc):
-        fieldGrp,meshGrp=self._loc_to_h5_groups(loc)
-        return Field.makeFromHdf5_groups(fieldGrp=fieldGrp,meshGrp=meshGrp,heavy=True)
+        loc = self._field_save_return_loc(field)  # TODO: save userMetadata to the container redundantly
+        self._insertMetadata({'time': time, 'loc': loc, 'user': userMetadata})
+
+    def _field_make_from_loc(self, loc):
+        fieldGrp, meshGrp = self._loc_to_h5_groups(loc)
+        return Field.makeFromHdf5_groups(fieldGrp=fieldGrp, meshGrp=meshGrp, heavy=True)
+
 
 class DirTemporalField(TemporalField):
     """Implementation of TemporalField which stored all data in local files"""
@@ -87,39 +152,58 @@ class DirTemporalField(TemporalField):
         loc = field.toHdf5_split_files(fieldPrefix=f'{self.dir}/field/', meshPrefix=f'{self.dir}/mesh/', flat=True, heavy=True)
         return loc
 
-class SingleFileTemporalField(TemporalField,HeavyDataBase):
-    def __init__(self,*a,**kw):
-        TemporalField.__init__(self,*a,**kw)
-        HeavyDataBase.__init__(self,*a,**kw)
-        self._cache={} # hack
-    def _loc_to_h5_groups(self,loc):
+
+class SingleFileTemporalField(TemporalField, HeavyDataBase):
+    """
+    Implementation of TemporalField storing all data in one HDF5 file. Fields on the same mesh are stored as time series (see :obj:`mupif.field.Field.appendToHdf5Group`) in group ``series/<mesh digest>``: values of all steps are stacked in one dataset, times are in the ``times`` dataset. Meshes are stored once, in ``meshes/<mesh digest>``, and shared by fields loaded from the file (through the mesh registry, see :obj:`mupif.mesh.registerMesh`).
+
+    Files with one group per field (``fields/<field digest>``, written by older versions) can be read as well.
+    """
+    def __init__(self, *a, **kw):
+        TemporalField.__init__(self, *a, **kw)
+        HeavyDataBase.__init__(self, *a, **kw)
+        self._resetIndex()  # hack
+
+    def _loc_to_h5_groups(self, loc):
+        self._ensureData()
+        return (self._h5obj[loc["field"]], self._h5obj[loc["mesh"]])
+
+    def _field_make_from_loc(self, loc):
         self._ensureData()
-        return (self._h5obj[loc["field"]],self._h5obj[loc["mesh"]])
-    def _field_save_return_loc(self,field):
+        # mesh is resolved through the link in the field group
+        return Field.makeFromHdf5_groups(fieldGrp=self._h5obj[loc['field']], heavy=True, step=loc.get('step', None))
+
+    def _field_save_return_loc(self, field):
         import h5py
-        if not isinstance(field.getMesh(),UnstructuredMesh): raise RuntimeError('Field\'s mesh must be an UnstructuredMesh (not a {field.getMesh().__class__.__module__}.{field.getMesh().__class__.__name__}')
-        mLoc='meshes/'+field.getMesh().dataDigest()
-        fLoc='fields/'+field.dataDigest()
+        if not isinstance(field.getMesh(), UnstructuredMesh): raise RuntimeError(f'Field\'s mesh must be an UnstructuredMesh (not a {field.getMesh().__class__.__module__}.{field.getMesh().__class__.__name__}')
+        digest = field.getMesh().dataDigest()
+        mLoc, fLoc = 'meshes/'+digest, 'series/'+digest
         if mLoc not in self._h5obj:
             # store as HeavyUnstructredMesh
-            HeavyUnstructuredMesh.fromMeshioMesh_static(self._h5obj.create_group(mLoc),field.getMesh().toMeshioMesh())
-        mg=self._h5obj[mLoc]
-        fg=self._h5obj.create_group(fLoc)
-        loc=field.toHdf5Group(fg,meshLink=h5py.SoftLink(mg.name))
-        return {'field':fLoc,'mesh':mLoc}
+            HeavyUnstructuredMesh.fromMeshioMesh_static(self._h5obj.create_group(mLoc), field.getMesh().toMeshioMesh())
+        mg = self._h5obj[mLoc]
+        fg = self._h5obj.require_group(fLoc)
+        step = field.appendToHdf5Group(fg, meshLink=h5py.SoftLink(mg.name))
+        return {'field': fg.name, 'mesh': mg.name, 'step': step}
 
     # this is not useful over Pyro (the Proxy defines its own context manager) but handy for local testing
     def __enter__(self):
         self.openData(mode=self.mode)
         return self
     def __exit__(self, exc_type, exc_value, traceback): self.closeData()
-    def openData(self,mode=typing.Optional[HeavyDataBase.ModeChoice]):
+    def openData(self, mode=typing.Optional[HeavyDataBase.ModeChoice]):
         self.openStorage(mode=mode)
+        self._resetIndex()
+        if 'series' in self._h5obj:
+            for grp in self._h5obj['series'].values():
+                mLoc = grp.get('mesh', getlink=True).path
+                times = grp['times']
+                for step, t in enumerate(times[:]):
+                    self._insertMetadata({'time': Quantity(value=t, unit=times.attrs['unit']), 'loc': {'field': grp.name, 'mesh': mLoc, 'step': step}, 'user': {}})
         if 'fields' in self._h5obj:
-            for f in self._h5obj['fields']:
-                grp=self._h5obj['fields'][f]
-                print(f'{grp.name=}')
-                self.fieldMeta.append({'time':pickle.loads(grp.attrs['time'].tobytes()),'loc':{'field':grp.name,'mesh':grp.name+'/mesh'}})
+            for grp in self._h5obj['fields'].values():
+                self._insertMetadata({'time': pickle.loads(grp.attrs['time'].tobytes()), 'loc': {'field': grp.name, 'mesh': grp.name+'/mesh'}, 'user': {}})
+
     def writeXdmf(self,xdmf=None,timeUnit=au.s):
         self._ensureData()
         from pathlib import Path
@@ -154,7 +238,14 @@ class SingleFileTemporalField(TemporalField,HeavyDataBase):
                             center={FieldType.FT_vertexBased:'Node',FieldType.FT_cellBased:'Cell'}[f.fieldType]
                             dim=' '.join([str(i) for i in f.value.shape])
                             with Tag(f'<Attribute Name="{f.getFieldIDName()}" AttributeType="{attType}" Center="{center}">','</Attribute>',out) as tag:
-                                tag.writeLn(f'<DataItem DataType="Float" Dimensions="{dim}" Format="HDF" Precision="8">{h5}:{f.quantity.dataset.name}</DataItem>')
+                                ds=f.quantity.dataset
+                                if getattr(f.quantity,'step',None) is None:
+                                    tag.writeLn(f'<DataItem DataType="Float" Dimensions="{dim}" Format="HDF" Precision="8">{h5}:{ds.name}</DataItem>')
+                                else:
+                                    # one step of the stacked series: select hyperslab (start, stride, count)
+                                    with Tag(f'<DataItem ItemType="HyperSlab" Dimensions="{dim}">','</DataItem>',out) as tag2:
+                                        tag2.writeLn(f'<DataItem Dimensions="3 {ds.ndim}" Format="XML">{f.quantity.step} {" ".join(["0"]*(ds.ndim-1))} {" ".join(["1"]*ds.ndim)} 1 {dim}</DataItem>')
+                                        tag2.writeLn(f'<DataItem DataType="Float" Dimensions="{" ".join([str(i) for i in ds.shape])}" Format="HDF" Precision="8">{h5}:{ds.name}</DataItem>')
         out.close()
         return xdmf
 
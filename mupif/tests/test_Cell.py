@@ -13,6 +13,19 @@ def assert_g2l_equal(case,a,b,msg=None):
 
 def mkVertex(number,label,coords): return vertex.Vertex(number=number,label=label,coords=coords)
 
+def check_array_kernels(case,c,points,nParam):
+    'Compare array kernels of the cell class with per-cell methods'
+    klass=c.__class__
+    vc=np.array([v.getCoordinates() for v in c.getVertices()])
+    vcs=np.broadcast_to(vc,(len(points),)+vc.shape)
+    inside,lc=klass.glob2locArray(vcs,np.array(points))
+    for p,i,l in zip(points,inside,lc):
+        case.assertEqual(bool(c.containsPoint(p)),bool(i))
+        if not i: continue
+        numpy.testing.assert_allclose(klass.loc2globArray(vc[np.newaxis],l[np.newaxis])[0],np.array(p)[:vc.shape[1]],atol=1e-8)
+        numpy.testing.assert_allclose(c.getTransformationJacobian(l[:nParam] if nParam==2 else l),klass.getTransformationJacobianArray(vc[np.newaxis],l[np.newaxis])[0])
+    assert_array_equal(klass.containsPointArray(vcs,np.array(points)),inside)
+
 class Triangle_2d_lin_TestCase(unittest.TestCase):
     def setUp(self):
         self.mesh = mesh.UnstructuredMesh()
@@ -61,6 +74,14 @@ class Triangle_2d_lin_TestCase(unittest.TestCase):
         self.assertAlmostEqual(N[1], 0.5, delta=1.e-5)
         self.assertAlmostEqual(N[2], 0.0, delta=1.e-5)
 
+    def test_arrayKernels(self):
+        check_array_kernels(self,self.cell,[(0.1,0.),(0.,0.2),(0.,5.1),(1.,1.),(3.,3.)],2)
+    def test_arrayKernelsDegenerate(self):
+        # collinear vertices in the middle of the batch: contains nothing, other cells are not affected
+        vc=np.array([[(0.,0.),(2.,0.),(0.,5.)],[(0.,0.),(1.,1.),(2.,2.)],[(0.,0.),(2.,0.),(0.,5.)]])
+        with np.errstate(all='raise'): inside,lc=cell.Triangle_2d_lin.glob2locArray(vc,np.array([(.5,.5),(1.,1.),(.5,.5)]))
+        assert_array_equal(inside,[True,False,True])
+        numpy.testing.assert_allclose(lc[2],lc[0])
 
 
 class Triangle_2d_quad_TestCase(unittest.TestCase):
@@ -121,6 +142,17 @@ class Triangle_2d_quad_TestCase(unittest.TestCase):
         self.assertAlmostEqual(N[4], 4. * l2 * l3, delta=1.e-5)
         self.assertAlmostEqual(N[5], 4. * l3 * l1, delta=1.e-5)
         
+
+    def test_arrayKernels(self):
+        check_array_kernels(self,self.cell,[(0.1,0.),(0.,0.2),(0.,5.1),(1.,1.),(3.,3.)],2)
+    def test_arrayKernelsDegenerate(self):
+        # collinear vertices in the middle of the batch: contains nothing, other cells are not affected
+        vc=np.array([[(0.,0.),(2.,0.),(0.,5.)],[(0.,0.),(1.,1.),(2.,2.)],[(0.,0.),(2.,0.),(0.,5.)]])
+        with np.errstate(all='raise'): inside,lc=cell.Triangle_2d_lin.glob2locArray(vc,np.array([(.5,.5),(1.,1.),(.5,.5)]))
+        assert_array_equal(inside,[True,False,True])
+        numpy.testing.assert_allclose(lc[2],lc[0])
+
+
 class Quad_2d_lin_TestCase(unittest.TestCase):
     def setUp(self):
         self.mesh=mesh.UnstructuredMesh()
@@ -175,6 +207,11 @@ class Quad_2d_lin_TestCase(unittest.TestCase):
         self.assertEqual(self.cell.getTransformationJacobian((1.0,-1.0)),5.0)
         self.assertEqual(self.cell.getTransformationJacobian((-1., 0.)),2.25)
         
+
+    def test_arrayKernels(self):
+        check_array_kernels(self,self.cell,[(0.1,0.),(1.,1.),(2.,2.),(3.,4.),(-1.,1.)],2)
+
+
 class Tetrahedron_3d_lin_TestCase(unittest.TestCase):
     def setUp(self):
         self.mesh=mesh.UnstructuredMesh()
@@ -257,7 +294,14 @@ class Tetrahedron_3d_lin_TestCase(unittest.TestCase):
         self.assertEqual(self.cell2.getTransformationJacobian((1.0,0.0,0.0,0.0)),-48)
         self.assertEqual(self.cell.getTransformationJacobian((1.0,0.0,0.0,0.0)),70)
 
-
+    def test_arrayKernels(self):
+        check_array_kernels(self,self.cell,[(1.,1.,1.),(2.,1.5,2.),(2.,3.5,3.),(3.,0.,0.),(-1.,0.,0.)],3)
+    def test_arrayKernelsDegenerate(self):
+        # flat tetrahedron (all vertices in z=0) does not make the whole batch fail
+        vc=np.array([[(0.,0.,0.),(0.,2.,0.),(4.,0.,0.),(0.,0.,6.)],[(0.,0.,0.),(0.,2.,0.),(4.,0.,0.),(1.,1.,0.)]])
+        inside,lc=cell.Tetrahedron_3d_lin.glob2locArray(vc,np.array([(.5,.5,.5),(.5,.5,0.)]))
+        assert_array_equal(inside,[True,False])
+        numpy.testing.assert_allclose(cell.Tetrahedron_3d_lin.loc2globArray(vc[:1],lc[:1])[0],(.5,.5,.5))
 
 
 class Brick_3d_lin_TestCase(unittest.TestCase):
@@ -342,5 +386,9 @@ class Brick_3d_lin_TestCase(unittest.TestCase):
         print(self.cell.getTransformationJacobian((-1.0, 1.0, 1.0)))
         self.assertEqual(self.cell.getTransformationJacobian((-1.0, 1.0, 1.0)), 30.0/8.0)
 
+    def test_arrayKernels(self):
+        check_array_kernels(self,self.cell,[(1.,1.,-1.),(4.9,2.9,-.1),(5.,3.,0.),(6.,1.,-1.),(1.,1.,1.)],3)
+
+
 # python test_Cell.py for stand-alone test being run
 if __name__=='__main__': unittest.main()
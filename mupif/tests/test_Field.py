@@ -135,6 +135,53 @@ class Field_TestCase(unittest.TestCase):
         np.testing.assert_array_equal(self.f1.evaluate((1000, 2500, 0)*au.mm).getValue(), (93.5,))
         self.assertRaises(au.UnitConversionError, lambda: self.f1.evaluate((1, 2, 3)*au.s))
 
+    def test_evaluate_batch(self):
+        # batch evaluation must give the same results as point-by-point evaluation
+        pts = np.array([(1., 2.5, 0.), (3., 1., 0.), (1., 4., 0.), (1.5, 5., 0.), (.1, .1, 0.)])
+        np.testing.assert_allclose(self.f1.evaluate(pts).getValue(), [self.f1.evaluate(p).getValue() for p in pts])
+        np.testing.assert_allclose(self.f1.evaluate([tuple(p) for p in pts]).getValue(), [self.f1.evaluate(p).getValue() for p in pts])
+        pts = np.array([(2., 2., 2.), (1.5, 1.5, 1.5), (3., 4., 1.9), (1., 1., 1.)])
+        np.testing.assert_allclose(self.f6.evaluate(pts).getValue(), [self.f6.evaluate(p).getValue() for p in pts])
+        # cell-based field: point on the shared face gets the average
+        np.testing.assert_allclose(self.f7.evaluate(pts).getValue(), [(2,), (2,), (16,), (2,)])
+        np.testing.assert_allclose(self.f7.evaluate(np.array([(5/3, 8/3, 7/3), (1., 1., 1.)])).getValue(), [(9,), (2,)])
+        self.assertRaises(ValueError, lambda: self.f1.evaluate(np.array([(1., 1., 0.), (100., 100., 0.)])))
+
+    def test_evaluateBatchModified(self):
+        pts = np.array([(2., 2., 2.), (1.5, 1.5, 1.5), (1., 1., 1.)])
+        before = self.f6.evaluate(pts).getValue()
+        # moving a vertex makes the cached geometry stale
+        self.mesh4.getVertex(0).coords = (0., 0., -1.)
+        after = self.f6.evaluate(pts).getValue()
+        self.assertFalse(np.allclose(before, after))
+        np.testing.assert_allclose(after, [self.f6.evaluate(p).getValue() for p in pts])
+        # reference value from linear interpolation on the modified tetrahedron
+        vc = np.array([self.mesh4.getVertex(i).coords for i in range(4)])
+        lc = np.linalg.solve(np.vstack((np.ones(4), vc.T)), np.array([1., 1., 1., 1.]))
+        np.testing.assert_allclose(after[2], [np.dot(lc, [0, 12, 39, 33])])
+
+    def test_transferOperator(self):
+        pts = np.array([(2., 2., 2.), (1.5, 1.5, 1.5), (3., 4., 1.9), (1., 1., 1.)])
+        op = mupif.TransferOperator.make(mesh=self.mesh4, points=pts)
+        self.assertEqual(op.getNumberOfPoints(), 4)
+        self.assertTrue(op.isValidFor(self.mesh4))
+        np.testing.assert_allclose(op.evaluate(self.f6).getValue(), self.f6.evaluate(pts).getValue())
+        # new values, same operator
+        np.testing.assert_allclose(op.apply(2*self.f6.value), 2*self.f6.evaluate(pts).getValue())
+        # cell-based field rebuilds the operator
+        np.testing.assert_allclose(op.evaluate(self.f7).getValue(), [(2,), (2,), (16,), (2,)])
+        self.assertEqual(op.fieldType, FieldType.FT_cellBased)
+        # serialization keeps the matrix
+        op2 = mupif.TransferOperator.from_dict(op.to_dict())
+        np.testing.assert_allclose(op2.apply(self.f7.value), [(2,), (2,), (16,), (2,)])
+        # mesh modification invalidates the operator
+        self.mesh4.getVertex(0).coords = (0., 0., -1.)
+        self.assertFalse(op.isValidFor(self.mesh4))
+        op = mupif.TransferOperator.make(mesh=self.mesh4, points=pts)
+        self.assertTrue(op.isValidFor(self.mesh4))
+        self.mesh4.getCell(0).vertices = tuple(reversed(self.mesh4.getCell(0).vertices))
+        self.assertFalse(op.isValidFor(self.mesh4))
+
     def test_getVertexValue(self):
         self.assertEqual(self.f1.getVertexValue(0).getValue(), (0,))
         self.assertEqual(self.f1.getVertexValue(1).getValue(), (12,))
@@ -191,6 +238,53 @@ class Field_TestCase(unittest.TestCase):
         res = self.f1.makeFromHdf5(fileName=f)[0]
         self._compareFields(self.f1, res)
 
+    def test_hdf5Group(self):
+        import h5py
+        with h5py.File(self.tmp+'/grp.hdf5', 'w') as h5:
+            self.f6.toHdf5Group(h5.create_group('plain'))
+            self.f7.toHdf5Group(h5.create_group('gzip'), compression='gzip', compression_opts=4, shuffle=True)
+            self.assertIsNone(h5['plain/vertex_values'].chunks)
+            self.assertEqual(h5['gzip/cell_values'].compression, 'gzip')
+            np.testing.assert_array_equal(h5['plain/vertex_values'], self.f6.value)
+            np.testing.assert_array_equal(h5['gzip/cell_values'], self.f7.value)
+            # time series: values and times are converted to units of the first step
+            grp = h5.create_group('series')
+            self.assertEqual(self.f6.appendToHdf5Group(grp), 0)
+            f6mm = field.Field(mesh=self.mesh4, fieldID=DataID.FID_Displacement, valueType=ValueType.Scalar, time=20000*mupif.U.ms, quantity=(2000*self.f6.value)*mupif.U.mm, fieldType=FieldType.FT_vertexBased)
+            self.assertEqual(f6mm.appendToHdf5Group(grp), 1)
+            self.assertEqual(grp['vertex_series'].shape, (2, 5, 1))
+            np.testing.assert_array_equal(grp['times'], [16, 20])
+            self.assertRaises(ValueError, lambda: self.f7.appendToHdf5Group(grp))
+            self.f4.appendToHdf5Group(h5.create_group('other'))
+            self.assertRaises(ValueError, lambda: self.f1.appendToHdf5Group(h5['other']))
+            self.mesh4.toHdf5Group(h5.create_group('mesh4'))
+            last = field.Field.makeFromHdf5_groups(fieldGrp=grp, meshGrp=h5['mesh4'], step=-1)
+            self.assertEqual(last.getTime(), 20*mupif.U.s)
+            self.assertEqual(last.getUnit(), mupif.U.m)
+            np.testing.assert_allclose(last.value, 2*self.f6.value)
+            self.assertRaises(ValueError, lambda: field.Field.makeFromHdf5_groups(fieldGrp=grp, meshGrp=h5['mesh4']))
+
+    def test_heavy(self):
+        'HDF5-backed field is accessed through the block cache'
+        f = self.tmp+'/heavy.hdf5'
+        self.f6.toHdf5(fileName=f)
+        self.f7.toHdf5(fileName=f)
+        res, res7 = field.Field.makeFromHdf5(fileName=f, heavy=True, h5own=True)
+        self.assertIsInstance(res.quantity, mupif.Hdf5RefQuantity)
+        self._compareFields(self.f6, res)
+        pts = np.array([(2., 2., 2.), (1.5, 1.5, 1.5), (3., 4., 1.9), (1., 1., 1.)])
+        np.testing.assert_allclose(res.evaluate(pts).getValue(), self.f6.evaluate(pts).getValue())
+        np.testing.assert_allclose(res7.evaluate(pts).getValue(), self.f7.evaluate(pts).getValue())
+        blocks = list(res.iterRecordBlocks(blockSize=2))
+        self.assertEqual([i0 for i0, b in blocks], [0, 2, 4])
+        np.testing.assert_array_equal(np.concatenate([b for i0, b in blocks]), self.f6.value)
+        self.assertEqual([i0 for i0, b in self.f6.iterRecordBlocks(blockSize=3)], [0, 3])
+        # merge reads the heavy field block-wise (vertex labels are not stored in HDF5, use the original mesh)
+        res.mesh = self.mesh4
+        self.f5.merge(res)
+        m = self.f5.getMesh()
+        np.testing.assert_array_equal([self.f5.value[m.vertexLabel2Number(l)] for l in range(5)], self.f6.value)
+
     @unittest.skipIf(meshio is None, 'meshio not importable')
     def test_ioMeshio(self):
         m = self.f1.toMeshioMesh()
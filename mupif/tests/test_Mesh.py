@@ -15,6 +15,8 @@ def mkCell(mesh,number,label,vertices): return cell.Cell(mesh=mesh,number=number
 
 try: import vtk
 except ImportError: vtk=None
+try: import pyvtk
+except ImportError: pyvtk=None
 
 class UniformRectilinearMesh(unittest.TestCase):
     def setUp(self):
@@ -126,6 +128,28 @@ class Mesh_TestCase(unittest.TestCase):
         self.assertEqual(self.mesh3.getCell(2).getVertices()[0].label, 16)
         self.assertEqual(self.mesh3.getCell(2).getVertices()[1].label, 5)
 
+    def test_modified(self):
+        loc3,loc5,digest5=self.mesh3.getCellLocalizer(),self.mesh5.getCellLocalizer(),self.mesh5.dataDigest()
+        # modifying vertex or cell invalidates cached data of its mesh only
+        self.mesh3.getVertex(0).coords=(1.,0.)
+        self.assertIsNot(self.mesh3.getCellLocalizer(),loc3)
+        self.assertIs(self.mesh5.getCellLocalizer(),loc5)
+        loc3=self.mesh3.getCellLocalizer()
+        self.mesh3.getCell(0).vertices=(0,2,1)
+        self.assertIsNot(self.mesh3.getCellLocalizer(),loc3)
+        # merge modifies the receiver only
+        self.mesh3.merge(self.mesh5)
+        self.assertIs(self.mesh5.getCellLocalizer(),loc5)
+        # the copy is independent of the original
+        m5=self.mesh5.copy()
+        m5.getVertex(0).coords=(0.,0.,0.)
+        m5.getCell(0).vertices=(0,2,1)
+        self.assertIs(self.mesh5.getCellLocalizer(),loc5)
+        self.assertNotEqual(m5.dataDigest(),digest5)
+        self.assertEqual(self.mesh5.dataDigest(),digest5)
+        # coordinates cannot be modified in-place
+        with self.assertRaises(ValueError): self.mesh5.getVertex(0).coords[0]=1.
+
     @unittest.skipIf(vtk is None,'vtk not importable')
     def test_asVtkUnstructuredGrid(self):
         # @todo: not working with mesh1 because points have only two coordinates
@@ -147,5 +171,94 @@ class Mesh_TestCase(unittest.TestCase):
         #import pyvtk
         #self.assertTrue(isinstance(self.res,pyvtk.DataSet.DataSet),'error in getVTKRepresentation')
 
+class CompactUnstructuredMesh_TestCase(unittest.TestCase):
+    def setUp(self):
+        self.um = mesh.UnstructuredMesh()
+        self.um.setup([mkVertex(0,0,(0.,0.,0.)), mkVertex(1,1,(2.,0.,0.)), mkVertex(2,2,(0.,2.,0.)), mkVertex(3,3,(2.,2.,0.)), mkVertex(4,4,(0.,0.,2.))], [cell.Triangle_2d_lin(mesh=self.um,number=0,label=None,vertices=(0,1,2)), cell.Quad_2d_lin(mesh=self.um,number=1,label=None,vertices=(1,3,2,0)), cell.Tetrahedron_3d_lin(mesh=self.um,number=2,label=None,vertices=(0,1,2,4))])
+        self.cm = mp.CompactUnstructuredMesh.makeFromMesh(self.um)
+    def test_basic(self):
+        self.assertEqual(self.cm.getNumberOfVertices(),5)
+        self.assertEqual(self.cm.getNumberOfCells(),3)
+        assert_array_equal(self.cm.cellOffsets,[0,3,7,11])
+        c=self.cm.getCell(1)
+        self.assertTrue(isinstance(c,cell.Quad_2d_lin))
+        self.assertEqual(c.vertices,(1,3,2,0))
+        assert_array_equal(self.cm.getVertex(4).getCoordinates(),(0.,0.,2.))
+        assert_array_equal(self.cm.getCells()[1],self.um.getCells()[1])
+        self.assertEqual(self.cm.dataDigest(),self.um.dataDigest())
+        self.assertEqual(self.cm.cellLabel2Number(2),2)
+        self.assertRaises(ValueError,lambda: mp.CompactUnstructuredMesh(vertexCoords=self.cm.vertexCoords,cellTypes=self.cm.cellTypes,cellOffsets=[0,3],cellConnectivity=self.cm.cellConnectivity))
+    def test_cellBBoxes(self):
+        bb=self.cm.getCellBBoxes()
+        self.assertEqual(bb.shape,(3,2,3))
+        for i in range(3):
+            b0=self.um.getCell(i).getBBox()
+            np.testing.assert_allclose(bb[i],[b0.coords_ll,b0.coords_ur])
+
+    def test_dataDigest(self):
+        d0=self.cm.dataDigest()
+        self.assertTrue(self.cm.dataDigest() is d0)
+        # arrays are read-only, caller's arrays are not frozen
+        self.assertRaises(ValueError,lambda: self.cm.vertexCoords.__setitem__((0,0),1.))
+        vc=self.cm.vertexCoords.copy(); vc[0,0]=1.
+        self.cm.vertexCoords=vc
+        self.assertTrue(vc.flags.writeable)
+        self.assertNotEqual(self.cm.dataDigest(),d0)
+        self.assertEqual(self.cm.dataDigest(),mp.CompactUnstructuredMesh.makeFromArrays(vertexCoords=vc,cellTypes=self.cm.cellTypes,cellConnectivity=self.um.getCells()[1]).dataDigest())
+    def test_merge(self):
+        # second mesh sharing vertices 1,2 and cell 0 (by labels) with the first one
+        m2=mp.CompactUnstructuredMesh(vertexCoords=[(2.,0.,0.),(0.,2.,0.),(2.,0.,2.)],vertexLabels=[1,2,10],cellTypes=[cellgeometrytype.CGT_TRIANGLE_1,cellgeometrytype.CGT_TRIANGLE_1],cellOffsets=[0,3,6],cellConnectivity=[0,1,2,2,1,0],cellLabels=[0,7])
+        d0=self.cm.dataDigest()
+        self.cm.merge(m2)
+        self.assertNotEqual(self.cm.dataDigest(),d0)
+        self.assertEqual(self.cm.getNumberOfVertices(),6)
+        self.assertEqual(self.cm.getNumberOfCells(),4)
+        assert_array_equal(self.cm.vertexLabels,[0,1,2,3,4,10])
+        assert_array_equal(self.cm.cellLabels,[0,1,2,7])
+        self.assertEqual(self.cm.getCell(3).vertices,(5,2,1))
+        assert_array_equal(self.cm.getVertex(5).getCoordinates(),(2.,0.,2.))
+        # same result as merging object-based meshes
+        um2=mesh.UnstructuredMesh()
+        um2.setup([mkVertex(i,l,tuple(c)) for i,(l,c) in enumerate(zip(m2.vertexLabels,m2.vertexCoords))],[cell.Triangle_2d_lin(mesh=um2,number=i,label=l,vertices=tuple(c)) for i,(l,c) in enumerate(zip(m2.cellLabels,m2.getCells()[1]))])
+        um=mesh.UnstructuredMesh()
+        um.setup([mkVertex(i,i,tuple(c)) for i,c in enumerate(self.um.getVertices())],[self.um.getCell(i).copy() for i in range(3)])
+        for i in range(3): um.getCell(i).mesh=um; um.getCell(i).label=i
+        um.merge(um2)
+        self.assertEqual(self.cm.dataDigest(),um.dataDigest())
+        # merging a mesh with itself does nothing
+        d1=self.cm.dataDigest()
+        self.cm.merge(self.cm.copy())
+        self.assertEqual(self.cm.dataDigest(),d1)
+    @unittest.skipIf(pyvtk is None,'pyvtk not importable')
+    def test_getVTKRepresentation(self):
+        g=self.cm.getVTKRepresentation()
+        self.assertEqual((len(g.triangle),len(g.quad),len(g.tetra)),(1,1,1))
+        self.assertEqual(tuple(g.quad[0]),(1,3,2,0))
+    def test_meshio(self):
+        pp,cc=self.cm.toMeshioPointsCells()
+        self.assertEqual(dict((t,len(c)) for t,c in cc),{'triangle':1,'quad':1,'tetra':1})
+        m2=mp.CompactUnstructuredMesh.makeFromMeshioPointsCells(pp,meshio.Mesh(pp,cc).cells)
+        self.assertEqual(m2.getNumberOfCells(),3)
+    def test_serialize(self):
+        d=self.cm.to_dict()
+        self.assertTrue(isinstance(d['vertexCoords']['npy'],bytes))
+        m2=mp.CompactUnstructuredMesh.from_dict(d)
+        self.assertEqual(m2.dataDigest(),self.cm.dataDigest())
+        import pickle
+        m3=pickle.loads(pickle.dumps(self.cm))
+        self.assertEqual(m3.dataDigest(),self.cm.dataDigest())
+    def test_hdf5(self):
+        import h5py, tempfile
+        with tempfile.TemporaryDirectory() as tmp:
+            with h5py.File(tmp+'/mesh.h5','w') as h5:
+                grp=self.cm.asHdf5Object(parentgroup=h5)
+                m2=mp.Mesh.makeFromHdf5group(grp)
+                self.assertTrue(isinstance(m2,mp.CompactUnstructuredMesh))
+                self.assertEqual(m2.dataDigest(),self.cm.dataDigest())
+    def test_evaluate(self):
+        f=field.Field(mesh=self.cm,fieldID=DataID.FID_Displacement,valueType=ValueType.Scalar,unit=mp.U.m,time=0*mp.U.s,value=[(0.,),(2.,),(4.,),(6.,),(8.,)],fieldType=field.FieldType.FT_vertexBased)
+        self.assertAlmostEqual(f.evaluate((0.5,0.5,1.)).getValue()[0],5.5)
+        assert_array_equal(np.round(f.evaluate([(0.5,0.5,1.),(0.5,0.5,.5)]).getValue()[:,0],10),[5.5,3.5])
+
 # python test_Mesh.py for stand-alone test being run
 if __name__=='__main__': unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+import numpy as np
+from numpy.testing import assert_array_equal
+from mupif import *
+
+
+class Octree_TestCase(unittest.TestCase):
+    def test_octreeBulk(self):
+        # many random boxes so that the tree is refined several times
+        rng=np.random.default_rng(0)
+        lo=rng.random((3000,3)); bb=np.stack((lo,lo+.05*rng.random((3000,3))),axis=1)
+        o1,o2=octree.Octree((0.,0.,0.),1.1,(1,1,1)),octree.Octree((0.,0.,0.),1.1,(1,1,1))
+        for i in range(bb.shape[0]): o1.insert(i,bbox.BBox(tuple(bb[i,0]),tuple(bb[i,1])))
+        o2.insertArray(np.arange(bb.shape[0]),bb)
+        self.assertFalse(o2.root.isTerminal())
+        # flattened and reconstructed tree (o1 stores items in lists, o2 in arrays)
+        o4=octree.Octree.fromArrays(o1.toArrays())
+        for q in rng.random((50,3)):
+            qb=bbox.BBox(tuple(q),tuple(q+.03))
+            self.assertEqual(o1.getItemsInBBox(qb),o2.getItemsInBBox(qb))
+            self.assertEqual(o1.getItemsInBBox(qb),o4.getItemsInBBox(qb))
+        # batched queries
+        qlo=rng.random((50,3)); qhi=qlo+.03
+        for o in o1,o2:
+            off,ids=o.queryBoxes(qlo,qhi)
+            self.assertEqual(off.shape,(51,))
+            for i in range(50):
+                self.assertEqual(ids[off[i]:off[i+1]].tolist(),sorted(o1.getItemsInBBox(bbox.BBox(tuple(qlo[i]),tuple(qhi[i])))))
+        off,ids=o2.getItemsContainingPoints([(5.,5.,5.),tuple(bb[7,0])])
+        assert_array_equal(off[:2],[0,0])
+        self.assertTrue(7 in ids)
+        # 2d octree with refinement
+        o3=octree.Octree((0.,0.),1.1,(1,1))
+        o3.insertArray(np.arange(bb.shape[0]),bb[:,:,:2])
+        self.assertEqual(o3.getItemsInBBox(bbox.BBox((.5,.5),(.5,.5))),set(np.flatnonzero(np.all((bb[:,0,:2]<=.5)&(bb[:,1,:2]>=.5),axis=1)).tolist()))
+
+
+if __name__ == '__main__':
+    unittest.main()
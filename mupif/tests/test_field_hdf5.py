@@ -85,3 +85,59 @@ class TestFieldHdf5(unittest.TestCase):
         test_values_f0(ff2[0])
         ff2[0].mesh.writeXDMF(fields=ff2)
 
+
+    def test_meshRegistry(self):
+        C=self.__class__
+        import h5py, gc
+        def mkMesh():
+            m=mp.UnstructuredMesh()
+            m.setup([mp.Vertex(number=i,label=None,coords=c) for i,c in enumerate([(0.,0.,0.),(1.,0.,0.),(0.,1.,0.)])],[mp.Triangle_2d_lin(mesh=m,number=0,label=None,vertices=(0,1,2))])
+            return m
+        ff=[mp.Field(mesh=mkMesh(),fieldID=mp.DataID.FID_Temperature,valueType=mp.ValueType.Scalar,quantity=[(i,),(i+1,),(i+2,)]*mp.U.K,fieldType=mp.FieldType.FT_vertexBased,time=i*mp.U.s) for i in range(3)]
+        for f in ff: f.toHdf5(fileName=C.tmp+'/reg.h5',groupName='/')
+        # identical meshes stored once
+        with h5py.File(C.tmp+'/reg.h5','r') as h5: self.assertEqual(len(h5['meshes']),1)
+        del ff
+        gc.collect()
+        # nothing is alive, meshes are read from the file and shared by all fields
+        ff2=mp.Field.makeFromHdf5(fileName=C.tmp+'/reg.h5',group='/')
+        self.assertEqual(len(set(id(f.getMesh()) for f in ff2)),1)
+        # subsequent reads return the same instance
+        ff3=mp.Field.makeFromHdf5(fileName=C.tmp+'/reg.h5',group='/',indices=[2])
+        self.assertIs(ff3[0].getMesh(),ff2[0].getMesh())
+        # the mesh is shared (as documented in registerMesh), modifications are seen by all fields using it
+        m=ff2[0].getMesh()
+        m.getVertex(0).coords=(-1.,0.,0.)
+        self.assertEqual(tuple(ff2[1].getMesh().getVertex(0).coords),(-1.,0.,0.))
+        # modified mesh is not returned
+        ff4=mp.Field.makeFromHdf5(fileName=C.tmp+'/reg.h5',group='/',indices=[1])
+        self.assertIsNot(ff4[0].getMesh(),m)
+        self.assertEqual(tuple(ff4[0].getMesh().getVertex(0).coords),(0.,0.,0.))
+        # copy is independent
+        m2=ff4[0].getMesh().copy()
+        m2.getVertex(0).coords=(-2.,0.,0.)
+        self.assertEqual(tuple(ff4[0].getMesh().getVertex(0).coords),(0.,0.,0.))
+        self.assertIs(m2.getCell(0).getVertices()[0],m2.getVertex(0))
+        # registry only holds weak references
+        del ff2,ff3,ff4,m,m2
+        gc.collect()
+        self.assertEqual(len(mp.mesh._meshRegistry),0)
+
+    def test_recordSizeMismatch(self):
+        C=self.__class__
+        m=mp.UnstructuredMesh()
+        m.setup([mp.Vertex(number=i,label=None,coords=c) for i,c in enumerate([(0.,0.,0.),(1.,0.,0.),(0.,1.,0.)])],[mp.Triangle_2d_lin(mesh=m,number=0,label=None,vertices=(0,1,2))])
+        # vector values must have 3 components
+        f=mp.Field(mesh=m,fieldID=mp.DataID.FID_Displacement,valueType=mp.ValueType.Vector,quantity=[(0.,1.),(2.,3.),(4.,5.)]*mp.U.m,fieldType=mp.FieldType.FT_vertexBased,time=0*mp.U.s)
+        with self.assertRaisesRegex(ValueError,'2 components.*requires 3'):
+            f.toHdf5(fileName=C.tmp+'/mismatch.h5',groupName='/')
+
+    def test_recordCountMismatch(self):
+        C=self.__class__
+        m=mp.UnstructuredMesh()
+        m.setup([mp.Vertex(number=i,label=None,coords=c) for i,c in enumerate([(0.,0.,0.),(1.,0.,0.),(0.,1.,0.)])],[mp.Triangle_2d_lin(mesh=m,number=0,label=None,vertices=(0,1,2))])
+        # one record per vertex is required, missing records are not padded with zeros
+        for val in ([(0.,),(12.,)],[(0.,),(12.,),(1.,),(2.,)]):
+            f=mp.Field(mesh=m,fieldID=mp.DataID.FID_Temperature,valueType=mp.ValueType.Scalar,quantity=val*mp.U.K,fieldType=mp.FieldType.FT_vertexBased,time=0*mp.U.s)
+            with self.assertRaisesRegex(ValueError,f'{len(val)} records.*3 vertices'):
+                f.toHdf5(fileName=C.tmp+'/count.h5',groupName='/')
@@ -9,6 +9,7 @@ import threading
 import time
 import Pyro5.api
 import json
+import types
 import time, random
 import tempfile
 import logging
@@ -106,6 +107,61 @@ class Hdf5Quantity_TestCase(unittest.TestCase):
         self.assertEqual(hq.value.shape,(1,3))
         self.assertTrue((np.array(hq.value[:])==33).all())
 
+    def test_06_blockCache(self):
+        hq=mp.Hdf5OwningRefQuantity(mode='create')
+        hq.allocateDataset(shape=(1000,3),dtype='f8',unit='m',chunks=(100,3))
+        data=np.arange(3000.).reshape(1000,3)
+        hq.value[:]=data
+        # 4 blocks of 100 rows fit into the cache
+        hq.cacheBytes=4*100*3*8
+        c=hq.getBlockCache()
+        self.assertEqual((c.blockRows,c.maxBlocks),(100,4))
+        self.assertEqual(hq.value[150][1],data[150][1])
+        self.assertEqual(list(hq.value[-1]),list(data[-1]))
+        self.assertEqual(c.misses,2)
+        numpy.testing.assert_array_equal(hq.value[120:180],data[120:180])
+        numpy.testing.assert_array_equal(hq.value[[999,5,105,5]],data[[999,5,105,5]])
+        numpy.testing.assert_array_equal(hq.value[10:990:7,1],data[10:990:7,1])
+        self.assertLessEqual(len(c.blocks),4)
+        self.assertFalse(hq.value[150].flags.writeable)
+        # writes invalidate cached blocks
+        hq.value[150]=(-1,-2,-3)
+        self.assertEqual(list(hq.value[150]),[-1,-2,-3])
+        self.assertAlmostEqual(hq.quantity[150][2].value,-3)
+        # streaming bypasses the cache
+        misses=c.misses
+        blocks=list(hq.iterBlocks(blockRows=300))
+        self.assertEqual([i0 for i0,b in blocks],[0,300,600,900])
+        self.assertEqual(sum(len(b) for i0,b in blocks),1000)
+        self.assertEqual(c.misses,misses)
+        # re-opening creates a new cache
+        hq.reopenData()
+        self.assertIsNot(hq.getBlockCache(),c)
+
+    def test_07_steps(self):
+        # stacked series of 1d steps
+        hq=mp.Hdf5OwningRefQuantity(mode='create')
+        hq.allocateDataset(shape=(4,5),dtype='f8',unit='m')
+        data=np.arange(20.).reshape(4,5)
+        hq.value[:]=data
+        rq=mp.Hdf5RefQuantity(dataset=hq.dataset,step=2)
+        self.assertEqual(rq.shape,(5,))
+        for v in rq.value,rq.quantity: self.assertEqual(len(v),5)
+        numpy.testing.assert_array_equal(rq.value[:],data[2])
+        self.assertEqual(rq.value[-1],data[2,-1])
+        self.assertEqual(rq.quantity[1],data[2,1]*mp.U.m)
+        rq.value[1]=-1
+        self.assertEqual(hq.dataset[2,1],-1)
+        self.assertEqual(hq.dataset[1,1],data[1,1])
+        # stacked series of scalars
+        hq=mp.Hdf5OwningRefQuantity(mode='create')
+        hq.allocateDataset(shape=(4,),dtype='f8',unit='m')
+        hq.value[:]=data[:,0]
+        rq=mp.Hdf5RefQuantity(dataset=hq.dataset,step=3)
+        self.assertEqual(rq.shape,())
+        self.assertEqual(rq.value,data[3,0])
+        self.assertEqual(rq.quantity,data[3,0]*mp.U.m)
+
 
     def test_10_transfer(self):
         C=self.__class__
@@ -344,6 +400,58 @@ class HeavyStruct_TestCase(unittest.TestCase):
 
         # inject mismatched schema
         self.assertRaises(ValueError,lambda:mols3.inject(mols[0].getAtoms()))
+    def test_08_streaming_copy(self):
+        # atom schema version with different unit of position
+        dd=json.loads(sampleSchemas_json)
+        atom=[d for d in dd if d['_schema']['name']=='org.mupif.sample.atom'][0]
+        atom['_schema']['version']='1.1'
+        atom['properties']['topology']['position']['unit']='nm'
+        schemas2=json.dumps(dd)
+        elements=['H','N','Fe','Cl','Na','H','C']
+        with mp.HeavyStruct(schemaName='org.mupif.sample.molecule',schemasJson=sampleSchemas_json,mode='create-memory',slabCacheRows=3) as mols:
+            mols.resize(2)
+            (atoms:=mols[0].getAtoms()).resize(7)
+            atoms.writeColumns({'identity.element':elements,'properties.topology.position':np.arange(21).reshape(7,3)*u.AA,'properties.topology.structure':[np.arange(i) for i in range(7)]})
+            # dump is generated lazily and can be consumed as such
+            self.assertIsInstance(gen:=mols.iterDump(),types.GeneratorType)
+            self.assertIsInstance(next(gen)['atoms'],types.GeneratorType)
+            with mp.HeavyStruct(schemaName='org.mupif.sample.molecule',schemasJson=sampleSchemas_json,mode='create-memory',slabCacheRows=3) as mols2:
+                mols2.from_dump(mols.iterDump())
+                self.assertEqual(str(mols.to_dump()),str(mols2.to_dump()))
+            # direct copy, converting units
+            with mp.HeavyStruct(schemaName='org.mupif.sample.molecule',schemasJson=schemas2,mode='create-memory',slabCacheRows=3) as mols3:
+                mols3.inject(mols)
+                self.assertEqual(len(mols3),2)
+                a3=mols3[0].getAtoms()
+                cols=a3.readColumns(['identity.element','properties.topology.position','properties.topology.structure'])
+                self.assertEqual(list(cols['identity.element']),elements)
+                self.assertEqual(cols['properties.topology.position'].unit,u.nm)
+                numpy.testing.assert_allclose(cols['properties.topology.position'].value,.1*np.arange(21).reshape(7,3))
+                self.assertEqual([len(s) for s in cols['properties.topology.structure']],list(range(7)))
+                self.assertEqual(len(mols3[1].getAtoms()),0)
+                # single row
+                a3[6].inject(atoms[1])
+                self.assertEqual(a3[6].getIdentity().getElement(),'N')
+                self.assertAlmostEqual(a3[6].getProperties().getTopology().getPosition()[0].to_value(u.AA),3)
+    def test_08_inject_cached(self):
+        def make(el):
+            grains=mp.HeavyStruct(mode='create-memory',schemaName='org.mupif.sample.grain',schemasJson=sampleSchemas_json).openData(mode='create-memory')
+            grains.resize(2)
+            for g in grains:
+                g.getMolecules().resize(1)
+                (atoms:=g.getMolecules()[0].getAtoms()).resize(2)
+                atoms[0].getIdentity().setElement(el)
+            return grains
+        a,b=make('Fe'),make('Cl')
+        # read through getters, so that rows are cached
+        el=lambda g: g.getMolecules()[0].getAtoms()[0].getIdentity().getElement()
+        self.assertEqual([el(g) for g in a],['Fe','Fe'])
+        a.inject(b)
+        self.assertEqual([el(g) for g in a],['Cl','Cl'])
+        self.assertEqual(a[0].to_dump()['molecules'][0]['atoms'][0]['identity.element'][0],b'Cl')
+        b[1].getMolecules()[0].getAtoms()[0].getIdentity().setElement('Na')
+        a[0].inject(b[1])
+        self.assertEqual([el(g) for g in a],['Na','Cl'])
     def test_09_schema_storage(self):
         C=self.__class__
         with (hs:=mp.HeavyStruct(h5path=C.h5path,h5group='test',mode='readonly')) as grains:
@@ -457,6 +565,71 @@ class HeavyStruct_TestCase(unittest.TestCase):
         handle.closeData()
         # so check that here; note however that the handle does *not* unregister itself
         for i in ids[1:]: self.assertRaises(Pyro5.errors.DaemonError,lambda i=i: C.daemon.proxyFor(i))
+    def test_26_remote_batch(self):
+        C=self.__class__
+        handle=mp.HeavyStruct(h5path=C.h5path,h5group='test',mode='readonly')
+        proxy=Pyro5.api.Proxy(C.daemon.register(handle))
+        try:
+            root=proxy.openData(mode='readonly')
+            nObjs=len(C.daemon.objectsById)
+            # atoms of all molecules of the first grain, in one call, without registering any contexts
+            packed=root.readPacked(['identity.element','properties.topology.position'],start=0,stop=1,sub=['molecules','atoms'])
+            self.assertEqual(len(C.daemon.objectsById),nObjs)
+            self.assertEqual((packed['start'],packed['stop']),(0,1))
+            with mp.HeavyStruct(h5path=C.h5path,h5group='test',mode='readonly') as grains:
+                mols=grains[0].getMolecules()
+                self.assertEqual(len(packed['rows'][0]['rows']),len(mols))
+                for m,p in zip(mols,packed['rows'][0]['rows']):
+                    cols=mp.heavystruct.unpackColumns(p['columns'])
+                    self.assertEqual(list(cols['identity.element']),[a.getIdentity().getElement() for a in m.getAtoms()])
+                    self.assertEqual(cols['properties.topology.position'].unit,u.AA)
+                    self.assertEqual(cols['properties.topology.position'].value.tolist(),[a.getProperties().getTopology().getPosition().value.tolist() for a in m.getAtoms()])
+            proxy.closeData()
+        except Exception:
+            sys.stderr.write(''.join(Pyro5.errors.get_pyro_traceback()))
+            raise
+        finally: C.daemon.unregister(handle)
+        # packed columns can be written back
+        with mp.HeavyStruct(mode='create-memory',schemaName='org.mupif.sample.grain',schemasJson=sampleSchemas_json) as grains:
+            grains.resize(1)
+            mols=grains[0].getMolecules()
+            mols.resize(2)
+            atoms=mols[0].getAtoms()
+            atoms.resize(3)
+            atoms.writePacked(mp.heavystruct.packColumns({'identity.element':['H','N','Fe'],'properties.topology.velocity':np.ones((3,3))*u.m/u.s,'properties.topology.structure':[np.arange(i) for i in range(3)]}))
+            cols=mp.heavystruct.unpackColumns(mols.readPacked(sub='atoms')['rows'][0]['columns'])
+            self.assertEqual(list(cols['identity.element']),['H','N','Fe'])
+            self.assertEqual(cols['properties.topology.velocity'].to(u.km/u.s).value.tolist(),[[1e-3]*3]*3)
+            self.assertEqual([len(s) for s in cols['properties.topology.structure']],[0,1,2])
+            self.assertIsNone(mols.readPacked(sub='atoms')['rows'][1])
+    def test_27_daemon_contexts_limit(self):
+        C=self.__class__
+        h5path=C.tmp+'/contexts.h5'
+        with mp.HeavyStruct(h5path=h5path,mode='create',schemaName='org.mupif.sample.grain',schemasJson=sampleSchemas_json) as grains:
+            grains.resize(1)
+            grains[0].getMolecules().resize(6)
+        handle=mp.HeavyStruct(h5path=h5path,mode='readonly',pyroContextsMax=4)
+        C.daemon.register(handle)
+        grains=handle.openData(mode='readonly')
+        # equal contexts are registered only once
+        g0=grains[0]
+        self.assertIs(grains[0],g0)
+        mols=g0.getMolecules()
+        m0=mols[0]
+        for m in mols: m.getIdentity()
+        # least recently used contexts were unregistered, those the last one was obtained from are kept
+        self.assertEqual(len(grains.ctx.pyroContexts.contexts),4)
+        self.assertFalse(hasattr(m0,'_pyroDaemon'))
+        self.assertRaises(Pyro5.errors.DaemonError,lambda: C.daemon.proxyFor(m0))
+        self.assertIs(g0.getMolecules(),mols)
+        # explicit release
+        molsId=mols._pyroId
+        mols.release()
+        self.assertNotIn(molsId,handle.pyroIds)
+        self.assertRaises(Pyro5.errors.DaemonError,lambda: C.daemon.proxyFor(molsId))
+        handle.closeData()
+        self.assertRaises(Pyro5.errors.DaemonError,lambda: C.daemon.proxyFor(g0))
+        C.daemon.unregister(handle)
     def test_30_deepcopy(self):
         C=self.__class__
         hsLoc=mp.HeavyStruct(h5path=C.h5path,h5group='test',mode='readonly')
@@ -589,6 +762,120 @@ class HeavyStruct_TestCase(unittest.TestCase):
             self.assertEqual(grp.schema_fragment['prop2']['mapsto'],'foo2')
 
 
+    def test_34_columns(self):
+        with mp.HeavyStruct(mode='create-memory',schemaName='org.mupif.sample.atom',schemasJson=sampleSchemas_json) as atoms:
+            N=100
+            atoms.resize(N)
+            elements=[['H','N','Cl','Na','Fe'][i%5] for i in range(N)]
+            pos=np.arange(3*N).reshape(N,3)*u.nm
+            structs=[np.arange(i%7) for i in range(N)]
+            atoms.writeColumns({'identity.element':elements,'properties.topology.position':pos,'properties.topology.structure':structs})
+            # read-only and unknown attributes
+            self.assertRaises(AttributeError,lambda: atoms.writeColumns({'identity.atomicNumber':N*[1]}))
+            self.assertRaises(KeyError,lambda: atoms.readColumns(['identity.foo']))
+            # rows must exist
+            self.assertRaises(IndexError,lambda: atoms.writeColumns({'identity.element':elements},start=1))
+            cols=atoms.readColumns(['identity.element','identity.atomicMass','properties.topology.position','properties.topology.structure'],start=10,stop=20)
+            self.assertEqual(list(cols['identity.element']),elements[10:20])
+            self.assertEqual(cols['identity.atomicMass'].unit,u.Unit('Dalton'))
+            self.assertTrue(np.allclose(cols['identity.atomicMass'].value,[a.getIdentity().getAtomicMass().value for a in atoms][10:20]))
+            self.assertTrue(np.allclose(cols['properties.topology.position'],pos[10:20]))
+            for s0,s1 in zip(cols['properties.topology.structure'],structs[10:20]): self.assertEqual(list(s0),list(s1))
+            # consistent with per-row getters
+            self.assertEqual(atoms[13].getProperties().getTopology().getPosition()[2],pos[13][2])
+            # raw rows
+            rows=atoms.readRows(5,8)
+            self.assertEqual(len(rows),3)
+            self.assertEqual(rows['identity.element'][0],b'H')
+            atoms.writeRows(rows,start=0)
+            self.assertEqual(atoms[0].getIdentity().getElement(),'H')
+            # buffered per-row writes
+            # small cache, so that modified slabs are evicted
+            atoms.ctx.slabCache.maxSlabs=2
+            with atoms.bufferedWrites(slabRows=16):
+                for i,a in enumerate(atoms):
+                    a.getIdentity().setElement('C')
+                    a.getProperties().getTopology().setVelocity((i,0,0)*u.Unit('AA/ps'))
+                    a.getProperties().getTopology().setStructure([i])
+                    # buffered values are visible
+                    self.assertEqual(a.getIdentity().getElement(),'C')
+                self.assertEqual(atoms.readColumns(['identity.atomicNumber'])['identity.atomicNumber'].tolist(),N*[6])
+            cols=atoms.readColumns(['identity.element','properties.topology.velocity','properties.topology.structure'])
+            self.assertEqual(set(cols['identity.element']),{'C'})
+            self.assertEqual(cols['properties.topology.velocity'][:,0].value.tolist(),list(range(N)))
+            self.assertEqual([list(s) for s in cols['properties.topology.structure']],[[i] for i in range(N)])
+        with mp.HeavyStruct(mode='create-memory',schemaName='org.mupif.sample.grain',schemasJson=sampleSchemas_json) as grains:
+            grains.resize(3)
+            grains.writeColumns({'properties.symmetry':['axial','none','periodic']})
+            self.assertEqual(grains[2].getProperties().getSymmetry(),'periodic')
+            self.assertEqual(list(grains.readColumns(['properties.symmetry'])['properties.symmetry']),['axial','none','periodic'])
+
+
+    def test_35_slabCache(self):
+        with mp.HeavyStruct(mode='create-memory',schemaName='org.mupif.sample.grain',schemasJson=sampleSchemas_json,slabCacheRows=8) as grains:
+            grains.resize(2)
+            mols=grains[0].getMolecules()
+            mols.resize(20)
+            for i,m in enumerate(mols): m.getIdentity().setMolecularWeight(i*u.Unit('Dalton'))
+            cache=mols.ctx.slabCache
+            # read through the cache: slabs of 8 rows
+            cache.slabs.clear()
+            self.assertEqual([m.getIdentity().getMolecularWeight().value for m in mols],list(range(20)))
+            self.assertEqual(len(cache.slabs),3)
+            # another context (sharing the cache) sees values written through the first one, and vice versa
+            mols2=grains[0].getMolecules()
+            mols[3].getIdentity().setMolecularWeight(100*u.Unit('Dalton'))
+            self.assertEqual(mols2[3].getIdentity().getMolecularWeight().value,100)
+            mols2[4].getTopology().setCenterOfMass((1,2,3)*u.Unit('AA'))
+            self.assertEqual(mols[4].getTopology().getCenterOfMass().value.tolist(),[1,2,3])
+            self.assertEqual(mols.readColumns(['topology.centerOfMass'],start=4,stop=5)['topology.centerOfMass'].value.tolist(),[[1,2,3]])
+            # bulk write invalidates cached rows
+            mols2.writeColumns({'identity.molecularWeight':[7]*20*u.Unit('Dalton')})
+            self.assertEqual(mols[3].getIdentity().getMolecularWeight().value,7)
+            # resize through another context (which did not open the dataset yet) invalidates as well
+            grains[0].getMolecules().resize(20,reset=True)
+            self.assertTrue(np.isnan(mols[3].getIdentity().getMolecularWeight().value))
+            # nested subgroups are resolved once
+            self.assertIs(mols[1].getAtoms().ctx.h5group,mols[1].getAtoms().ctx.h5group)
+
+
+    def test_36_schemaRegistryCache(self):
+        dd=json.loads(sampleSchemas_json)
+        reg1,reg2=mp.heavystruct.makeSchemaRegistry(dd),mp.heavystruct.makeSchemaRegistry(json.loads(sampleSchemas_json))
+        # identical schemas give identical (shared) context types
+        for name,T in reg1.items(): self.assertIs(T,reg2[name])
+        # uncached cooking creates new types
+        reg3=mp.heavystruct.makeSchemaRegistry(dd,cache=False)
+        self.assertIsNot(reg3['org.mupif.sample.grain'],reg1['org.mupif.sample.grain'])
+        # modified schema is cooked anew
+        dd[0]['_schema']['version']='9.9'
+        self.assertIsNot(mp.heavystruct.makeSchemaRegistry(dd)[dd[0]['_schema']['name']],reg1[dd[0]['_schema']['name']])
+        # documentation is assembled on access
+        T=reg1['org.mupif.sample.grain']
+        self.assertTrue(T.__doc__.startswith('**schema org.mupif.sample.grain**'))
+        self.assertIs(T.__doc__,T.__doc__)
+        # files opened repeatedly share context types
+        with mp.HeavyStruct(mode='create-memory',schemaName='org.mupif.sample.grain',schemasJson=sampleSchemas_json) as g1, mp.HeavyStruct(mode='create-memory',schemaName='org.mupif.sample.grain',schemasJson=sampleSchemas_json) as g2:
+            self.assertIs(type(g1),type(g2))
+
+    def test_35_slabCacheDeleted(self):
+        for rows in (256,0):
+            with mp.HeavyStruct(mode='create-memory',schemaName='org.mupif.sample.molecule',schemasJson=sampleSchemas_json,slabCacheRows=rows) as mols:
+                mols.resize(3)
+                (atoms:=mols[2].getAtoms()).resize(2)
+                atoms[0].getIdentity().setElement('Fe')
+                self.assertEqual(atoms[0].getIdentity().getElement(),'Fe')
+                # nested data of row 2 are deleted and created anew: cached rows must not be seen
+                mols.resize(1)
+                mols.resize(3)
+                (atoms:=mols[2].getAtoms()).resize(2)
+                self.assertEqual(atoms[0].getIdentity().getElement(),'')
+                # with the cache disabled, setters write directly
+                atoms[1].getIdentity().setElement('Cl')
+                atoms[1].getProperties().getTopology().setStructure(np.array([1,2,3],dtype='l'))
+                self.assertEqual(atoms[1].getIdentity().getElement(),'Cl')
+                self.assertEqual(atoms[1].getProperties().getTopology().getStructure().tolist(),[1,2,3])
+
 
     def test_40_mupifObject(self):
         # this schema defines "someSchema" object type, with two entries
@@ -660,6 +947,7 @@ class HeavyMesh_TestCase(unittest.TestCase):
         evalAt=(.1,.1,.1)
         with mp.HeavyUnstructuredMesh(h5path=h5path,mode='overwrite') as mesh:
             mesh.fromMeshioMesh(cls.box)
+            numpy.testing.assert_array_equal(mesh.getCells()[1],cls.box.cells[0].data)
             fieldP=mesh.makeHeavyField(unit='Pa',fieldID=mp.DataID.FID_Pressure,fieldType=mp.FieldType.FT_cellBased,valueType=mp.ValueType.Scalar)
             fieldUVW=mesh.makeHeavyField(unit='m/s',fieldID=mp.DataID.FID_Velocity,fieldType=mp.FieldType.FT_cellBased,valueType=mp.ValueType.Vector)
             fieldP.value[:]=np.linspace(0,1,mesh.getNumberOfCells())
@@ -671,3 +959,46 @@ class HeavyMesh_TestCase(unittest.TestCase):
         self.assertEqual(val0,val1)
         mesh.closeData()
 
+    def test_localizerPersist(self):
+        cls=self.__class__
+        h5path=f'{cls.tmp}/02-mesh.h5'
+        qbox=mp.BBox((.05,.05,.05),(.12,.12,.12))
+        with mp.HeavyUnstructuredMesh(h5path=h5path,mode='overwrite') as mesh:
+            mesh.fromMeshioMesh(cls.box)
+            items0=mesh.getCellLocalizer().getItemsInBBox(qbox)
+            self.assertTrue(mp.HeavyUnstructuredMesh.GRP_CELL_LOCALIZER in mesh._h5grp)
+            self.assertEqual(mesh._h5grp[mesh.GRP_CELL_LOCALIZER].attrs['dataDigest'],mesh.dataDigest())
+        mesh,fields=mp.HeavyUnstructuredMesh.load(h5path)
+        # the octree is loaded, not rebuilt; the stored digest is used, the mesh is not hashed again
+        import unittest.mock
+        with unittest.mock.patch.object(mp.HeavyUnstructuredMesh,'getCellBBoxes',side_effect=RuntimeError('octree rebuilt')), unittest.mock.patch.object(mp.util,'sha1digest',side_effect=RuntimeError('mesh hashed')):
+            self.assertEqual(mesh.getCellLocalizer().getItemsInBBox(qbox),items0)
+        mesh.closeData()
+        with mp.HeavyUnstructuredMesh(h5path=h5path,mode='readwrite') as mesh:
+            mesh.getCellLocalizer()
+            mesh.appendVertices(np.array([[5.,5.,5.]]))
+            self.assertFalse(mp.HeavyUnstructuredMesh.GRP_CELL_LOCALIZER in mesh._h5grp)
+            self.assertFalse('dataDigest' in mesh._h5grp.attrs)
+            self.assertEqual(mesh._cellOctree,None)
+
+    def test_registryRecreated(self):
+        'Registered mesh is not returned for a file deleted and created again under the same path'
+        import h5py
+        cls=self.__class__
+        h5path=f'{cls.tmp}/03-mesh.h5'
+        def mkMesh(x):
+            with mp.HeavyUnstructuredMesh(h5path=h5path,mode='overwrite') as mesh:
+                mesh.appendVertices(np.array([[0.,0.,0.],[x,0.,0.],[0.,1.,0.]]))
+                mesh.appendCells([mp.cellgeometrytype.CGT_TRIANGLE_1],[(0,1,2)])
+        mkMesh(2.)
+        with h5py.File(h5path,'r') as h5: m1=mp.Mesh.makeFromHdf5group(h5['/'])
+        with h5py.File(h5path,'r') as h5: self.assertIs(mp.Mesh.makeFromHdf5group(h5['/']),m1)
+        os.remove(h5path)
+        mkMesh(4.)
+        with h5py.File(h5path,'r') as h5: m2=mp.Mesh.makeFromHdf5group(h5['/'])
+        self.assertIsNot(m2,m1)
+        self.assertEqual(tuple(m2.getVertex(1).coords),(4.,0.,0.))
+        # closed mesh is not returned
+        m2.closeData()
+        with h5py.File(h5path,'r') as h5: self.assertIsNot(mp.Mesh.makeFromHdf5group(h5['/']),m2)
+        m1.closeData()
@@ -197,6 +197,87 @@ class ModelServer_TestCase(unittest.TestCase):
         self.assertTrue('THIS-IS-STDOUT' in dta)
         self.assertTrue('THIS-IS-STDERR' in dta)
 
+    def test_pool(self):
+        cls=self.__class__
+        jobManPool=mp.ModelServer(ns=cls.ns,appName='appPool',workDir=cls.tmp,appClass=StdOutErrModel,maxJobs=2,poolSize=1)
+        uri=cls.daemon.register(jobManPool)
+        jobManPool.registerPyro(daemon=cls.daemon,ns=cls.ns,uri=uri,appName=jobManPool.appName,exclusiveDaemon=False)
+        try:
+            for i in range(2):
+                # worker is started in the background
+                for j in range(50):
+                    if jobManPool.pool: break
+                    time.sleep(.1)
+                self.assertEqual(len(jobManPool.pool),1)
+                worker=jobManPool.pool[0][0]
+                (retCode,jobId,port)=jobManPool.allocateJob(user='user')
+                self.assertEqual(retCode,mp.jobmanager.JOBMAN_OK)
+                stat=jobManPool.getStatus()
+                self.assertEqual(stat[-1].key,jobId)
+                # job runs in the pre-started worker, the pool is replenished
+                self.assertIs(jobManPool.activeJobs[jobId].proc,worker)
+                mod=Pyro5.api.Proxy(stat[-1].uri)
+                mod.solveStep()
+                mod.terminate()
+                jobManPool.terminateJob(jobId)
+                jobManPool.getStatus()
+                mp.PyroFile.copy(jobManPool.getLogFile(jobId),log2:=f'{cls.tmp}/jobPool{i}.log')
+                self.assertTrue('THIS-IS-STDOUT' in open(log2,'r').read())
+        finally:
+            jobManPool.terminate(force=True)
+        self.assertEqual(len(jobManPool.pool),0)
+
+    def test_poolSpawnUnlocked(self):
+        'Pool lock is not held while a pre-started worker is being spawned'
+        import threading, unittest.mock
+        cls=self.__class__
+        popen,started,proceed=subprocess.Popen,threading.Event(),threading.Event()
+        def slowPopen(*a,**kw):
+            started.set()
+            proceed.wait(10)
+            return popen(*a,**kw)
+        with unittest.mock.patch.object(mp.modelserver.subprocess,'Popen',slowPopen):
+            jobManPool=mp.ModelServer(ns=cls.ns,appName='appPoolSlow',workDir=cls.tmp,appClass=StdOutErrModel,maxJobs=2,poolSize=1)
+            try:
+                self.assertTrue(started.wait(10))
+                self.assertTrue(jobManPool.poolLock.acquire(timeout=1))
+                jobManPool.poolLock.release()
+                # no worker is ready yet, and no second one is started
+                self.assertEqual(jobManPool._takeFromPool(None),(None,None))
+                proceed.set()
+                for j in range(50):
+                    if jobManPool.pool: break
+                    time.sleep(.1)
+                self.assertEqual(len(jobManPool.pool),1)
+            finally:
+                proceed.set()
+                jobManPool.terminate(force=True)
+        self.assertEqual(len(jobManPool.pool),0)
+
+    @unittest.skipUnless(os.path.isdir('/proc/self/fd'),'/proc/self/fd not available')
+    def test_terminateClosesFds(self):
+        'Terminated server stops the child monitor, which closes its file descriptors'
+        cls=self.__class__
+        nFds=len(os.listdir('/proc/self/fd'))
+        jobMan2=mp.ModelServer(ns=cls.ns,appName='appFds',workDir=cls.tmp,appClass=StdOutErrModel,maxJobs=1)
+        (retCode,jobId,port)=jobMan2.allocateJob(user='user')
+        self.assertEqual(retCode,mp.jobmanager.JOBMAN_OK)
+        jobMan2.terminate(force=True)
+        jobMan2._childMonitorThread.join(5)
+        self.assertFalse(jobMan2._childMonitorThread.is_alive())
+        self.assertEqual(len(os.listdir('/proc/self/fd')),nFds)
+
+    def test_jobExit(self):
+        'Exited job frees its slot immediately'
+        (retCode,jobId,port)=self.jobMan.allocateJob(user='user')
+        self.assertEqual(len(self.jobMan.getStatus()),1)
+        self.jobMan.activeJobs[jobId].proc.kill()
+        for i in range(20):
+            if not self.jobMan.getStatus(): break
+            time.sleep(.1)
+        self.assertEqual(self.jobMan.getStatus(),[])
+        self.assertIn(jobId,self.jobMan.doneJobs)
+
     def test_timeout(self):
         cls=self.__class__
         jobManTime=mp.ModelServer(ns=cls.ns,appName='appTimeout',workDir=cls.tmp,appClass=TimeoutModel,maxJobs=1)
@@ -6,6 +6,7 @@ import multiprocessing
 import threading
 import time
 import Pyro5.api
+import Pyro5.nameserver
 import json
 import time, random
 import tempfile
@@ -131,6 +132,47 @@ class PyroFile_TestCase(unittest.TestCase):
         mp.PyroFile.copy(srcP,ddstP[3],compress=False)
         for i in range(4):
             self.assertEqual(C.Adata,open(aa[i],'rb').read())
+    def test_pyroFile_copy_pipelined(self):
+        'Copy with several chunks in flight'
+        C=self.__class__
+        aa=[f'{C.tmp}/A2{i}' for i in range(4)]
+        srcP=Pyro5.api.Proxy(C.daemon.register(mp.PyroFile(filename=C.A,mode='rb')))
+        ddstP=[Pyro5.api.Proxy(C.daemon.register(mp.PyroFile(filename=a,mode='wb'))) for a in aa[:2]]
+        mp.PyroFile.copy(srcP,ddstP[0],inFlight=4,chunkSize=64) # remote to remote, zlib
+        mp.PyroFile.copy(C.A,ddstP[1],inFlight=3,chunkSize=100,codec='zlib-fast') # upload
+        mp.PyroFile.copy(srcP,aa[2],inFlight=2,chunkSize=999,compress=False) # download, last chunk is 1 byte
+        mp.PyroFile.copy(mp.PyroFile(filename=C.A,mode='rb'),aa[3],inFlight=1,chunkSize=2000) # local, single chunk
+        for i in range(4):
+            self.assertEqual(C.Adata,open(aa[i],'rb').read())
+        self.assertRaises(ValueError,lambda: mp.PyroFile.copy(srcP,aa[0],inFlight=2,codec='foo'))
+    def test_pyroFile_resume(self):
+        'Resumed and verified transfer'
+        C=self.__class__
+        a=C.tmp+'/A30'
+        srcP=Pyro5.api.Proxy(C.daemon.register(mp.PyroFile(filename=C.A,mode='rb')))
+        self.assertEqual(srcP.getDigest(),mp.util.sha1digest([C.Adata]))
+        self.assertEqual(srcP.getChunkDigests(400),[mp.util.sha1digest([C.Adata[i:i+400]]) for i in (0,400,800)])
+        # partial file, with the second chunk corrupted (and the last one incomplete)
+        open(a,'wb').write(C.Adata[:100]+b'x'*100+C.Adata[200:450])
+        self.assertEqual(mp.PyroFile.resume(srcP,a,chunkSize=100,inFlight=2),100+100+500)
+        self.assertEqual(C.Adata,open(a,'rb').read())
+        # nothing to transfer; longer destination is truncated
+        open(a,'ab').write(b'garbage')
+        self.assertEqual(mp.PyroFile.resume(srcP,a,chunkSize=100),0)
+        self.assertEqual(C.Adata,open(a,'rb').read())
+        # interrupted transfer is resumed
+        os.remove(a)
+        setChunkAt,calls=mp.PyroFile.setChunkAt,[]
+        def failOnce(self,offset,buffer,codec=None):
+            calls.append(offset)
+            if len(calls)==5: raise Pyro5.errors.ConnectionClosedError('simulated')
+            return setChunkAt(self,offset,buffer,codec)
+        from unittest import mock
+        with mock.patch.object(mp.PyroFile,'setChunkAt',failOnce):
+            mp.PyroFile.resume(srcP,a,chunkSize=100,inFlight=1,retries=1)
+        self.assertEqual(C.Adata,open(a,'rb').read())
+        # 4 chunks written before failure are not transferred again
+        self.assertEqual(len(calls),11)
     def test_pyroFile_basename(self):
         'PyroFile.getBasename()'
         C=self.__class__
@@ -151,6 +193,11 @@ class PyroFile_TestCase(unittest.TestCase):
         self.assertEqual(type(pfp.getDataID()),mp.DataID)
 
 
+class WireProbe(object):
+    'Reports, when serialized, whether arrays would be sent as binary buffers'
+Pyro5.api.register_class_to_dict(WireProbe,lambda obj: {'__class__':'WireProbe','binary':mp.baredata.wireBinaryArrays()})
+Pyro5.api.register_dict_to_class('WireProbe',lambda name,d: d['binary'])
+
 class PydanticTestClass(pydantic.BaseModel):
     name: int
 
@@ -165,6 +212,15 @@ class PyroTestClass(object):
         return mp.String(value='foobar',dataID=mp.DataID.ID_None)
     def getPyroProxyAsReturnValue(self,uri):
         return Pyro5.api.Proxy(uri)
+    def wireBinaryArrays(self):
+        # in the method body, and when serializing the response
+        return mp.baredata.wireBinaryArrays(),WireProbe()
+    def annotate(self):
+        Pyro5.callcontext.current_context.response_annotations['XTRA']=b'1'
+    def echo(self,obj):
+        return obj
+    def getApplicationSignature(self):
+        return 'PyroTestClass'
 
 
 
@@ -200,3 +256,197 @@ class MupifObject_TestCase(unittest.TestCase):
         pro2=pro1.getPyroProxyAsReturnValue(uri)
         self.assertEqual(pro2.strValue().getValue(),'foobar')
 
+
+
+class WireArrays_TestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.daemon=mp.pyroutil.getDaemon()
+    def tearDown(self):
+        mp.baredata.wireArrays.update(binary=True,compressMin=None)
+    def _prop(self):
+        return mp.ConstantProperty(value=np.linspace(0,1,1000),unit='m',propID=mp.DataID.ID_None)
+    def test_encoding(self):
+        'Binary encoding of array attributes when negotiated'
+        prop=self._prop()
+        self.assertEqual(prop.to_dict()['quantity']['value']['__class__'],'numpy.ndarray')
+        self.assertIn('arr',prop.to_dict()['quantity']['value'])
+        mp.baredata._wire.peerBinary=True
+        try:
+            d=prop.to_dict()
+            self.assertIn('npy',d['quantity']['value'])
+            mp.baredata.wireArrays.update(compressMin=0)
+            dz=prop.to_dict()
+        finally: mp.baredata._wire.peerBinary=None
+        self.assertEqual(dz['quantity']['value']['codec'],'zlib')
+        for dd in d,dz:
+            p2=mp.BareData.from_dict(dd)
+            self.assertTrue(np.array_equal(p2.getValue(),prop.getValue()))
+    def test_negotiated(self):
+        'Binary array transport negotiated between peers'
+        pro=Pyro5.api.Proxy(self.__class__.daemon.register(PyroTestClass()))
+        self.assertEqual(tuple(pro.wireBinaryArrays()),(False,True))
+        # daemon announced support already in the connect handshake
+        self.assertTrue(pro.__dict__['_mupifWireBinary'])
+        # other response annotations are kept, the announcement is not
+        pro.annotate()
+        self.assertEqual(Pyro5.callcontext.current_context.response_annotations,{'XTRA':b'1'})
+        prop=self._prop()
+        self.assertTrue(np.array_equal(pro.echo(prop).getValue(),prop.getValue()))
+        mp.baredata.wireArrays.update(compressMin=0)
+        self.assertTrue(np.array_equal(pro.echo(prop).getValue(),prop.getValue()))
+    def test_fallback(self):
+        'Peers not announcing binary support get nested lists'
+        pro=Pyro5.api.Proxy(self.__class__.daemon.register(PyroTestClass()))
+        mp.baredata.wireArrays.update(binary=False)
+        self.assertEqual(tuple(pro.wireBinaryArrays()),(False,False))
+        prop=self._prop()
+        self.assertTrue(np.array_equal(pro.echo(prop).getValue(),prop.getValue()))
+
+
+@Pyro5.api.expose
+class OldLogReceiver(object):
+    'Receiver without handleRecords'
+    def __init__(self): self.recs=[]
+    def handleRecord(self,recPickle):
+        import pickle, serpent
+        self.recs.append(pickle.loads(serpent.tobytes(recPickle) if isinstance(recPickle,dict) else recPickle))
+
+
+class PyroLog_TestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.daemon=mp.pyroutil.getDaemon()
+    def _logger(self,handler,name):
+        log=logging.getLogger(name)
+        log.propagate=False
+        log.setLevel(logging.DEBUG)
+        log.addHandler(handler)
+        return log
+    def test_batched(self):
+        'Records are sent in batches by background thread'
+        tail=mp.pyrolog.TailLogHandler(capacity=100)
+        rx=mp.pyrolog.PyroLogReceiver(tailHandler=tail)
+        rx.log=self._logger(tail,'test_batched_rx')
+        h=mp.pyrolog.PyroLogHandler(uri=str(self.__class__.daemon.register(rx)),batchSize=10)
+        log=self._logger(h,'test_batched')
+        for i in range(50): log.info('message %d',i)
+        try: 1/0
+        except ZeroDivisionError: log.exception('failed')
+        h.flush()
+        self.assertEqual(h.counters['sent'],51)
+        self.assertEqual(tail.tail(2,raw=False)[0],'message 49')
+        self.assertIn('ZeroDivisionError',tail.tail(1)[0])
+        h.close()
+        log.info('after close')
+        self.assertEqual(h.counters['sent'],51)
+    def test_backpressure(self):
+        'Records are sampled and dropped when the queue is full'
+        rx=OldLogReceiver()
+        from unittest import mock
+        # don't start the sending thread yet, so that the queue fills up
+        with mock.patch.object(threading.Thread,'start'):
+            h=mp.pyrolog.PyroLogHandler(uri=str(self.__class__.daemon.register(rx)),capacity=10,sampleEvery=2)
+        log=self._logger(h,'test_backpressure')
+        for i in range(6): log.debug('regular %d',i)
+        # over half full: only every other record below WARNING is queued
+        for i in range(6): log.debug('sampled %d',i)
+        for i in range(3): log.warning('dropped %d',i)
+        h.thread.start()
+        self.assertEqual(h.counters['sampled'],3)
+        self.assertEqual(h.counters['dropped'],2)
+        h.close()
+        self.assertEqual(h.counters['sent'],10+2)
+        # old receiver got records one-by-one, including notification about the overload
+        self.assertIn('dropped (queue overloaded)',rx.recs[-1].getMessage())
+    def test_countersThreaded(self):
+        'Counters are updated consistently from concurrent threads'
+        rx=OldLogReceiver()
+        from unittest import mock
+        with mock.patch.object(threading.Thread,'start'):
+            h=mp.pyrolog.PyroLogHandler(uri=str(self.__class__.daemon.register(rx)),capacity=1)
+        rec=logging.makeLogRecord(dict(name='test_countersThreaded',levelno=logging.WARNING,levelname='WARNING',msg='dropped'))
+        h.emit(rec)
+        # emit directly, bypassing the handler lock taken by logging
+        tt=[threading.Thread(target=lambda: [h.emit(rec) for i in range(2000)]) for t in range(8)]
+        for t in tt: t.start()
+        # the sending thread updates counters meanwhile
+        for i in range(2000): h._count('dropped')
+        for t in tt: t.join()
+        self.assertEqual(h.counters['dropped'],8*2000+2000)
+        h.thread.start()
+        h.close()
+
+
+@Pyro5.api.expose
+class CountingNameServer(Pyro5.nameserver.NameServer):
+    def __init__(self):
+        super().__init__()
+        self.numLookups=0
+    def lookup(self,*args,**kw):
+        self.numLookups+=1
+        return super().lookup(*args,**kw)
+    def getNumLookups(self): return self.numLookups
+
+
+class ConnectionCache_TestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.daemon=mp.pyroutil.getDaemon()
+    def setUp(self):
+        self.nsObj=CountingNameServer()
+        self.ns=Pyro5.api.Proxy(self.__class__.daemon.register(self.nsObj))
+        self.uri=self.__class__.daemon.register(PyroTestClass())
+        self.ns.register('test-app',self.uri,metadata={mp.pyroutil._NS_METADATA.appserver})
+    def tearDown(self):
+        mp.pyroutil.clearConnectionCache()
+        mp.pyroutil.connectionCache.update(enabled=True,lookupTtl=10.,healthCheckInterval=5.)
+    def test_pooled(self):
+        'Lookups are cached, pooled proxies are re-used within one thread'
+        ns=self.ns
+        a1=mp.pyroutil.connectApp(ns,'test-app',pooled=True)
+        a2=mp.pyroutil.connectApp(ns,'test-app',pooled=True)
+        self.assertIs(a1,a2)
+        self.assertEqual(set(mp.pyroutil.getNSmetadata(ns,'test-app')),{mp.pyroutil._NS_METADATA.appserver})
+        self.assertEqual(self.nsObj.getNumLookups(),1)
+        # other thread gets its own proxy
+        res=[]
+        th=threading.Thread(target=lambda: res.append(mp.pyroutil.connectApp(ns,'test-app',pooled=False)))
+        ns._pyroRelease()
+        th.start(); th.join()
+        ns._pyroClaimOwnership()
+        self.assertIsNot(res[0],a1)
+        self.assertEqual(str(res[0]._pyroUri),str(self.uri))
+        # unpooled proxy is always new
+        self.assertIsNot(mp.pyroutil.connectApp(ns,'test-app',pooled=False),a1)
+        # ownership transferred elsewhere: the proxy is not re-used
+        a1._pyroClaimOwnership()
+        a1._Proxy__pyroOwnerThread=-1
+        self.assertIsNot(mp.pyroutil.connectApp(ns,'test-app',pooled=True),a1)
+        # released pooled proxy is verified (thus reconnected) before being handed out again
+        (a3:=mp.pyroutil.connectApp(ns,'test-app',pooled=True))._pyroRelease()
+        self.assertIsNotNone(mp.pyroutil.connectApp(ns,'test-app',pooled=True)._pyroConnection)
+        mp.pyroutil.connectionCache.update(enabled=False)
+        self.assertIsNot(mp.pyroutil.connectApp(ns,'test-app',pooled=True),mp.pyroutil.connectApp(ns,'test-app',pooled=True))
+    def test_unpooled(self):
+        'By default, every caller gets its own proxy, only the lookup is shared'
+        ns=self.ns
+        a1,a2=mp.pyroutil.connectApp(ns,'test-app'),mp.pyroutil.connectApp(ns,'test-app')
+        self.assertIsNot(a1,a2)
+        self.assertEqual(self.nsObj.getNumLookups(),1)
+        # one caller releasing its proxy does not affect the other
+        with a1: pass
+        a1._pyroRelease()
+        self.assertEqual(a2.getApplicationSignature(),PyroTestClass().getApplicationSignature())
+    def test_stale(self):
+        'Re-registered application is found despite cached lookup'
+        ns=self.ns
+        mp.pyroutil.connectionCache.update(healthCheckInterval=0)
+        a1=mp.pyroutil.connectApp(ns,'test-app')
+        self.__class__.daemon.unregister(self.uri.object)
+        uri2=self.__class__.daemon.register(PyroTestClass())
+        ns.register('test-app',uri2)
+        a2=mp.pyroutil.connectApp(ns,'test-app')
+        self.assertIsNot(a1,a2)
+        self.assertEqual(str(a2._pyroUri),str(uri2))
+        self.assertEqual(self.nsObj.getNumLookups(),2)
@@ -46,7 +46,7 @@ class TemporalField_TestCase(unittest.TestCase):
             self.accel.append(
                 field.Field(
                     mesh=self.mesh, fieldID=DataID.FID_Strain, valueType=ValueType.Vector, time=t*au.s,
-                    quantity=[(100*t+2*i, 100*t+2*i+1) for i in range(6)]*au.Unit('kg/(m*s**2)'),
+                    quantity=[(100*t+3*i, 100*t+3*i+1, 100*t+3*i+2) for i in range(6)]*au.Unit('kg/(m*s**2)'),
                     fieldType=FieldType.FT_vertexBased
                 )
             )
@@ -119,6 +119,75 @@ class TemporalField_TestCase(unittest.TestCase):
             self.assertEqual(set(tf.timeList()), set([f.getTime() for f in self.displ]))
             tf.writeXdmf(timeUnit=au.Unit('ms'))
 
+    def test_04_interpolate(self):
+        def _do(tf):
+            # add out of order, times must be sorted
+            for f in reversed(self.accel):
+                tf.addField(f, userMetadata={})
+            self.assertEqual(tf.timeList(), [t*au.s for t in self.times])
+            pos = [(.1, .1, 0), (1., 1., 0), (2., 3., 0)]
+            v0, v1 = self.accel[3].evaluate(positions=pos), self.accel[4].evaluate(positions=pos)
+            # batch of positions, 6s is between 5s and 10s
+            self.assertTrue(np.allclose(tf.evaluate(time=6*au.s, positions=pos), .8*v0+.2*v1))
+            # single position, different time unit
+            self.assertTrue(np.allclose(tf.evaluate(time=7500*au.ms, positions=pos[1]), .5*v0[1]+.5*v1[1]))
+            # exact match is not interpolated
+            self.assertTrue(np.allclose(tf.evaluate(time=5*au.s, positions=pos), v0))
+            self.assertRaises(ValueError, lambda: tf.evaluate(time=6*au.s, positions=pos, interpolate=False))
+            self.assertRaises(ValueError, lambda: tf.evaluate(time=51*au.s, positions=pos))
+            # near match within tolerance
+            self.assertEqual(tf.timeMetadata(5.001*au.s, epsTime=.01*au.s)['time'], 5*au.s)
+            self.assertRaises(ValueError, lambda: tf.timeMetadata(1.5*au.s, epsTime=1*au.s))
+            # steps share one mesh instance
+            self.assertIs(tf.getField(time=1*au.s).getMesh(), tf.getField(time=2*au.s).getMesh())
+            # bounded cache
+            tf.cacheSize = 2
+            for t in self.times: tf.getField(time=t*au.s)
+            self.assertEqual(tf.getCachedTimes(), {20*au.s, 50*au.s})
+        _do(mp.DirTemporalField(dir=self.tmp))
+        with mp.SingleFileTemporalField(mode='overwrite', h5path=self.tmp+'/single-04.h5') as tf:
+            _do(tf)
+
+    def test_05_series(self):
+        h5path = self.tmp+'/single-05.h5'
+        with mp.SingleFileTemporalField(mode='overwrite', h5path=h5path) as tf:
+            for f in self.accel:
+                tf.addField(f, userMetadata={})
+        import h5py
+        with h5py.File(h5path, 'r') as h5:
+            # all steps stacked in one dataset
+            self.assertEqual(list(h5['series']), [self.mesh.dataDigest()])
+            grp = h5['series'][self.mesh.dataDigest()]
+            self.assertEqual(grp['vertex_series'].shape, (len(self.times), 6, 3))
+            self.assertEqual(list(grp['times'][:]), list(self.times))
+        with mp.SingleFileTemporalField(mode='readonly', h5path=h5path) as tf:
+            self.assertEqual(tf.timeList(), [t*au.s for t in self.times])
+            f2, f5 = tf.getField(time=2*au.s), tf.getField(time=5*au.s)
+            self.assertEqual(f2.quantity.step, 2)
+            self.assertTrue(np.allclose(f5.value[:], self.accel[3].value))
+            # mesh object is shared by steps
+            self.assertIs(f2.getMesh(), f5.getMesh())
+            self.assertTrue(os.path.exists(tf.writeXdmf()))
+
+    def test_06_seriesRejected(self):
+        h5path = self.tmp+'/single-06.h5'
+        bad = [
+            # 2-component vector records
+            field.Field(mesh=self.mesh, fieldID=DataID.FID_Strain, valueType=ValueType.Vector, time=3*au.s, quantity=[(0., 1.)]*6*au.Unit('kg/(m*s**2)'), fieldType=FieldType.FT_vertexBased),
+            # incompatible unit
+            field.Field(mesh=self.mesh, fieldID=DataID.FID_Strain, valueType=ValueType.Vector, time=3*au.s, quantity=[(0., 1., 2.)]*6*au.m, fieldType=FieldType.FT_vertexBased),
+        ]
+        with mp.SingleFileTemporalField(mode='overwrite', h5path=h5path) as tf:
+            tf.addField(self.accel[0], userMetadata={})
+            tf.addField(self.accel[1], userMetadata={})
+            for f in bad:
+                self.assertRaises(ValueError, lambda: tf.addField(f, userMetadata={}))
+            tf.addField(self.accel[2], userMetadata={})
+        with mp.SingleFileTemporalField(mode='readonly', h5path=h5path) as tf:
+            # no partial step was left behind by the rejected fields
+            self.assertEqual(tf.timeList(), [t*au.s for t in self.times[:3]])
+            self.assertTrue(np.allclose(tf.getField(time=self.times[2]*au.s).value[:], self.accel[2].value))
+
 
 if __name__ == '__main__':
     pytest.main([__file__])
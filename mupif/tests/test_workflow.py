@@ -0,0 +1,160 @@
+import unittest
+import typing
+import threading
+import mupif as mp
+import Pyro5.api
+
+
+@Pyro5.api.expose
+class SlowModel(mp.Model):
+    'Model which waits for other models at startup (if the test sets *startupBarrier*), so that concurrency is asserted without measuring time'
+    startupBarrier: typing.ClassVar[typing.Optional[threading.Barrier]]=None
+    def __init__(self,metadata=None):
+        super().__init__(metadata={
+            'Name':'Slow model','ID':'mupif-tests-SlowModel','Description':'Model for workflow tests',
+            'Physics':{'Type':'Other','Entity':'Other'},
+            'Solver':{
+                'Software':'Python script','Language':'Python3','License':'LGPL','Creator':'nobody','Version_date':'10/2026',
+                'Type':'Sleeper','Documentation':'Nowhere','Estim_time_step_s':1,'Estim_comp_time_s':1,'Estim_execution_cost_EUR':0,
+                'Estim_personnel_cost_EUR':0,'Required_expertise':'None','Accuracy':'Low','Sensitivity':'Low','Complexity':'Low','Robustness':'High'
+            },
+            'Inputs':[],'Outputs':[]
+        })
+        # raises BrokenBarrierError unless all models are being constructed at the same time
+        if self.startupBarrier is not None: self.startupBarrier.wait()
+    def initialize(self,workdir='',metadata=None,validateMetaData=True,**kw):
+        if self.startupBarrier is not None: self.startupBarrier.wait()
+        self._initThread=threading.current_thread().name
+        super().initialize(workdir=workdir,metadata=metadata,validateMetaData=validateMetaData,**kw)
+    def solveStep(self,tstep,stageID=0,runInBackground=False):
+        self._stepLog.append((self,'start'))
+        # set by the test for models which must be solving at the same time
+        if (b:=getattr(self,'_stepBarrier',None)) is not None: b.wait()
+        self._stepLog.append((self,'end'))
+        self._solved=True
+
+
+@Pyro5.api.expose
+class FailingModel(SlowModel):
+    def initialize(self,workdir='',metadata=None,validateMetaData=True,**kw):
+        raise ValueError('initialization failed')
+
+
+@Pyro5.api.expose
+class StepFailingModel(SlowModel):
+    def solveStep(self,tstep,stageID=0,runInBackground=False):
+        raise ValueError('step failed')
+
+
+@Pyro5.api.expose
+class BlockedModel(SlowModel):
+    'Construction blocks until *release* is set; records its termination'
+    release: typing.ClassVar[threading.Event]=threading.Event()
+    terminated: typing.ClassVar[threading.Event]=threading.Event()
+    def __init__(self,metadata=None):
+        BlockedModel.release.wait()
+        super().__init__(metadata=metadata)
+    def terminate(self):
+        self.terminated.set()
+
+
+@Pyro5.api.expose
+class AllocatingWorkflow(mp.Workflow):
+    'Records models allocated through the _allocateModel hook'
+    def _allocateModel(self,*,name,modulename,classname,jobmanagername):
+        self._allocated.append(name)
+        return super()._allocateModel(name=name,modulename=modulename,classname=classname,jobmanagername=jobmanagername)
+
+
+@Pyro5.api.expose
+class PreparingWorkflow(mp.Workflow):
+    'Records calls of prepareModelStep, with models finished at that moment'
+    def prepareModelStep(self,name,tstep):
+        self._prepared=getattr(self,'_prepared',[])+[(name,sorted(n for n,m in self.getDictOfModels().items() if hasattr(m,'_solved')))]
+
+
+def _workflowMetadata(models):
+    return {
+        'Name':'Test workflow','ID':'mupif-tests-workflow','Description':'',
+        'Execution':{'ID':'1','Use_case_ID':'1','Task_ID':'1'},
+        'Models':[dict(Name=f'm{i}',Module=__name__,**kw) for i,kw in enumerate(models)]
+    }
+
+
+class Workflow_TestCase(unittest.TestCase):
+    def setUp(self):
+        BlockedModel.release.clear()
+        BlockedModel.terminated.clear()
+        SlowModel._stepLog=[]
+    def tearDown(self):
+        # let allocations which timed out finish
+        BlockedModel.release.set()
+        SlowModel.startupBarrier=None
+    def test_concurrentStartup(self):
+        'Models are allocated and initialized concurrently'
+        w=mp.Workflow()
+        # serially, the first model would wait at the barrier until it times out
+        SlowModel.startupBarrier=threading.Barrier(4,timeout=30)
+        w.initialize(metadata=_workflowMetadata(4*[dict(Class='SlowModel')]))
+        self.assertEqual(list(w.getDictOfModels().keys()),['m0','m1','m2','m3'])
+        self.assertEqual(len(set(m._initThread for m in w.getListOfModels())),4)
+        self.assertEqual(len(w.getMetadata('Dependencies')),4)
+    def test_allocateModelHook(self):
+        'Overridden _allocateModel is used for all models, which are registered in metadata order'
+        w=AllocatingWorkflow()
+        w._allocated=[]
+        SlowModel.startupBarrier=threading.Barrier(3,timeout=30)
+        w.initialize(metadata=_workflowMetadata(3*[dict(Class='SlowModel')]))
+        self.assertEqual(sorted(w._allocated),['m0','m1','m2'])
+        self.assertEqual(list(w.getDictOfModels().keys()),['m0','m1','m2'])
+    def test_errors(self):
+        'All failures are reported together'
+        w=mp.Workflow()
+        with self.assertRaisesRegex(RuntimeError,r'Allocation failed for 2 of 3 model.*m1: AttributeError.*m2: TimeoutError'):
+            w.initialize(metadata=_workflowMetadata([dict(Class='SlowModel'),dict(Class='NoSuchModel'),dict(Class='BlockedModel',Startup_timeout=.1)]))
+        # successfully allocated models are kept, so that they are terminated with the workflow
+        self.assertEqual(list(w.getDictOfModels().keys()),['m0'])
+        w=mp.Workflow()
+        with self.assertRaisesRegex(RuntimeError,r'Initialization failed for 1 of 2 model.*m1: ValueError: initialization failed'):
+            w.initialize(metadata=_workflowMetadata([dict(Class='SlowModel'),dict(Class='FailingModel')]))
+    def test_lateAllocation(self):
+        'Model allocated after its allocation timed out is terminated (not leaked)'
+        w=mp.Workflow()
+        with self.assertRaisesRegex(RuntimeError,r'm0: TimeoutError'):
+            w.initialize(metadata=_workflowMetadata([dict(Class='BlockedModel',Startup_timeout=.1)]))
+        self.assertEqual(w.getDictOfModels(),{})
+        self.assertFalse(BlockedModel.terminated.is_set())
+        BlockedModel.release.set()
+        self.assertTrue(BlockedModel.terminated.wait(timeout=30))
+        self.assertEqual(w.getDictOfModels(),{})
+    def test_solveModelsStep(self):
+        'Independent models solve the step concurrently, dependent ones wait for their dependencies'
+        w=PreparingWorkflow()
+        w.initialize(metadata=_workflowMetadata([dict(Class='SlowModel'),dict(Class='SlowModel',Depends_on=['m0']),dict(Class='SlowModel'),dict(Class='SlowModel',Depends_on=['m1','m2'])]))
+        self.assertEqual(w.getModelStepDependencies(),{'m0':[],'m1':['m0'],'m2':[],'m3':['m1','m2']})
+        # independent m0 and m2 can only pass the barrier if they are solved at the same time
+        b=threading.Barrier(2,timeout=30)
+        for n in 'm0','m2': w.getModel(n)._stepBarrier=b
+        w.solveModelsStep(mp.TimeStep(time=1*mp.U.s,dt=1*mp.U.s,targetTime=1*mp.U.s))
+        names=dict((id(m),n) for n,m in w.getDictOfModels().items())
+        pos=dict(((names[id(m)],what),i) for i,(m,what) in enumerate(SlowModel._stepLog))
+        self.assertEqual(len(pos),8)
+        self.assertGreater(pos['m1','start'],pos['m0','end'])
+        self.assertGreater(pos['m3','start'],max(pos['m1','end'],pos['m2','end']))
+        self.assertEqual(sorted(w._prepared[:2]),[('m0',[]),('m2',[])])
+        # m2 may or may not be finished when m1 is prepared
+        self.assertEqual([n for n,fin in w._prepared[2:]],['m1','m3'])
+        self.assertIn('m0',w._prepared[2][1])
+        self.assertEqual(w._prepared[3][1],['m0','m1','m2'])
+    def test_solveModelsStep_errors(self):
+        w=mp.Workflow()
+        w.initialize(metadata=_workflowMetadata([dict(Class='SlowModel'),dict(Class='StepFailingModel'),dict(Class='SlowModel',Depends_on=['m1'])]))
+        tstep=mp.TimeStep(time=1*mp.U.s,dt=1*mp.U.s,targetTime=1*mp.U.s)
+        with self.assertRaisesRegex(RuntimeError,r'Solution step failed for 1 of 3 model.*m1: ValueError: step failed'):
+            w.solveModelsStep(tstep)
+        # dependent model was not started
+        self.assertFalse(hasattr(w.getModel('m2'),'_solved'))
+        with self.assertRaisesRegex(ValueError,'Cyclic dependency'):
+            w.solveModelsStep(tstep,dependencies={'m0':['m2'],'m1':[],'m2':['m0']})
+        with self.assertRaisesRegex(ValueError,'unknown model'):
+            w.solveModelsStep(tstep,dependencies={'m0':['foo']})
@@ -0,0 +1,252 @@
+#
+#           MuPIF: Multi-Physics Integration Framework
+#               Copyright (C) 2010-2015 Borek Patzak
+#
+#    Czech Technical University, Faculty of Civil Engineering,
+#  Department of Structural Mechanics, 166 29 Prague, Czech Republic
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor,
+# Boston, MA  02110-1301  USA
+#
+from . import cell
+from . import bbox
+from . import cellgeometrytype
+from .baredata import BareData
+from .field import FieldType
+from .units import Quantity
+import Pyro5.api
+import itertools
+import logging
+import typing
+import numpy as np
+import pydantic
+
+log = logging.getLogger(__name__)
+
+
+@Pyro5.api.expose
+class TransferOperator(BareData):
+    """
+    Precomputed operator sampling fields defined on one mesh at fixed target points. Localization of the points and shape function evaluation is done once; the operator is stored as sparse matrix (CSR layout, one row per target point, one column per source vertex or cell) and evaluating a field only costs one sparse matrix-vector product.
+
+    The operator remembers :obj:`mupif.mesh.Mesh.dataDigest` of the mesh it was built for and is rebuilt automatically when evaluating a field on a different (or modified) mesh, or with different :obj:`mupif.field.FieldType`.
+
+    Typical usage (*target* is the mesh receiving data, *field* is defined on another mesh and changes every time step)::
+
+        op = TransferOperator.make(mesh=field.getMesh(), points=target.getVertices(), fieldType=field.getFieldType())
+        # in every time step
+        values = op.evaluate(field)
+
+    .. automethod:: __init__
+    """
+    #: (N,dim) array of target points
+    points: typing.Any
+    #: tolerance used when localizing points, see :obj:`mupif.field.Field.evaluate`
+    eps: float = 0.
+    fieldType: FieldType = FieldType.FT_vertexBased
+    #: digest of the mesh the operator was built for (None if not built yet)
+    sourceDigest: typing.Optional[str] = None
+    #: sparse matrix in CSR layout: weights of i-th row are ``weights[offsets[i]:offsets[i+1]]``, for columns ``cols[offsets[i]:offsets[i+1]]``
+    offsets: typing.Any = None
+    cols: typing.Any = None
+    weights: typing.Any = None
+
+    npyArrays: typing.ClassVar[bool] = True
+
+    @pydantic.model_validator(mode='before')
+    @classmethod
+    def convert_to_np_array(cls, vals):
+        for f, dtype in [('points', np.float64), ('offsets', np.int64), ('cols', np.int64), ('weights', np.float64)]:
+            if vals.get(f, None) is not None:
+                vals[f] = np.ascontiguousarray(vals[f], dtype=dtype)
+        if vals.get('points', None) is not None and vals['points'].ndim == 1: vals['points'] = vals['points'].reshape(1, -1)
+        return vals
+
+    @staticmethod
+    def make(*, mesh, points, fieldType=FieldType.FT_vertexBased, eps=0.):
+        """
+        Create new operator and build it for *mesh*.
+
+        :param mupif.mesh.Mesh mesh: source mesh
+        :param numpy.ndarray points: (N,dim) array of target points
+        :param FieldType fieldType: whether the operator will be applied to vertex-based or cell-based fields
+        :param float eps: localization tolerance
+        """
+        ret = TransferOperator(points=points, fieldType=fieldType, eps=eps)
+        ret.build(mesh)
+        return ret
+
+    def getNumberOfPoints(self):
+        """
+        :return: number of target points (rows of the operator)
+        :rtype: int
+        """
+        return self.points.shape[0]
+
+    def isValidFor(self, mesh):
+        """
+        :return: True if the operator was built for *mesh* (or for a mesh with identical data)
+        :rtype: bool
+        """
+        return self.sourceDigest is not None and self.sourceDigest == mesh.dataDigest()
+
+    def build(self, mesh):
+        """
+        (Re)compute the operator for *mesh*.
+        """
+        self.offsets, self.cols, self.weights = TransferOperator.makeMatrix_static(mesh, self.fieldType, self.points, self.eps)
+        self.sourceDigest = mesh.dataDigest()
+
+    def apply(self, value):
+        """
+        Apply the operator to source values.
+
+        :param numpy.ndarray value: (nSource,) or (nSource,nComp) array of values in source vertices or cells
+        :return: (N,nComp) array of values in target points
+        :rtype: numpy.ndarray
+        """
+        if self.offsets is None: raise RuntimeError('TransferOperator was not built yet.')
+        return TransferOperator.matVec_static(self.offsets, self.cols, self.weights, value)
+
+    def evaluate(self, field):
+        """
+        Evaluate *field* in target points; the operator is rebuilt first if it does not match the mesh or type of the field.
+
+        :param mupif.field.Field field: source field
+        :return: values in target points
+        :rtype: mupif.units.Quantity
+        """
+        if field.getFieldType() != self.fieldType:
+            log.info(f'TransferOperator: rebuilding for {field.getFieldType().name} (was {self.fieldType.name}).')
+            self.fieldType = field.getFieldType()
+            self.build(field.getMesh())
+        elif not self.isValidFor(field.getMesh()):
+            log.info('TransferOperator: source mesh changed, rebuilding.')
+            self.build(field.getMesh())
+        return Quantity(value=self.apply(field.value), unit=field.getUnit())
+
+    @staticmethod
+    def localizePoints_static(mesh, points, eps):
+        """
+        Find candidate cells for many points, using the mesh cell localizer.
+
+        :param mupif.mesh.Mesh mesh: mesh to search in
+        :param numpy.ndarray points: (N,dim) array of positions
+        :param float eps: tolerance (enlarges the query box around each point)
+        :return: (offsets,cellIds) in CSR layout: candidate cells of the i-th point are cellIds[offsets[i]:offsets[i+1]] (sorted)
+        :rtype: (numpy.ndarray,numpy.ndarray)
+        """
+        loc = mesh.getCellLocalizer()
+        if hasattr(loc, 'getItemsContainingPoints'):
+            return loc.getItemsContainingPoints(points, eps=eps)
+        rows = []
+        for p in points:
+            cells = loc.getItemsInBBox(bbox.BBox(tuple(p-eps), tuple(p+eps)))
+            rows.append(sorted((c if isinstance(c, (int, np.integer)) else c.number) for c in cells))
+        offsets = np.zeros(len(rows)+1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(r) for r in rows])
+        return offsets, np.fromiter(itertools.chain.from_iterable(rows), dtype=np.int64, count=offsets[-1])
+
+    @staticmethod
+    def makeMatrix_static(mesh, fieldType, points, eps):
+        """
+        Compute the sampling matrix. Points are localized in bulk, candidate (point,cell) pairs are grouped by cell type and tested with array kernels of the cell class (:obj:`mupif.cell.Cell.glob2locArray`, :obj:`mupif.cell.Cell.evalNArray`); cell types without array kernels are processed per-cell.
+
+        For vertex-based fields, weights are shape functions of the lowest-numbered cell containing the point; for cell-based fields, the value is the average of all cells containing the point (as in :obj:`mupif.field.Field._evaluate`).
+
+        :return: (offsets,cols,weights) in CSR layout
+        :rtype: (numpy.ndarray,numpy.ndarray,numpy.ndarray)
+        :except ValueError: some point is not inside any cell
+        """
+        npt = points.shape[0]
+        offsets, cand = TransferOperator.localizePoints_static(mesh, points, eps)
+        # point index for every candidate (point,cell) pair
+        pt = np.repeat(np.arange(npt), np.diff(offsets))
+        vc, ct, cv = mesh._getGeometryArrays()
+        inside = np.zeros(len(cand), dtype=bool)
+        # cell type -> (pair indices, local coordinates); lc is None for types processed per-cell
+        byType = {}
+        candTypes = ct[cand] if len(cand) else np.empty(0, dtype=np.int64)
+        for t in np.unique(candTypes):
+            sel = np.flatnonzero(candTypes == t)
+            klass = cell.Cell.getClassForCellGeometryType(t)
+            try:
+                conn = cv[cand[sel], :cellgeometrytype.cgt2numVerts[t]]
+                ins, lc = klass.glob2locArray(vc[conn], points[pt[sel]])
+            except NotImplementedError:
+                ins = np.array([mesh.getCell(c).containsPoint(points[p]) for c, p in zip(cand[sel], pt[sel])], dtype=bool)
+                lc = None
+            inside[sel] = ins
+            byType[t] = (sel, lc)
+
+        insideIx = np.flatnonzero(inside)
+        if fieldType == FieldType.FT_vertexBased:
+            # first containing pair for each point (pairs are ordered by point and cell number)
+            ptFound, first = np.unique(pt[insideIx], return_index=True)
+            chosen = insideIx[first]
+            rowLen = np.zeros(npt, dtype=np.int64)
+            rowLen[pt[chosen]] = cv[cand[chosen]].shape[1]-np.sum(cv[cand[chosen]] < 0, axis=1)
+            mOff = np.zeros(npt+1, dtype=np.int64)
+            np.cumsum(rowLen, out=mOff[1:])
+            mCols, mWeights = np.empty(mOff[-1], dtype=np.int64), np.empty(mOff[-1], dtype=np.float64)
+            for t, (sel, lc) in byType.items():
+                ch = chosen[np.isin(chosen, sel)]
+                if len(ch) == 0:
+                    continue
+                nv = cellgeometrytype.cgt2numVerts[t]
+                if lc is None:
+                    # per-cell fallback: interpolating unit vectors gives shape function values
+                    N = np.array([[mesh.getCell(c).interpolate(points[p], np.eye(nv)[:, j:j+1])[0] for j in range(nv)] for c, p in zip(cand[ch], pt[ch])])
+                else:
+                    N = cell.Cell.getClassForCellGeometryType(t).evalNArray(lc[np.searchsorted(sel, ch)])
+                ix = mOff[pt[ch]][:, np.newaxis]+np.arange(nv)
+                mCols[ix] = cv[cand[ch], :nv]
+                mWeights[ix] = N
+        else:
+            # in case of cell based fields do compute average of cell values containing point
+            # this typically happens when point is on the shared edge or vertex
+            ptFound, count = np.unique(pt[insideIx], return_counts=True)
+            rowLen = np.zeros(npt, dtype=np.int64)
+            rowLen[ptFound] = count
+            mOff = np.zeros(npt+1, dtype=np.int64)
+            np.cumsum(rowLen, out=mOff[1:])
+            # insideIx is ordered by point, so are the rows
+            mCols = cand[insideIx]
+            mWeights = 1./rowLen[pt[insideIx]]
+        if len(ptFound) < npt:
+            missing = np.setdiff1d(np.arange(npt), ptFound)
+            raise ValueError(f'Field.evaluate: no source cell found for {len(missing)} position(s), e.g. position={points[missing[0]]}')
+        return mOff, mCols, mWeights
+
+    @staticmethod
+    def matVec_static(offsets, cols, weights, value):
+        """
+        Sparse matrix (CSR layout) times dense matrix (one column per value component). Out-of-core values (not a :obj:`numpy.ndarray`, e.g. HDF5-backed) are indexed by rows and only rows referenced by the matrix are fetched.
+
+        :return: (nRows,nComp) array
+        :rtype: numpy.ndarray
+        """
+        if not isinstance(value, np.ndarray):
+            if hasattr(value, 'shape') and len(value.shape) > 1:
+                rows = np.unique(cols)
+                value, cols = value[rows], np.searchsorted(rows, cols)
+        value = np.asarray(value)
+        if value.ndim == 1:
+            value = value.reshape(-1, 1)
+        if len(cols) and cols.max() >= value.shape[0]:
+            raise RuntimeError(f'Field::evaluate failed, inconsistent data ({cols.max()} referenced, but only {value.shape[0]} values)')
+        nRows = offsets.shape[0]-1
+        rows = np.repeat(np.arange(nRows), np.diff(offsets))
+        return np.stack([np.bincount(rows, weights=weights*value[cols, k], minlength=nRows) for k in range(value.shape[1])], axis=1)
@@ -7,7 +7,7 @@ from . import cell
 from . import units
 from . import util
 from . import localizer
-from .mesh import Mesh
+from .mesh import Mesh, registerMesh
 
 from .heavydata import HeavyConvertible
 import copy
@@ -115,6 +115,8 @@ class UniformRectilinearMesh(Mesh,HeavyConvertible):
         gg['origin']=np.array(self.origin)
         gg['spacing']=np.array(self.spacing)
         gg['dims']=np.array(self.dims)
+        gg.attrs['dataDigest']=mhash
+        registerMesh(self,key=self.hdf5RegistryKey(gg))
         return gg
 
     def asHdf5Object(self, parentgroup, heavyMesh=None):
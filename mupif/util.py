@@ -61,9 +61,6 @@ def setupLoggingAtStartup():
     """
     root = logging.getLogger()
 
-    if pName:=os.environ.get('MUPIF_LOG_PROCESSNAME',None):
-        multiprocessing.current_process().name=pName
-
     # plain logging, perhaps could be guarded by "if sys.stderr.isatty()":
     #    streamHandler = logging.StreamHandler()
     #    streamHandler.setFormatter(logging.Formatter(_formatLog, _formatTime))
@@ -79,21 +76,31 @@ def setupLoggingAtStartup():
         handler.setFormatter(colorlog.ColoredFormatter(style='{',fmt='{asctime} {log_color}{levelname:.4} {processName:>25}|{process:<7} {filename:>.12}:{lineno:<3} {message}', datefmt='%H:%M:%S'))
     root.addHandler(handler)
 
-
-    if (level := os.environ.get('MUPIF_LOG_LEVEL', None)) is not None:
-        root.setLevel(level)
-
     if (out := os.environ.get('MUPIF_LOG_FILE', None)) is not None:
         fileHandler = logging.FileHandler(out, mode='w')
         fileHandler.setFormatter(logging.Formatter(_formatLog, _formatTime, style='{'))
         root.addHandler(fileHandler)
 
+    setupJobLogging()
+
+
+def setupJobLogging():
+    """
+    Apply process name (**MUPIF_LOG_PROCESSNAME**), log level (**MUPIF_LOG_LEVEL**) and remote logging via Pyro (**MUPIF_LOG_PYRO**) from environment variables. Called by :obj:`setupLoggingAtStartup`, and again by pre-started :obj:`mupif.modelserver.ModelServer` workers once they receive job-specific environment.
+    """
+    root = logging.getLogger()
+
+    if pName:=os.environ.get('MUPIF_LOG_PROCESSNAME',None):
+        multiprocessing.current_process().name=pName
+
+    if (level := os.environ.get('MUPIF_LOG_LEVEL', None)) is not None:
+        root.setLevel(level)
+
     if (pyroOut := os.environ.get('MUPIF_LOG_PYRO', None)) is not None:
         pyroHandler = pyrolog.PyroLogHandler(uri=pyroOut)
         root.addHandler(pyroHandler)
 
 
-
 def redirectLog(out):
     """
     Change root logger by giving a new file name. Useful in parallel processes on a single machine.
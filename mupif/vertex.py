@@ -3,6 +3,9 @@ from . import bbox
 from .baredata import BareData
 import Pyro5.api
 import typing
+import weakref
+import numpy as np
+import pydantic
 from .ndtypes import *
 
 
@@ -23,6 +26,38 @@ class Vertex(BareData):
 
     def __hash__(self): return id(self)
 
+    @pydantic.model_validator(mode='after')
+    def coords_read_only(self):
+        self.__dict__['coords'] = Vertex._readOnly_static(self.coords)
+        return self
+
+    @staticmethod
+    def _readOnly_static(coords):
+        'Return read-only copy of *coords*; coordinates are not modified in-place, so that meshes can detect the change.'
+        ret = np.array(coords, dtype=np.float64)
+        ret.flags.writeable = False
+        return ret
+
+    def __setattr__(self, name, value):
+        if name == 'coords': value = Vertex._readOnly_static(value)
+        super().__setattr__(name, value)
+        if not name.startswith('_'):
+            # meshes using this vertex have their cached data invalidated
+            for r in self.__dict__.get('_meshes', None) or ():
+                if (m := r()) is not None: m._setDirty()
+
+    def __deepcopy__(self, memo=None):
+        ret = super().__deepcopy__(memo)
+        # the copy is not used by any mesh yet
+        ret.__dict__.pop('_meshes', None)
+        ret.__dict__['coords'] = Vertex._readOnly_static(ret.coords)
+        return ret
+
+    def _addMesh(self, mesh):
+        'Register *mesh* as using this vertex: assigning vertex attributes invalidates cached data of the mesh (see :obj:`mupif.mesh.Mesh._setDirty`).'
+        refs = tuple(r for r in (self.__dict__.get('_meshes', None) or ()) if r() is not None and r() is not mesh)
+        self.__dict__['_meshes'] = refs+(weakref.ref(mesh),)
+
     def getCoordinates(self) -> NDArr23:
         """
         :return: Receiver's coordinates
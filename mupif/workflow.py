@@ -28,6 +28,7 @@ import copy
 import logging
 import importlib
 import pydantic
+import concurrent.futures
 from typing import Optional,Any
 import time as timeTime
 
@@ -39,6 +40,7 @@ from . import DataID
 from . import U
 from . import pyroutil
 from . import pyrolog
+from . import modelserverbase
 from .meta import WorkflowMeta
 
 log = logging.getLogger()
@@ -92,26 +94,41 @@ class Workflow(model.Model):
                 return name
 
     def _allocateModel(self, *, name, modulename, classname, jobmanagername):
+        """
+        Allocate model (see :obj:`_makeModel`) and register it with the workflow. This is the hook used by :obj:`_allocateAllModels`, where it is called concurrently for all models (each in separate thread); overrides must therefore be thread-safe.
+
+        :return: model or None
+        """
         if name:
-            if jobmanagername:
-                ns = pyroutil.connectNameserver()
-                self._jobmans[name] = pyroutil.connectJobManager(ns, jobmanagername)
-                # remoteLogUri must be known before the model is spawned (too late in _model.initialize)
-                # if not given in Execution.Log_URI (this is what workflow execution script in mupifDB does), forward remote logs to the local logger
-                remoteLogUri=self.metadata.Execution.Log_URI
-                if not remoteLogUri:
-                    daemon = pyroutil.getDaemon(proxy=ns)
-                    remoteLogUri=str(daemon.register(pyrolog.PyroLogReceiver()))
-                    log.info(f'Model {name=} will remotely use our logger at {remoteLogUri}.')
-                self._models[name] = pyroutil.allocateApplicationWithJobManager(ns=ns, jobMan=self._jobmans[name], remoteLogUri=remoteLogUri)
-                return self._models[name]
-            elif classname and modulename:
-                moduleImport = importlib.import_module(modulename)
-                model_class = getattr(moduleImport, classname)
-                self._models[name] = model_class()
-                return self._models[name]
+            jobman, _model = self._makeModel(name=name, modulename=modulename, classname=classname, jobmanagername=jobmanagername)
+            if jobman is not None: self._jobmans[name] = jobman
+            if _model is not None: self._models[name] = _model
+            return _model
         return None
-    
+
+    def _makeModel(self, *, name, modulename, classname, jobmanagername):
+        """
+        Allocate model (remotely via model server *jobmanagername*, or locally by instantiating *classname* from *modulename*), without registering it with the workflow.
+
+        :return: (model server or None, model or None)
+        """
+        if jobmanagername:
+            ns = pyroutil.connectNameserver()
+            jobman = pyroutil.connectJobManager(ns, jobmanagername)
+            # remoteLogUri must be known before the model is spawned (too late in _model.initialize)
+            # if not given in Execution.Log_URI (this is what workflow execution script in mupifDB does), forward remote logs to the local logger
+            remoteLogUri=self.metadata.Execution.Log_URI
+            if not remoteLogUri:
+                daemon = pyroutil.getDaemon(proxy=ns)
+                remoteLogUri=str(daemon.register(pyrolog.PyroLogReceiver()))
+                log.info(f'Model {name=} will remotely use our logger at {remoteLogUri}.')
+            return jobman, pyroutil.allocateApplicationWithJobManager(ns=ns, jobMan=jobman, remoteLogUri=remoteLogUri)
+        elif classname and modulename:
+            moduleImport = importlib.import_module(modulename)
+            model_class = getattr(moduleImport, classname)
+            return None, model_class()
+        return None, None
+
     def _allocateModelWithMetadata(self, *, name, modulename, classname, modelConfiguration):
         if name:
             if modelConfiguration:
@@ -161,30 +178,110 @@ class Workflow(model.Model):
             executionProfile = self.metadata['Execution']['ExecutionProfileIndex']
 
         log.info("Workflow::executionProfile #%d"%(executionProfile,))
+        if executionProfile >= 0 and any(model_info.get('Instantiate', True) for model_info in self.metadata['Models']):
+            raise NotImplementedError('Execution profiles are not yet implemented correctly.')
+            # for execution profiles, use self._allocateModelWithMetadata(name=name, modulename=..., classname=..., modelConfiguration=mep),
+            # where mep is the item in self.metadata['ExecutionProfiles'][executionProfile]['Models'] with matching name
+        # allocate all models concurrently (connecting to model servers, spawning remote jobs, or instantiating locally)
+        tasks = {}
         for model_info in self.metadata['Models']:
-            if model_info.get('Instantiate', True):
-                name=model_info.get('Name', '')
-                if (executionProfile < 0):
-                    self._allocateModel(name=name, modulename=model_info.get('Module', ''), classname=model_info.get('Class', ''), jobmanagername=model_info.get('Jobmanager', ''))
-                else:
-                    raise NotImplementedError('Execution profiles are not yet implemented correctly.')
-                    executionProfile = self.metadata['ExecutionProfiles'][executionProfile]
-                    mep = None
-                    for ep in executionProfile['Models']:
-                        if (ep['Name'] == name):
-                            mep = ep
-                            break
-                    if (mep):
-                        self._allocateModelWithMetadata(name=name, modulename=model_info.get('Module', ''), classname=model_info.get('Class', ''), modelConfiguration=mep)
-                    else:
-                        log.fatal("Workflow::_allocateAllModels: model (%s) execution profile missing for configuration %d"%(name, executionProfile))
+            if model_info.get('Instantiate', True) and (name := model_info.get('Name', '')):
+                tasks[name] = (
+                    lambda model_info=model_info, name=name: self._allocateModel(name=name, modulename=model_info.get('Module', ''), classname=model_info.get('Class', ''), jobmanagername=model_info.get('Jobmanager', '')),
+                    model_info.get('Startup_timeout', 0)
+                )
+        # models allocated successfully are kept also if some others failed (so that terminate cleans them up)
+        results, errors = Workflow._runConcurrently_static('Allocation', tasks, onLate=self._releaseLateModel)
+        # models register in order of completion: re-order them as in metadata
+        for name in tasks:
+            if name in errors: continue
+            for reg in (self._jobmans, self._models):
+                if name in reg:
+                    reg[name] = reg.pop(name)
+                    Workflow._claimOwnership(reg[name])
+        Workflow._raiseFailed_static('Allocation', len(tasks), errors)
 
     def _initializeAllModels(self):
         _md = self._getInitializationMetadata()
-        for _model in self._models.values():
-            # print("Workflow calls initialize of " + _model.__class__.__name__)
+        timeouts = dict([(m.get('Name', ''), m.get('Startup_timeout', 0)) for m in self.metadata['Models']]) if self.metadata is not None else {}
+
+        def _initialize(_model):
+            Workflow._claimOwnership(_model)
             _model.initialize(metadata=_md)
 
+        tasks = dict([(name, (lambda _model=_model: _initialize(_model), timeouts.get(name, 0))) for name, _model in self._models.items()])
+        Workflow._raiseFailed_static('Initialization', len(tasks), Workflow._runConcurrently_static('Initialization', tasks)[1])
+        for _model in self._models.values(): Workflow._claimOwnership(_model)
+
+    @staticmethod
+    def _claimOwnership(obj):
+        'Make the current thread owner of the Pyro proxy (if *obj* is remote); proxies can be only used by the thread owning them.'
+        if isinstance(obj, (Pyro5.api.Proxy, model.RemoteModel, modelserverbase.RemoteModelServer)):
+            obj._pyroClaimOwnership()
+        if isinstance(obj, model.RemoteModel) and obj._jobMan is not None:
+            Workflow._claimOwnership(obj._jobMan)
+
+    def _releaseLateModel(self, name, _model):
+        """
+        Unregister and terminate model allocated only after its allocation timed out (the allocation already failed, thus the model would not be used, but it would be still running); for remote models, this releases the job at the model server.
+        """
+        if _model is None: return
+        log.warning(f'Model {name} was allocated after its allocation timed out, terminating it.')
+        if self._models.get(name, None) is _model: self._models.pop(name, None)
+        self._jobmans.pop(name, None)
+        _model.terminate()
+
+    @staticmethod
+    def _runConcurrently_static(what, tasks, onLate=None):
+        """
+        Run tasks concurrently, each in separate thread.
+
+        :param str what: description of the phase, for messages
+        :param dict tasks: model name -> (callable, timeout in seconds, unlimited if non-positive)
+        :param onLate: callable(name,result) called (from the worker thread) with result of a task which finishes successfully after it timed out; used to release resources allocated by such tasks
+        :return: (results,errors), both dicts keyed by model name, with return value of the callable or exception raised (or TimeoutError)
+        """
+        results, errors, t0 = {}, {}, timeTime.time()
+        if not tasks: return results, errors
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix=f'Workflow-{what}')
+        try:
+            futures = dict([(pool.submit(fn), name) for name, (fn, timeout) in tasks.items()])
+            deadlines = dict([(name, t0+timeout) for name, (fn, timeout) in tasks.items() if timeout > 0])
+            pending = set(futures.keys())
+            while pending:
+                waitDeadlines = [deadlines[futures[fut]] for fut in pending if futures[fut] in deadlines]
+                done, pending = concurrent.futures.wait(pending, timeout=max(0, min(waitDeadlines)-timeTime.time()) if waitDeadlines else None, return_when=concurrent.futures.FIRST_COMPLETED)
+                for fut in done:
+                    if (e := fut.exception()) is not None: errors[futures[fut]] = e
+                    else: results[futures[fut]] = fut.result()
+                for fut in list(pending):
+                    name = futures[fut]
+                    if name in deadlines and deadlines[name] <= timeTime.time():
+                        errors[name] = TimeoutError(f'not finished within {tasks[name][1]}s')
+                        pending.remove(fut)
+                        if onLate is not None: fut.add_done_callback(lambda f, name=name: Workflow._lateResult_static(what, name, f, onLate))
+        finally:
+            # calls which timed out can't be interrupted, leave them running
+            pool.shutdown(wait=False)
+        log.info(f'{what} of {len(tasks)} model(s) took {timeTime.time()-t0:.3g}s.')
+        return results, errors
+
+    @staticmethod
+    def _lateResult_static(what, name, fut, onLate):
+        'Pass result of timed-out task *fut* to *onLate* (if the task succeeded).'
+        if fut.exception() is not None: return
+        try: onLate(name, fut.result())
+        except Exception as e: log.error(f'{what} of model {name}: processing result after timeout failed: {e}')
+
+    @staticmethod
+    def _raiseFailed_static(what, numTasks, errors):
+        """
+        :raises RuntimeError: if there are any *errors* (all of them are reported; the first one is chained)
+        """
+        if not errors: return
+        for name, e in errors.items(): log.error(f'{what} of model {name} failed: {e}')
+        raise RuntimeError(f'{what} failed for {len(errors)} of {numTasks} model(s): '+'; '.join(f'{name}: {e.__class__.__name__}: {e}' for name, e in errors.items())) from next(iter(errors.values()))
+
     def _getInitializationMetadata(self):
         return {
             'Execution': {
@@ -396,6 +493,97 @@ class Workflow(model.Model):
                 dependencies.append(m_r_id)
 
         self.setMetadata('Dependencies', dependencies)
+        # check that step dependencies are consistent
+        Workflow._stepOrder_static(self.getModelStepDependencies())
+
+    def getModelStepDependencies(self):
+        """
+        Return data dependencies between models within one solution step, as declared in Depends_on of model metadata (see :obj:`mupif.meta.ModelInWorkflowMeta`). Only models registered with the workflow are considered.
+
+        :return: model name -> list of names of models which must finish solving the step before it
+        :rtype: dict[str,list[str]]
+        """
+        declared = dict([(m.get('Name', ''), list(m.get('Depends_on', []))) for m in self.metadata['Models']]) if self.metadata is not None else {}
+        return dict([(name, declared.get(name, [])) for name in self._models.keys()])
+
+    @staticmethod
+    def _stepOrder_static(dependencies):
+        """
+        Sort models topologically.
+
+        :param dict dependencies: model name -> list of model names it depends on
+        :return: list of model names, each after all its dependencies
+        :raises ValueError: dependency on an unknown model or cyclic dependency
+        """
+        for name, deps in dependencies.items():
+            if unknown := [d for d in deps if d not in dependencies]: raise ValueError(f'Model {name} depends on unknown model(s): {", ".join(unknown)}.')
+        order, remaining = [], dict([(name, set(deps)) for name, deps in dependencies.items()])
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready: raise ValueError(f'Cyclic dependency between models: {", ".join(remaining.keys())}.')
+            for name in ready: del remaining[name]
+            for deps in remaining.values(): deps.difference_update(ready)
+            order += ready
+        return order
+
+    def prepareModelStep(self, name, tstep):
+        """
+        Called by :obj:`solveModelsStep` before model *name* starts solving the step, once all models it depends on have finished. Override this method to pass data from the dependencies to the model (the default does nothing).
+
+        The method is called from the thread calling :obj:`solveModelsStep`, while other independent models may be solving; therefore it should only access model *name* and its dependencies.
+
+        :param str name: model name
+        :param timestep.TimeStep tstep: Solution step
+        """
+
+    def solveModelsStep(self, tstep, stageID=0, dependencies=None):
+        """
+        Solve the step with all models, running independent models concurrently. Each model starts (via ``solveStep(runInBackground=True)`` followed by ``wait()``) as soon as all models it depends on have finished, after :obj:`prepareModelStep` was called for it. This method is meant to be called from *solveStep* of derived workflows, so that loosely coupled models (e.g. on different model servers) run in parallel.
+
+        If some model fails, no further models are started; the method waits for those already running, then raises.
+
+        :param timestep.TimeStep tstep: Solution step
+        :param int stageID: optional argument identifying solution stage (default 0)
+        :param dict dependencies: model name -> list of names of models it depends on; if not given, :obj:`getModelStepDependencies` is used
+        :raises RuntimeError: solution failed for some model(s)
+        """
+        if dependencies is None: dependencies = self.getModelStepDependencies()
+        Workflow._stepOrder_static(dependencies)
+
+        def _solve(_model):
+            Workflow._claimOwnership(_model)
+            _model.solveStep(tstep, stageID=stageID, runInBackground=True)
+            _model.wait()
+
+        t0 = timeTime.time()
+        remaining = dict([(name, set(deps)) for name, deps in dependencies.items()])
+        running, errors = {}, {}
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, len(dependencies)), thread_name_prefix='Workflow-solveStep')
+        try:
+            while remaining or running:
+                if not errors:
+                    for name in [name for name, deps in remaining.items() if not deps]:
+                        del remaining[name]
+                        _model = self.getModel(name)
+                        Workflow._claimOwnership(_model)
+                        try:
+                            self.prepareModelStep(name, tstep)
+                        except Exception as e:
+                            errors[name] = e
+                            break
+                        running[pool.submit(_solve, _model)] = name
+                if not running: break
+                done, _ = concurrent.futures.wait(running.keys(), return_when=concurrent.futures.FIRST_COMPLETED)
+                for fut in done:
+                    name = running.pop(fut)
+                    if (e := fut.exception()) is not None: errors[name] = e
+                    else:
+                        for deps in remaining.values(): deps.discard(name)
+        finally:
+            pool.shutdown(wait=True)
+            for _model in self._models.values(): Workflow._claimOwnership(_model)
+        log.debug(f"Step {tstep.getNumber()} of {len(dependencies)} model(s) took {timeTime.time()-t0:.3g}s.")
+        Workflow._raiseFailed_static('Solution step', len(dependencies), errors)
 
     def getExecutionTargetTime(self):
         return self._exec_targetTime
@@ -416,7 +604,8 @@ class Workflow(model.Model):
                 pass
 
     def terminate(self):
-        for _model in self._models.values():
+        # copy: models allocated after timeout may be unregistered concurrently
+        for _model in list(self._models.values()):
             try:
                 _model.terminate()
             except: